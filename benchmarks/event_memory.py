@@ -0,0 +1,38 @@
+"""
+Measures the memory held per decoded event by the dict, lazy and typed event
+formats of pymidi.chunks.
+
+    python -m benchmarks.event_memory
+"""
+import gc
+import tracemalloc
+
+import click
+
+from benchmarks.track_decoding import synthetic_track
+from pymidi.chunks import process_track_chunk, EVENT_BUILDERS
+
+
+def bytes_per_event(data, event_format):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    events = process_track_chunk(data, event_format=event_format)["events"]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / len(events)
+
+
+@click.command()
+@click.option("--events", default=100000, help="number of events in the synthetic track")
+def main(events):
+    data = synthetic_track(events)
+    results = {event_format: bytes_per_event(data, event_format) for event_format in EVENT_BUILDERS}
+
+    print("{:>8} {:>16}".format("format", "bytes per event"))
+    for event_format, size in results.items():
+        print("{:>8} {:>16.1f}".format(event_format, size))
+
+
+if __name__ == "__main__":
+    main()
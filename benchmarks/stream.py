@@ -0,0 +1,68 @@
+"""
+Measures the throughput of stream.StreamParser on a synthetic live stream
+of notes under running status, controller sweeps, timing clock bytes
+interleaved mid-message and occasional Sysex dumps, fed in pieces the size
+of serial reads and USB-MIDI transfers.
+
+A saturated 31.25 kbaud MIDI port carries 3125 bytes per second (10 bits
+on the wire per byte).
+
+    python -m benchmarks.stream
+"""
+import random
+import timeit
+
+import click
+
+from pymidi.stream import StreamParser, raw_message
+
+PORT_BYTES_PER_SECOND = 31250 // 10
+
+
+def synthetic_stream(size, seed=0):
+    rng = random.Random(seed)
+    stream = bytearray()
+    while len(stream) < size:
+        choice = rng.random()
+        if choice < 0.01:
+            stream += b"\xf0" + bytes(rng.randrange(0x80) for _ in range(rng.randrange(16, 256))) + b"\xf7"
+        elif choice < 0.2:
+            stream += bytes((0xB0 | rng.randrange(16), rng.randrange(0x80), rng.randrange(0x80)))
+        else:
+            stream += bytes((0x90 | rng.randrange(4),))
+            for _ in range(rng.randrange(1, 16)):
+                stream += bytes((rng.randrange(0x80),))
+                if rng.random() < 0.1:
+                    # a timing clock byte between the two data bytes
+                    stream += b"\xf8"
+                stream += bytes((rng.randrange(0x80),))
+    return bytes(stream)
+
+
+def feed_all(stream, piece_size, build):
+    parser = StreamParser(build)
+    count = 0
+    for start in range(0, len(stream), piece_size):
+        count += len(parser.feed(stream[start:start + piece_size]))
+    return count
+
+
+@click.command()
+@click.option("--size", default=1000000, help="number of bytes in the stream")
+@click.option("--repeat", default=3, help="number of timing runs per measurement")
+def main(size, repeat):
+    stream = synthetic_stream(size)
+
+    print("{:>10} {:>6} {:>12} {:>14} {:>18}".format("build", "piece", "MB/s", "messages/s", "saturated ports"))
+    for name, build in [("raw", raw_message), ("dict", None)]:
+        for piece_size in [3, 64, 4096]:
+            messages = feed_all(stream, piece_size, build)
+            seconds = min(timeit.repeat(lambda: feed_all(stream, piece_size, build), number=1, repeat=repeat))
+            bytes_per_second = len(stream) / seconds
+            print("{:>10} {:>6} {:>12.2f} {:>14.0f} {:>18.0f}".format(
+                name, piece_size, bytes_per_second / 1e6, messages / seconds,
+                bytes_per_second / PORT_BYTES_PER_SECOND))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Times the parser's hot paths on small, medium and pathological inputs,
+saves the results as JSON, and compares them against a stored baseline,
+failing if any case has slowed down by more than the tolerance.
+
+Each repeat of a case is followed by a run of a fixed calibration loop, and
+cases are compared by the median of their times divided by the calibration
+loop's, so that a machine that is busier or clocked differently between runs
+slows both alike and does not show up as a regression.
+
+    python -m benchmarks.suite                          # compare against benchmarks/baseline.json
+    python -m benchmarks.suite --output results.json    # also save the results
+    python -m benchmarks.suite --save-baseline          # replace the baseline with this run's results
+
+Baselines are only comparable between runs on the same machine.
+"""
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import timeit
+
+import click
+from bitstring import BitArray
+
+from pymidi.chunks import parse_chunks, process_track_chunk
+from pymidi.events import process_meta_event, process_midi_event
+from pymidi.filters import EventFilter
+from pymidi.utils import variable_length_field
+from pymidi.vlq import encode_vlq
+from benchmarks.track_decoding import synthetic_track
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+# the fraction a case may slow down by, relative to the calibration loop, before it counts as a regression
+DEFAULT_TOLERANCE = 0.3
+DEFAULT_REPEAT = 15
+# minimum total seconds timed per repeat, so that fast cases are called many times
+MIN_SECONDS = 0.1
+
+
+def header_chunk(track_count):
+    return b"MThd" + (6).to_bytes(4, "big") + (1).to_bytes(2, "big") + track_count.to_bytes(2, "big") + \
+        (96).to_bytes(2, "big")
+
+
+def track_chunk(data):
+    return b"MTrk" + len(data).to_bytes(4, "big") + data
+
+
+def running_status_track(event_count):
+    # one Note On status byte, then nothing but running status
+    data = bytearray(b"\x00\x90\x3c\x40")
+    for i in range(event_count - 2):
+        data += bytes((i % 3, 0x30 + i % 48, i % 2 * 0x40))
+    data += b"\x00\xff\x2f\x00"
+    return bytes(data)
+
+
+def sysex_track(size):
+    # a single Sysex event of size bytes
+    payload = bytes(i % 0x80 for i in range(size - 1)) + b"\xf7"
+    return b"\x00\xf0" + encode_vlq(size) + payload + b"\x00\xff\x2f\x00"
+
+
+def calibration_loop():
+    # a fixed amount of interpreter work, of the kind the parser's pure Python paths do
+    total = 0
+    for i in range(20000):
+        total += i % 7 * 3
+    return total
+
+
+def cases():
+    """
+    Returns (name, function) pairs for each benchmark case.
+    """
+    small_track = synthetic_track(100)
+    medium_track = synthetic_track(10000)
+    dense_track = running_status_track(50000)
+    huge_sysex = sysex_track(4 * 1024 * 1024)
+    small_file = header_chunk(1) + track_chunk(small_track)
+    many_tracks = header_chunk(2000) + track_chunk(synthetic_track(20)) * 2000
+    sysex_file = header_chunk(1) + track_chunk(huge_sysex)
+    # none of the medium track's events are on channel 2, so it only steps over events
+    notes_on_channel_2 = EventFilter(sub_types={"Note On", "Note Off"}, channels={2})
+
+    return [
+        ("variable_length_field/1 byte", lambda: variable_length_field(BitArray("0x40"))),
+        ("variable_length_field/4 bytes", lambda: variable_length_field(BitArray("0xFFFFFF7F"))),
+        ("process_midi_event/note on", lambda: process_midi_event(BitArray("0x903C40"))),
+        ("process_midi_event/running status", lambda: process_midi_event(BitArray("0x3C40"), (9, 1))),
+        ("process_meta_event/set tempo", lambda: process_meta_event(BitArray("0x510307A120"))),
+        ("process_meta_event/text", lambda: process_meta_event(BitArray(bytes=b"\x01\x40" + b"a" * 64))),
+        ("process_track_chunk/100 events", lambda: process_track_chunk(small_track)),
+        ("process_track_chunk/10000 events", lambda: process_track_chunk(medium_track)),
+        ("process_track_chunk/dense running status", lambda: process_track_chunk(dense_track)),
+        ("process_track_chunk/4 MB sysex", lambda: process_track_chunk(huge_sysex)),
+        ("process_track_chunk/10000 events, notes on one channel",
+         lambda: process_track_chunk(medium_track, event_filter=notes_on_channel_2)),
+        ("parse_chunks/100 events", lambda: parse_chunks(io.BytesIO(small_file))),
+        ("parse_chunks/2000 tracks", lambda: parse_chunks(io.BytesIO(many_tracks))),
+        ("parse_chunks/4 MB sysex", lambda: parse_chunks(io.BytesIO(sysex_file))),
+    ]
+
+
+def call_count(timer):
+    """
+    Returns the number of calls that take at least MIN_SECONDS.
+    """
+    number, seconds = timer.autorange()
+    return max(int(number * MIN_SECONDS / max(seconds, 1e-9)), 1)
+
+
+def time_case(func, repeat, calibration):
+    """
+    Times repeat runs of enough calls to take MIN_SECONDS, each followed by
+    a run of the calibration loop.
+
+    :param calibration: a (timeit.Timer, number of calls) pair for the calibration loop
+    :return: the median time of a single call, in seconds, and the median of
+        that time divided by the time of a call of the calibration loop
+    """
+    timer = timeit.Timer(func)
+    number = call_count(timer)
+    calibration_timer, calibration_number = calibration
+    seconds = []
+    relative = []
+    for _ in range(repeat):
+        call = timer.timeit(number) / number
+        seconds.append(call)
+        relative.append(call / (calibration_timer.timeit(calibration_number) / calibration_number))
+    return statistics.median(seconds), statistics.median(relative)
+
+
+def compare(results, baseline, tolerance):
+    """
+    :param results: a dict of (seconds, relative time) pairs by case name
+    :param baseline: a dict of relative times by case name
+    :return: (name, seconds, ratio or None, whether it regressed) for each result, where ratio is the case's
+        relative time divided by its baseline's
+    """
+    comparison = []
+    for name, (seconds, relative) in results.items():
+        base = baseline.get(name)
+        ratio = relative / base if base else None
+        comparison.append((name, seconds, ratio, ratio is not None and ratio > 1 + tolerance))
+    return comparison
+
+
+@click.command()
+@click.option("--output", default=None, help="file to save the results to, as JSON")
+@click.option("--baseline", default=BASELINE, help="JSON results to compare against")
+@click.option("--save-baseline", is_flag=True, help="save the results as the new baseline")
+@click.option("--tolerance", default=DEFAULT_TOLERANCE, help="fraction a case may slow down by")
+@click.option("--repeat", default=DEFAULT_REPEAT, help="number of timing runs per case")
+@click.option("--only", default=None, help="only run the cases whose names contain this")
+def main(output, baseline, save_baseline, tolerance, repeat, only):
+    # per-chunk progress logging would be timed along with the parsing
+    for name in ["pymidi.chunks", "pymidi.decoder", "pymidi.events"]:
+        logging.getLogger(name).setLevel("WARNING")
+
+    calibration_timer = timeit.Timer(calibration_loop)
+    calibration = (calibration_timer, call_count(calibration_timer))
+    results = {}
+    for name, func in cases():
+        if only is None or only in name:
+            results[name] = time_case(func, repeat, calibration)
+    run = {"python": platform.python_version(), "machine": platform.machine(),
+           "results": {name: seconds for name, (seconds, _) in results.items()},
+           "relative": {name: relative for name, (_, relative) in results.items()}}
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(run, f, indent=2, sort_keys=True)
+    if save_baseline:
+        with open(baseline, "w") as f:
+            json.dump(run, f, indent=2, sort_keys=True)
+        print("Saved baseline to {}".format(baseline))
+
+    stored = {}
+    if os.path.exists(baseline):
+        with open(baseline) as f:
+            stored = json.load(f).get("relative", {})
+
+    print("{:<56} {:>12} {:>8}".format("case", "seconds", "ratio"))
+    regressions = 0
+    for name, seconds, ratio, regressed in compare(results, stored, tolerance):
+        regressions += regressed
+        print("{:<56} {:>12.3e} {:>8} {}".format(
+            name, seconds, "{:.2f}".format(ratio) if ratio else "-", "REGRESSION" if regressed else ""))
+
+    if regressions:
+        print("{} cases slower than the baseline by more than {:.0%}".format(regressions, tolerance))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
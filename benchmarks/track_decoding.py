@@ -0,0 +1,75 @@
+"""
+Compares the BitArray track parser against the byte-offset decoder in
+pymidi.decoder on synthetic tracks of increasing length.
+
+    python -m benchmarks.track_decoding
+"""
+import contextlib
+import io
+import timeit
+
+import click
+from bitstring import BitArray
+
+from pymidi.decoder import decode_track
+from pymidi.events import process_meta_event, process_sysex_event, process_midi_event, F0_SYSEX_EVENT_PREFIX, \
+    F7_SYSEX_EVENT_PREFIX, META_EVENT_PREFIX
+from pymidi.utils import variable_length_field
+
+
+def bitarray_track(data):
+    # the BitArray loop process_track_chunk used before pymidi.decoder existed
+    events = []
+    running_status = None
+    while len(data) > 0:
+        data, delta = variable_length_field(data)
+        prefix = data[:8]
+        if prefix == F0_SYSEX_EVENT_PREFIX or prefix == F7_SYSEX_EVENT_PREFIX:
+            data, event = process_sysex_event(prefix, data[8:])
+        elif prefix == META_EVENT_PREFIX:
+            data, event = process_meta_event(data[8:])
+        else:
+            data, event, running_status = process_midi_event(data, running_status)
+        events.append((delta, event))
+    return events
+
+
+def synthetic_track(event_count):
+    # two note chords on channel 1, the second note of each Note On/Note Off pair using running status,
+    # with a tempo change every 64 events
+    data = bytearray()
+    for i in range(event_count - 1):
+        if i % 64 == 63:
+            data += b"\x00\xff\x51\x03\x07\xa1\x20"
+        elif i % 4 == 0:
+            data += b"\x00\x90\x3c\x40"
+        elif i % 4 == 2:
+            data += b"\x60\x80\x3c\x40"
+        else:
+            data += b"\x00\x40\x40"
+    data += b"\x00\xff\x2f\x00"
+    return bytes(data)
+
+
+def best_time(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+@click.command()
+@click.option("--sizes", default="1000,2000,4000,8000", help="comma separated track lengths, in events")
+@click.option("--repeat", default=3, help="number of timing runs per measurement")
+def main(sizes, repeat):
+    print("{:>8} {:>12} {:>12} {:>9}".format("events", "bitarray s", "decoder s", "speedup"))
+    for size in [int(s) for s in sizes.split(",")]:
+        data = synthetic_track(size)
+        bits = BitArray(data)
+        with contextlib.redirect_stdout(io.StringIO()):
+            # the BitArray parser prints a line for each End of Track event
+            assert bitarray_track(bits) == decode_track(data)
+            legacy = best_time(lambda: bitarray_track(bits), repeat)
+        current = best_time(lambda: decode_track(data), repeat)
+        print("{:>8} {:>12.4f} {:>12.4f} {:>8.1f}x".format(size, legacy, current, legacy / current))
+
+
+if __name__ == "__main__":
+    main()
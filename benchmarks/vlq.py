@@ -0,0 +1,64 @@
+"""
+Compares variable length quantity decoders on a run of random VLQs: the
+bit string implementation of utils.variable_length_field, vlq.read_vlq
+called once per value, and vlq.read_vlq_run decoding the whole run in one
+call.
+
+    python -m benchmarks.vlq
+"""
+import random
+import timeit
+
+import click
+from bitstring import BitArray
+
+from pymidi.utils import variable_length_field
+from pymidi.vlq import encode_vlq, read_vlq, read_vlq_run
+
+
+def each_bit_array_value(decode, bits):
+    values = []
+    while len(bits):
+        bits, value = decode(bits)
+        values.append(value)
+    return values
+
+
+def each_value(data):
+    values = []
+    pos = 0
+    end = len(data)
+    while pos < end:
+        value, pos = read_vlq(data, pos)
+        values.append(value)
+    return values
+
+
+@click.command()
+@click.option("--count", default=20000, help="number of VLQs to decode")
+@click.option("--repeat", default=3, help="number of timing runs per measurement")
+def main(count, repeat):
+    rng = random.Random(0)
+    values = [rng.choice([rng.randrange(0x80), rng.randrange(0x4000), rng.randrange(0x10000000)])
+              for _ in range(count)]
+    data = b"".join(encode_vlq(value) for value in values)
+    # the BitArray decoder is run on a slice, as it is quadratic in the length of its input
+    bit_array_count = min(count, 2000)
+    bit_array_bits = BitArray(bytes=b"".join(encode_vlq(value) for value in values[:bit_array_count]))
+    assert list(read_vlq_run(data)[0]) == each_value(data) == values
+    assert each_bit_array_value(variable_length_field, bit_array_bits) == values[:bit_array_count]
+
+    decoders = [
+        ("bit string", bit_array_count, lambda: each_bit_array_value(variable_length_field, bit_array_bits)),
+        ("read_vlq", count, lambda: each_value(data)),
+        ("read_vlq_run", count, lambda: read_vlq_run(data)),
+    ]
+
+    print("{:>16} {:>14}".format("decoder", "ns per value"))
+    for name, decoded, func in decoders:
+        seconds = min(timeit.repeat(func, number=1, repeat=repeat))
+        print("{:>16} {:>14.0f}".format(name, seconds / decoded * 1e9))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,19 @@
+import io
 import logging
 import sys
 
 import click
 
-from pymidi.chunks import parse_chunks
+from pymidi.batch import find_midi_files, run_batch, DEFAULT_CHUNKSIZE, OUTPUT_BUFFER_SIZE
+from pymidi.cache import DEFAULT_MAX_BYTES
+from pymidi.chunks import parse_chunks, parse_file
+from pymidi.errors import ERROR_MODES, SKIP
+from pymidi.export import write_parquet, DEFAULT_COMPRESSION, DEFAULT_ROW_GROUP_SIZE
+from pymidi.generate import generate_corpus, DEFAULT_DIVISION
+from pymidi.output import write_events, OUTPUT_FORMATS, TEXT
+from pymidi.stats import ParseStats
+from pymidi.synth import render_file, DEFAULT_SAMPLE_RATE, DEFAULT_BLOCK_SIZE, DEFAULT_VOICES, SAWTOOTH, SINE, \
+    SQUARE, TRIANGLE
 
 log = logging.getLogger(__name__)
 log.setLevel("INFO")
@@ -13,12 +23,37 @@ handler.setFormatter(logging.Formatter(fmt="%(asctime)s %(levelname)s %(message)
 log.addHandler(handler)
 
 
-@click.command()
-@click.option("--file", required=True, help="file to parse")
-def main(file):
+@click.group(invoke_without_command=True)
+@click.option("--file", help="file to parse")
+@click.option("--stats", "show_stats", is_flag=True, help="log parsing statistics: chunk timings, event counts, VLQs")
+@click.option("--errors", type=click.Choice(ERROR_MODES), default=SKIP,
+              help="on malformed track chunks: raise, skip the chunk, or skip to the next good event")
+@click.option("--format", "output_format", type=click.Choice(OUTPUT_FORMATS), default=TEXT,
+              help="print the file as text, or stream a JSON line or binary record per event as it is decoded")
+@click.pass_context
+def main(ctx, file, show_stats, errors, output_format):
+    if ctx.invoked_subcommand is not None:
+        return
+    if file is None:
+        raise click.UsageError("Missing option \"--file\".")
+
     log.debug("opening file '{}'...".format(file))
+    if output_format != TEXT:
+        if show_stats:
+            raise click.UsageError("--stats only applies to --format text")
+        sys.stdout.flush()
+        sink = io.BufferedWriter(sys.stdout.buffer, OUTPUT_BUFFER_SIZE)
+        try:
+            with open(file, "rb") as f:
+                write_events(f, sink, output_format, errors)
+        finally:
+            sink.flush()
+            sink.detach()
+        return
+
+    stats = ParseStats() if show_stats else None
     with open(file, "rb") as f:
-        chunks = parse_chunks(f)
+        chunks = parse_chunks(f, stats=stats, errors=errors)
         # basic track printing routine
         print("\n")
         for chunk in chunks:
@@ -39,6 +74,105 @@ def main(file):
                     print("")
             print("")
 
+    if stats is not None:
+        for chunk in stats.chunks:
+            log.info("{type} chunk: {bytes} bytes, {events} events in {seconds:.4f}s".format(**chunk) +
+                     (", failed: {}".format(chunk["error"]) if chunk["error"] else ""))
+        log.info("Parsing statistics:\n{}".format(stats.report()))
+
+
+@main.command()
+@click.argument("directory", type=click.Path(exists=True, file_okay=False))
+@click.option("--jobs", type=int, default=None, help="number of worker processes (defaults to the number of CPUs)")
+@click.option("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="number of files sent to a worker at a time")
+@click.option("--output", default="-", help="file to write a JSON line per parsed file to (defaults to stdout)")
+@click.option("--cache", "cache_directory", default=None, help="directory to cache parsed files in")
+@click.option("--cache-size", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024), help="cache size cap, in MB")
+@click.option("--errors", type=click.Choice(ERROR_MODES), default=SKIP,
+              help="on malformed track chunks: fail the file, skip the chunk, or skip to the next good event")
+def batch(directory, jobs, chunksize, output, cache_directory, cache_size, errors):
+    """
+    Parse every MIDI file under DIRECTORY in parallel.
+    """
+    paths = find_midi_files(directory)
+    log.info("Parsing {} files...".format(len(paths)))
+
+    if output == "-":
+        sys.stdout.flush()
+        sink = io.TextIOWrapper(io.BufferedWriter(sys.stdout.buffer, OUTPUT_BUFFER_SIZE), write_through=False)
+    else:
+        sink = open(output, "w", buffering=OUTPUT_BUFFER_SIZE)
+    try:
+        totals = run_batch(paths, sink, jobs, chunksize, cache_directory, cache_size * 1024 * 1024, errors)
+    finally:
+        if output == "-":
+            # flushes both buffers, and leaves sys.stdout open
+            sink.detach().detach()
+        else:
+            sink.close()
+
+    log.info("Parsed {files} files ({failures} failed, {events} events, {errors} errors handled) in {seconds:.2f}s: "
+             "{files_per_second:.1f} files/s, {mb_per_second:.2f} MB/s".format(**totals))
+    if cache_directory is not None:
+        log.info("Cache: {cache_hits} hits, {cache_misses} misses, {seconds_saved:.2f}s saved".format(**totals))
+
+
+@main.command()
+@click.argument("directory", type=click.Path(exists=True, file_okay=False))
+@click.argument("output", type=click.Path(dir_okay=False))
+@click.option("--jobs", type=int, default=None, help="number of worker processes (defaults to the number of CPUs)")
+@click.option("--row-group-size", type=int, default=DEFAULT_ROW_GROUP_SIZE, help="number of rows per row group")
+@click.option("--compression", default=DEFAULT_COMPRESSION, help="Parquet compression codec")
+@click.option("--errors", type=click.Choice(ERROR_MODES), default=SKIP,
+              help="on malformed track chunks: fail the file, skip the chunk, or skip to the next good event")
+def export(directory, output, jobs, row_group_size, compression, errors):
+    """
+    Export the events of every MIDI file under DIRECTORY to a Parquet file, OUTPUT. Needs pyarrow.
+    """
+    paths = find_midi_files(directory)
+    log.info("Exporting {} files...".format(len(paths)))
+    totals = write_parquet(paths, output, row_group_size, jobs=jobs, errors=errors, compression=compression)
+    log.info("Exported {files} files ({failures} failed) to {rows} rows in {row_groups} row groups in "
+             "{seconds:.2f}s".format(**totals))
+
+
+@main.command()
+@click.argument("file", type=click.Path(exists=True, dir_okay=False))
+@click.argument("output", type=click.Path(dir_okay=False))
+@click.option("--sample-rate", type=int, default=DEFAULT_SAMPLE_RATE, help="samples per second")
+@click.option("--block-size", type=int, default=DEFAULT_BLOCK_SIZE, help="number of samples rendered at a time")
+@click.option("--voices", type=int, default=DEFAULT_VOICES, help="maximum number of notes sounding at once")
+@click.option("--waveform", type=click.Choice([SAWTOOTH, SQUARE, TRIANGLE, SINE]), default=SAWTOOTH)
+def render(file, output, sample_rate, block_size, voices, waveform):
+    """
+    Render the notes of FILE to a WAV file, OUTPUT.
+    """
+    stats = render_file(parse_file(file, mmap=True), output, sample_rate=sample_rate, block_size=block_size,
+                        voices=voices, waveform=waveform)
+    if stats["voices_stolen"] or stats["notes_dropped"]:
+        log.warning("Ran out of voices: {voices_stolen} stolen, {notes_dropped} notes dropped".format(**stats))
+
+
+@main.command()
+@click.argument("directory", type=click.Path(file_okay=False))
+@click.option("--files", type=int, default=1, help="number of files to write")
+@click.option("--seed", type=int, default=0, help="seed of the corpus; the same seed and options give the same files")
+@click.option("--tracks", type=int, default=16, help="number of tracks per file")
+@click.option("--events", type=int, default=10000, help="number of events per track")
+@click.option("--channels", type=int, default=4, help="number of channels used; fewer gives more running status")
+@click.option("--tempo-rate", type=float, default=0.001, help="fraction of events that are tempo changes")
+@click.option("--sysex-rate", type=float, default=0.0001, help="fraction of events that are Sysex events")
+@click.option("--sysex-size", type=int, default=64 * 1024, help="largest Sysex event, in bytes")
+@click.option("--division", type=int, default=DEFAULT_DIVISION, help="ticks per quarter note")
+@click.option("--jobs", type=int, default=None, help="number of worker processes (defaults to the number of CPUs)")
+def generate(directory, files, seed, tracks, events, channels, tempo_rate, sysex_rate, sysex_size, division, jobs):
+    """
+    Write synthetic MIDI files to DIRECTORY, for load testing.
+    """
+    totals = generate_corpus(directory, files, seed, jobs, tracks=tracks, events=events, division=division,
+                             channels=channels, tempo_rate=tempo_rate, sysex_rate=sysex_rate, sysex_size=sysex_size)
+    log.info("Wrote {files} files ({bytes} bytes) in {seconds:.2f}s: {mb_per_second:.2f} MB/s".format(**totals))
+
 
 if __name__ == "__main__":
     main()
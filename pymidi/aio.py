@@ -0,0 +1,205 @@
+"""
+asyncio reading of live MIDI streams, fanning decoded messages out to any
+number of subscribers without a thread per port.
+
+A StreamDispatcher reads bytes from an asyncio.StreamReader (e.g. a pipe,
+socket or pseudo-terminal connected to a device) as they arrive, decodes
+them with a pymidi.stream.StreamParser, and puts each message on the
+bounded queue of every subscription whose filters it matches.
+"""
+import asyncio
+import logging
+import sys
+
+from pymidi.stream import StreamParser
+
+log = logging.getLogger(__name__)
+log.setLevel("INFO")
+handler = logging.StreamHandler(stream=sys.stderr)
+handler.setFormatter(logging.Formatter(fmt="%(asctime)s %(levelname)s %(message)s",
+                                       datefmt="%Y-%m-%d %H:%M:%S"))
+log.addHandler(handler)
+
+
+DEFAULT_READ_SIZE = 4096
+DEFAULT_QUEUE_SIZE = 1024
+
+# what to do with a message for a subscription whose queue is full: wait for the subscriber to make room, which
+# slows reading down to the pace of the slowest subscriber (and so pushes back on the sender), or drop the oldest
+# queued message, so that a slow subscriber misses messages but never holds up the others
+BLOCK = "block"
+DROP_OLDEST = "drop oldest"
+
+# put on every queue once the stream ends
+_END_OF_STREAM = object()
+
+
+class Subscription(object):
+    """
+    A subscriber's queue of messages, which can be consumed with
+    "async for message in subscription", or by awaiting get().
+
+    Messages are shared between subscriptions, so must not be modified.
+    """
+
+    def __init__(self, dispatcher, channels=None, sub_types=None, max_size=DEFAULT_QUEUE_SIZE, overflow=BLOCK):
+        if overflow not in (BLOCK, DROP_OLDEST):
+            raise Exception("Unrecognised overflow policy {}".format(overflow))
+        self.dispatcher = dispatcher
+        self.channels = frozenset(channels) if channels is not None else None
+        self.sub_types = frozenset(sub_types) if sub_types is not None else None
+        self.overflow = overflow
+        self.queue = asyncio.Queue(max_size)
+        # number of messages dropped under the DROP_OLDEST policy
+        self.dropped = 0
+        self.ended = False
+        self.closed = False
+        self._stream_ended = False
+        # the put waiting for room in a full queue under the BLOCK policy, if any
+        self._put = None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        message = await self.get()
+        if message is None:
+            raise StopAsyncIteration
+        return message
+
+    async def get(self):
+        """
+        Waits for the next message, returning None once the stream has ended.
+        """
+        if self.ended:
+            return None
+        if self._stream_ended and self.queue.empty():
+            self.ended = True
+            return None
+        message = await self.queue.get()
+        if message is _END_OF_STREAM:
+            self.ended = True
+            return None
+        return message
+
+    def matches(self, message):
+        if self.sub_types is not None and message["sub_type"] not in self.sub_types:
+            return False
+        # messages without a channel (Sysex and system messages) only match subscriptions to every channel
+        return self.channels is None or message.get("channel") in self.channels
+
+    def close(self):
+        """
+        Stops delivering messages to this subscription, discarding those
+        still queued, and ends it.
+        """
+        self.dispatcher.unsubscribe(self)
+
+    async def _put_waiting(self, message):
+        # the put is a task of its own, so that closing the subscription can cancel it without cancelling dispatch
+        self._put = asyncio.ensure_future(self.queue.put(message))
+        try:
+            await self._put
+        except asyncio.CancelledError:
+            if not self.closed:
+                raise
+        finally:
+            self._put = None
+
+    def _put_dropping_oldest(self, message):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+    def _end(self):
+        # a full queue is left as it is: get() ends the subscription once it has been emptied
+        self._stream_ended = True
+        if not self.queue.full():
+            self.queue.put_nowait(_END_OF_STREAM)
+
+    def _close(self):
+        self.closed = True
+        if self._put is not None:
+            self._put.cancel()
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        # wakes a get() waiting on the empty queue
+        self.queue.put_nowait(_END_OF_STREAM)
+
+
+class StreamDispatcher(object):
+    """
+    Decodes a MIDI stream from an asyncio.StreamReader and dispatches its
+    messages to subscriptions.
+    """
+
+    def __init__(self, reader, build=None, read_size=DEFAULT_READ_SIZE):
+        """
+        :param reader: an asyncio.StreamReader
+        :param build: function building each message, as for StreamParser. Subscriptions filtering by channel or
+                      sub_type need it to build dicts (the default).
+        :param read_size: maximum number of bytes read from reader at a time
+        """
+        self.reader = reader
+        self.parser = StreamParser(build)
+        self.read_size = read_size
+        self.subscriptions = []
+        self.message_count = 0
+
+    def subscribe(self, channels=None, sub_types=None, max_size=DEFAULT_QUEUE_SIZE, overflow=BLOCK):
+        """
+        :param channels: the channels (1 - 16) to receive messages for, or None for every message
+        :param sub_types: the message sub_types (e.g. "Note On") to receive, or None for every sub_type
+        :param max_size: the number of messages that can wait in the subscription's queue
+        :param overflow: BLOCK or DROP_OLDEST, what to do when a message arrives for a full queue
+        :return: a Subscription
+        """
+        subscription = Subscription(self, channels, sub_types, max_size, overflow)
+        # the list is replaced rather than changed, so that dispatch can go on iterating over the old one
+        self.subscriptions = self.subscriptions + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """
+        Stops delivering messages to subscription, discarding those still
+        queued, and ends it. A dispatch waiting for room in its queue moves
+        on to the other subscriptions.
+        """
+        self.subscriptions = [other for other in self.subscriptions if other is not subscription]
+        subscription._close()
+
+    async def run(self):
+        """
+        Reads and dispatches messages until the reader reaches the end of
+        the stream, then ends every subscription.
+        """
+        reader = self.reader
+        parser = self.parser
+        try:
+            while True:
+                data = await reader.read(self.read_size)
+                if not data:
+                    break
+                for message in parser.feed(data):
+                    await self.dispatch(message)
+        finally:
+            for subscription in self.subscriptions:
+                subscription._end()
+
+    async def dispatch(self, message):
+        """
+        Puts message on the queue of every matching subscription.
+        """
+        self.message_count += 1
+        for subscription in self.subscriptions:
+            # subscriptions can be closed while an earlier one is waited for
+            if subscription.closed or not subscription.matches(message):
+                continue
+            queue = subscription.queue
+            if not queue.full():
+                queue.put_nowait(message)
+            elif subscription.overflow == BLOCK:
+                await subscription._put_waiting(message)
+            else:
+                subscription._put_dropping_oldest(message)
@@ -0,0 +1,117 @@
+import asyncio
+import os
+import unittest
+
+from pymidi.aio import StreamDispatcher, DROP_OLDEST
+from pymidi.events import MIDI
+
+NOTES = bytes.fromhex("903C64 3E64 913C64 F8 803C40 F0 0102 F7")
+
+
+async def collect(subscription):
+    return [message async for message in subscription]
+
+
+class StreamDispatcherTest(unittest.IsolatedAsyncioTestCase):
+
+    def reader(self, data):
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return reader
+
+    async def test_every_subscriber_receives_every_message(self):
+        dispatcher = StreamDispatcher(self.reader(NOTES), read_size=4)
+        first = dispatcher.subscribe()
+        second = dispatcher.subscribe()
+
+        _, first_messages, second_messages = await asyncio.gather(dispatcher.run(), collect(first),
+                                                                  collect(second))
+
+        self.assertEqual(len(first_messages), 6)
+        self.assertEqual(first_messages, second_messages)
+        self.assertEqual(first_messages[1],
+                         {"type": MIDI, "sub_type": "Note On", "channel": 1, "note": 62, "velocity": 100})
+        self.assertEqual(dispatcher.message_count, 6)
+
+    async def test_subscribers_filter_by_channel_and_sub_type(self):
+        dispatcher = StreamDispatcher(self.reader(NOTES))
+        channel_2 = dispatcher.subscribe(channels=[2])
+        note_ons = dispatcher.subscribe(sub_types=["Note On"])
+        clock = dispatcher.subscribe(sub_types=["Timing Clock"])
+
+        _, channel_2_messages, note_on_messages, clock_messages = await asyncio.gather(
+            dispatcher.run(), collect(channel_2), collect(note_ons), collect(clock))
+
+        self.assertEqual([message["channel"] for message in channel_2_messages], [2])
+        self.assertEqual([message["note"] for message in note_on_messages], [60, 62, 60])
+        self.assertEqual(len(clock_messages), 1)
+
+    async def test_full_queue_blocks_reading_until_subscriber_catches_up(self):
+        dispatcher = StreamDispatcher(self.reader(NOTES))
+        subscription = dispatcher.subscribe(max_size=1)
+
+        task = asyncio.ensure_future(dispatcher.run())
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+        self.assertFalse(task.done())
+        self.assertEqual(len(await collect(subscription)), 6)
+        await task
+
+    async def test_full_queue_drops_oldest_messages(self):
+        dispatcher = StreamDispatcher(self.reader(NOTES))
+        subscription = dispatcher.subscribe(max_size=2, overflow=DROP_OLDEST)
+
+        await dispatcher.run()
+        messages = await collect(subscription)
+
+        self.assertEqual(subscription.dropped, 4)
+        self.assertEqual([message["sub_type"] for message in messages], ["Note Off", "F0"])
+
+    async def test_closed_subscription_receives_no_more_messages(self):
+        dispatcher = StreamDispatcher(self.reader(NOTES))
+        subscription = dispatcher.subscribe()
+        subscription.close()
+
+        await dispatcher.run()
+
+        self.assertEqual(await collect(subscription), [])
+
+    async def test_closing_subscription_while_reading_waits_for_it(self):
+        dispatcher = StreamDispatcher(self.reader(NOTES))
+        blocked = dispatcher.subscribe(max_size=1)
+        other = dispatcher.subscribe()
+
+        task = asyncio.ensure_future(dispatcher.run())
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        self.assertFalse(task.done())
+
+        blocked.close()
+        await asyncio.wait_for(task, 1)
+        self.assertEqual(await collect(blocked), [])
+        self.assertEqual(len(await collect(other)), 6)
+
+    async def test_reading_from_pipe(self):
+        read_fd, write_fd = os.pipe()
+        reader = asyncio.StreamReader()
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader),
+                                                    os.fdopen(read_fd, "rb"))
+        dispatcher = StreamDispatcher(reader)
+        subscription = dispatcher.subscribe(channels=[1])
+        try:
+            os.write(write_fd, NOTES[:5])
+            os.write(write_fd, NOTES[5:])
+            os.close(write_fd)
+
+            _, messages = await asyncio.gather(dispatcher.run(), collect(subscription))
+        finally:
+            transport.close()
+
+        self.assertEqual([message["sub_type"] for message in messages], ["Note On", "Note On", "Note Off"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+import json
+import logging
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+from pymidi.cache import ParseCache, DEFAULT_MAX_BYTES
+from pymidi.chunks import parse_file, index_chunks, process_chunk, track_entries, HEADER, HEADER_TYPE, \
+    TRACK_TYPE, DICT_EVENTS, COLUMNAR_EVENTS
+from pymidi.errors import SKIP
+from pymidi.stats import ParseStats
+
+log = logging.getLogger(__name__)
+log.setLevel("INFO")
+handler = logging.StreamHandler(stream=sys.stderr)
+handler.setFormatter(logging.Formatter(fmt="%(asctime)s %(levelname)s %(message)s",
+                                       datefmt="%Y-%m-%d %H:%M:%S"))
+log.addHandler(handler)
+
+
+MIDI_EXTENSIONS = (".mid", ".midi", ".smf")
+# files handed to a worker at a time: large enough to amortise inter-process overhead over many small files
+DEFAULT_CHUNKSIZE = 32
+OUTPUT_BUFFER_SIZE = 1024 * 1024
+
+# the ParseCache used by summarise_file in this process, if any
+_cache = None
+# the pymidi.errors mode summarise_file parses files with in this process
+_errors = SKIP
+
+
+def find_midi_files(directory):
+    """
+    Lists the MIDI files under directory, recursively, in a stable order.
+    """
+    paths = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(MIDI_EXTENSIONS):
+                paths.append(os.path.join(root, name))
+    return paths
+
+
+def summarise_file(path):
+    """
+    Parses a single file, returning a summary record of it. Never raises:
+    errors are reported in the record's "error" field instead, so that one
+    bad file does not take down a worker.
+    """
+    record = {"path": path, "bytes": None, "error": None}
+    start = time.perf_counter()
+    try:
+        record["bytes"] = os.path.getsize(path)
+        if _cache is None:
+            stats = ParseStats(count_events=False)
+            chunks = parse_file(path, mmap=True, stats=stats, errors=_errors)
+            record["errors"] = stats.errors
+        else:
+            hits, seconds_saved = _cache.stats["hits"], _cache.stats["seconds_saved"]
+            chunks = _cache.parse_file(path, COLUMNAR_EVENTS)
+            record["cache_hit"] = _cache.stats["hits"] > hits
+            record["seconds_saved"] = _cache.stats["seconds_saved"] - seconds_saved
+        header = chunks[0] if chunks and chunks[0] and chunks[0]["type"] == HEADER else None
+        tracks = [chunk for chunk in chunks if chunk and chunk["type"] != HEADER]
+        record["format"] = header["format"] if header else None
+        record["tracks"] = len(tracks)
+        record["events"] = sum(len(track["events"]) for track in tracks)
+        # chunks that are unknown or failed to parse come back as None
+        record["skipped_chunks"] = chunks.count(None)
+    except (Exception, SystemExit) as e:
+        # SystemExit too: a worker that exits never returns its task, and the pool waits for it forever
+        record["error"] = "{}: {}".format(type(e).__name__, e)
+    record["seconds"] = time.perf_counter() - start
+    return record
+
+
+def _init_worker(cache_directory=None, cache_bytes=None, errors=SKIP):
+    global _cache, _errors
+    _errors = errors
+    # per-chunk progress logging costs more than parsing a small file
+    for name in ["pymidi.chunks", "pymidi.decoder"]:
+        logging.getLogger(name).setLevel("WARNING")
+    if cache_directory is not None:
+        _cache = ParseCache(cache_directory, cache_bytes)
+
+
+def parse_tracks_parallel(path, jobs=None, event_format=DICT_EVENTS):
+    """
+    Parses a single file, decoding its track chunks in parallel across a
+    pool of worker processes. Worth it for large Format 1 files, whose
+    tracks are independent of each other.
+
+    :param path: path of the MIDI file
+    :param jobs: number of worker processes (defaults to the number of CPUs)
+    :param event_format: DICT_EVENTS, TYPED_EVENTS or COLUMNAR_EVENTS
+    :return: a list of chunks, as returned by parse_chunks (but without any unknown chunks)
+    """
+    with open(path, "rb") as f:
+        index = index_chunks(f)
+        chunks = [process_chunk(chunk_type, length, _read_at(f, offset, length))
+                  for chunk_type, offset, length in index if chunk_type == HEADER_TYPE]
+
+    tasks = [(path, offset, length, event_format) for _, offset, length in track_entries(index)]
+    with Pool(jobs, initializer=_init_worker) as pool:
+        chunks.extend(pool.map(_decode_track_at, tasks, chunksize=1))
+
+    return chunks
+
+
+def _read_at(f, offset, length):
+    f.seek(offset)
+    return f.read(length)
+
+
+def _decode_track_at(task):
+    path, offset, length, event_format = task
+    with open(path, "rb") as f:
+        return process_chunk(TRACK_TYPE, length, _read_at(f, offset, length), event_format=event_format)
+
+
+def run_batch(paths, output, jobs=None, chunksize=DEFAULT_CHUNKSIZE, cache_directory=None,
+              cache_bytes=DEFAULT_MAX_BYTES, errors=SKIP):
+    """
+    Parses paths across a pool of worker processes, writing a JSON summary
+    record for each file to output as each one completes.
+
+    :param paths: the files to parse
+    :param output: a text file object to write JSON lines to
+    :param jobs: number of worker processes (defaults to the number of CPUs)
+    :param chunksize: number of files sent to a worker at a time
+    :param cache_directory: directory of a ParseCache to parse files through, if any. Files are then summarised
+                            from their columnar form.
+    :param cache_bytes: the size cap of the cache
+    :param errors: how to handle malformed track chunks (see pymidi.errors). Records then count the errors handled
+                   in each file, by error class. The cache always parses files with SKIP, so errors cannot be changed
+                   when using one.
+    :return: a dict of totals for the whole batch
+    """
+    if cache_directory is not None and errors != SKIP:
+        raise Exception("Files parsed through a cache are always parsed with errors={}".format(SKIP))
+    totals = {"files": 0, "failures": 0, "bytes": 0, "events": 0, "errors": 0, "cache_hits": 0, "cache_misses": 0,
+              "seconds_saved": 0.0}
+    start = time.perf_counter()
+    with Pool(jobs, initializer=_init_worker, initargs=(cache_directory, cache_bytes, errors)) as pool:
+        for record in pool.imap_unordered(summarise_file, paths, chunksize):
+            totals["files"] += 1
+            totals["bytes"] += record["bytes"] or 0
+            totals["errors"] += sum(record.get("errors", {}).values())
+            if "cache_hit" in record:
+                totals["cache_hits" if record["cache_hit"] else "cache_misses"] += 1
+                totals["seconds_saved"] += record["seconds_saved"]
+            if record["error"]:
+                totals["failures"] += 1
+                log.warning("Failed to parse {}: {}".format(record["path"], record["error"]))
+            else:
+                totals["events"] += record["events"]
+            output.write(json.dumps(record))
+            output.write("\n")
+
+    totals["seconds"] = time.perf_counter() - start
+    totals["files_per_second"] = totals["files"] / totals["seconds"] if totals["seconds"] else 0.0
+    totals["mb_per_second"] = totals["bytes"] / 1e6 / totals["seconds"] if totals["seconds"] else 0.0
+    return totals
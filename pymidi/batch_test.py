@@ -0,0 +1,112 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from pymidi.batch import find_midi_files, summarise_file, run_batch, parse_tracks_parallel
+from pymidi.chunks import parse_chunks, TYPED_EVENTS
+from pymidi.errors import LENIENT
+
+FORMAT_0_EXAMPLE = "data/format_0_example_1.mid"
+FORMAT_1_EXAMPLE = "data/format_1_example_1.mid"
+
+
+class BatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.directory, "nested"))
+        shutil.copy(FORMAT_0_EXAMPLE, os.path.join(self.directory, "a.mid"))
+        shutil.copy(FORMAT_1_EXAMPLE, os.path.join(self.directory, "nested", "b.MIDI"))
+        with open(os.path.join(self.directory, "broken.mid"), "wb") as f:
+            f.write(b"MThd\x00\x00\x00\x06\x00")
+        with open(os.path.join(self.directory, "notes.txt"), "w") as f:
+            f.write("not a MIDI file")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_finding_midi_files_recurses_and_filters_by_extension(self):
+        paths = find_midi_files(self.directory)
+
+        self.assertEqual([os.path.relpath(path, self.directory) for path in paths],
+                         ["a.mid", "broken.mid", os.path.join("nested", "b.MIDI")])
+
+    def test_summarising_file(self):
+        record = summarise_file(FORMAT_1_EXAMPLE)
+
+        self.assertIsNone(record["error"])
+        self.assertEqual(record["format"], 1)
+        self.assertEqual(record["tracks"], 4)
+        self.assertEqual(record["events"], 17)
+        self.assertEqual(record["bytes"], os.path.getsize(FORMAT_1_EXAMPLE))
+
+    def test_summarising_broken_file_reports_error_instead_of_raising(self):
+        record = summarise_file(os.path.join(self.directory, "broken.mid"))
+
+        self.assertIsNotNone(record["error"])
+
+    def test_summarising_file_that_exits_reports_error(self):
+        with mock.patch("pymidi.batch.parse_file", side_effect=SystemExit(1)):
+            record = summarise_file(FORMAT_1_EXAMPLE)
+
+        self.assertEqual(record["error"], "SystemExit: 1")
+
+    def test_running_batch_writes_a_record_per_file_and_counts_failures(self):
+        output = io.StringIO()
+
+        totals = run_batch(find_midi_files(self.directory), output, jobs=2, chunksize=1)
+
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(len(records), 3)
+        self.assertEqual(sorted(record["error"] is None for record in records), [False, True, True])
+        self.assertEqual(totals["files"], 3)
+        self.assertEqual(totals["failures"], 1)
+        self.assertEqual(totals["events"], 14 + 17)
+        self.assertGreater(totals["files_per_second"], 0)
+
+    def test_running_batch_counts_errors_handled(self):
+        # a track chunk with a Set Tempo event two bytes long
+        track = bytes.fromhex("00 90 3C 40  00 FF 51 02 07 A1  10 80 3C 40  00 FF 2F 00")
+        with open(os.path.join(self.directory, "bad_track.mid"), "wb") as f:
+            f.write(b"MThd\x00\x00\x00\x06\x00\x00\x00\x01\x00\x60MTrk" + len(track).to_bytes(4, "big") + track)
+        output = io.StringIO()
+
+        totals = run_batch(find_midi_files(self.directory), output, jobs=1, errors=LENIENT)
+
+        records = {os.path.basename(record["path"]): record for record in map(json.loads,
+                                                                              output.getvalue().splitlines())}
+        self.assertEqual(records["bad_track.mid"]["errors"], {"EventLengthError": 1})
+        self.assertEqual(records["bad_track.mid"]["events"], 3)
+        self.assertEqual(records["a.mid"]["errors"], {})
+        self.assertEqual((totals["errors"], totals["failures"]), (1, 1))
+
+    def test_running_batch_through_cache_reports_hits_and_misses(self):
+        cache_directory = os.path.join(self.directory, "cache")
+        paths = find_midi_files(self.directory)
+
+        first = run_batch(paths, io.StringIO(), jobs=1, cache_directory=cache_directory)
+        second = run_batch(paths, io.StringIO(), jobs=1, cache_directory=cache_directory)
+
+        self.assertEqual((first["cache_hits"], first["cache_misses"]), (0, 2))
+        self.assertEqual((second["cache_hits"], second["cache_misses"]), (2, 0))
+        self.assertEqual(second["events"], first["events"])
+
+    def test_parsing_tracks_in_parallel_matches_parsing_in_order(self):
+        with open(FORMAT_1_EXAMPLE, "rb") as f:
+            expected = parse_chunks(f)
+
+        self.assertEqual(parse_tracks_parallel(FORMAT_1_EXAMPLE, jobs=2), expected)
+
+    def test_parsing_tracks_in_parallel_with_typed_events(self):
+        chunks = parse_tracks_parallel(FORMAT_1_EXAMPLE, jobs=2, event_format=TYPED_EVENTS)
+
+        self.assertEqual(len(chunks), 5)
+        self.assertEqual(chunks[4]["events"][-1].sub_type, "End of Track")
+
+
+if __name__ == "__main__":
+    unittest.main()
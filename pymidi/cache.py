@@ -0,0 +1,228 @@
+import hashlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from pymidi.chunks import parse_buffer, PARSER_VERSION, COLUMNAR_EVENTS, DICT_EVENTS, EVENT_BUILDERS, TRACK
+from pymidi.columnar import to_events
+from pymidi.errors import MidiError
+from pymidi.seek import SeekIndex, DEFAULT_INTERVAL
+
+log = logging.getLogger(__name__)
+log.setLevel("INFO")
+handler = logging.StreamHandler(stream=sys.stderr)
+handler.setFormatter(logging.Formatter(fmt="%(asctime)s %(levelname)s %(message)s",
+                                       datefmt="%Y-%m-%d %H:%M:%S"))
+log.addHandler(handler)
+
+
+CACHE_SUFFIX = ".pymidi-cache"
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+
+def cache_key(data):
+    """
+    Returns the cache key of a file's contents, which also covers the
+    parser version so that entries are not reused across output changes.
+    """
+    digest = hashlib.sha256("pymidi-{}:".format(PARSER_VERSION).encode())
+    digest.update(data)
+    return digest.hexdigest()
+
+
+class ParseCache(object):
+    """
+    An on-disk cache of parsed files, keyed by the hash of their contents.
+
+    Entries hold the file in columnar form (see pymidi.columnar): NumPy
+    arrays and payload blobs, which load in a fraction of the time it takes
+    to parse the file. Hits for COLUMNAR_EVENTS return these directly.
+    Other formats are rebuilt from the columns, which skips decoding the
+    file's bytes but still has to build each event object. Files are parsed
+    as by parse_buffer with errors=SKIP, and columnar parsing checks the
+    same things as building events, so malformed track chunks are None
+    whichever format they are requested in.
+
+    Entries are .npz files of plain arrays and JSON, loaded without
+    unpickling, so a cache directory shared with others cannot be used to
+    run code in the processes reading it.
+
+    Once the entries take up more than max_bytes, the least recently used
+    ones are deleted. Entries are written atomically, so a cache directory
+    can be shared between processes, though each one only evicts entries
+    it knows about.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "seconds_saved": 0.0}
+        # key -> size, least recently used first
+        self._entries = OrderedDict()
+        self._size = 0
+        self._scan()
+
+    def parse_file(self, path, event_format=DICT_EVENTS):
+        with open(path, "rb") as f:
+            data = f.read()
+        return self.parse_bytes(data, event_format)
+
+    def parse_bytes(self, data, event_format=DICT_EVENTS):
+        """
+        Parses the contents of a MIDI file, from the cache if possible.
+
+        :return: a list of chunks, as returned by parse_chunks
+        """
+        if event_format != COLUMNAR_EVENTS and event_format not in EVENT_BUILDERS:
+            raise Exception("Unrecognised event format {}".format(event_format))
+
+        chunks = self._cached(cache_key(data), "chunks", lambda: parse_buffer(data, event_format=COLUMNAR_EVENTS))
+
+        if event_format == COLUMNAR_EVENTS:
+            return chunks
+        build = EVENT_BUILDERS[event_format]
+        return [_rebuild(chunk, build) if chunk and chunk["type"] == TRACK else chunk for chunk in chunks]
+
+    def seek_index(self, data, interval=DEFAULT_INTERVAL):
+        """
+        Returns the SeekIndex of the contents of a MIDI file, from the cache
+        if possible. Seek indexes are kept in their own entries, next to
+        those of the parsed files, and are evicted independently of them.
+        """
+        return self._cached("{}-seek-{}".format(cache_key(data), interval), "seek_index",
+                            lambda: SeekIndex.build(data, interval))
+
+    def _cached(self, key, name, compute):
+        start = time.perf_counter()
+        entry = self._load(key)
+        if entry is not None:
+            self.stats["hits"] += 1
+            self.stats["seconds_saved"] += max(entry["parse_seconds"] - (time.perf_counter() - start), 0.0)
+            return entry[name]
+
+        self.stats["misses"] += 1
+        value = compute()
+        self._store(key, {"parse_seconds": time.perf_counter() - start, name: value})
+        return value
+
+    def report(self):
+        return "{hits} hits, {misses} misses, {evictions} evictions, {seconds_saved:.2f}s saved".format(**self.stats)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + CACHE_SUFFIX)
+
+    def _scan(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(CACHE_SUFFIX):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name[:-len(CACHE_SUFFIX)], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._entries[key] = size
+            self._size += size
+
+    def _load(self, key):
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as arrays:
+                entry = _load_value(json.loads(arrays["entry"].tobytes().decode()), arrays)
+        except FileNotFoundError:
+            self._forget(key)
+            return None
+        except Exception as e:
+            log.warning("Discarding unreadable cache entry {}: {}".format(path, e))
+            self._delete(key)
+            return None
+
+        # the modification time records recency for other processes scanning the directory
+        os.utime(path)
+        if key not in self._entries:
+            size = os.path.getsize(path)
+            self._entries[key] = size
+            self._size += size
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key, entry):
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            arrays = {}
+            encoded = json.dumps(_dump_value(entry, arrays)).encode()
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, entry=np.frombuffer(encoded, dtype=np.uint8), **arrays)
+            os.replace(temp_path, self._path(key))
+        except Exception:
+            os.unlink(temp_path)
+            raise
+
+        self._forget(key)
+        size = os.path.getsize(self._path(key))
+        self._entries[key] = size
+        self._size += size
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            self._delete(next(iter(self._entries)))
+            self.stats["evictions"] += 1
+
+    def _delete(self, key):
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+        self._forget(key)
+
+    def _forget(self, key):
+        self._size -= self._entries.pop(key, 0)
+
+
+def _rebuild(chunk, build):
+    # a safety net for any error building events that columnar parsing does not check for, handled as SKIP would
+    try:
+        return {"type": TRACK, "events": to_events(chunk, build)}
+    except MidiError as e:
+        log.warning("Failed to rebuild cached track chunk: {}".format(e))
+        return None
+
+
+def _dump_value(value, arrays):
+    # returns value as JSON, moving its arrays and blobs into arrays, by name
+    if isinstance(value, np.ndarray):
+        name = "a{}".format(len(arrays))
+        arrays[name] = value
+        return {"array": name}
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        name = "a{}".format(len(arrays))
+        arrays[name] = np.frombuffer(value, dtype=np.uint8)
+        return {"bytes": name}
+    if isinstance(value, SeekIndex):
+        return {"seek_index": [value.interval, _dump_value(value.tracks, arrays)]}
+    if isinstance(value, dict):
+        return {"dict": {key: _dump_value(item, arrays) for key, item in value.items()}}
+    if isinstance(value, list):
+        return [_dump_value(item, arrays) for item in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    raise Exception("Cannot cache a {}".format(type(value).__name__))
+
+
+def _load_value(value, arrays):
+    if isinstance(value, list):
+        return [_load_value(item, arrays) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if "array" in value:
+        return arrays[value["array"]]
+    if "bytes" in value:
+        return arrays[value["bytes"]].tobytes()
+    if "seek_index" in value:
+        interval, tracks = value["seek_index"]
+        return SeekIndex(interval, _load_value(tracks, arrays))
+    return {key: _load_value(item, arrays) for key, item in value["dict"].items()}
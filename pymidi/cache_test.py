@@ -0,0 +1,126 @@
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from pymidi import cache
+from pymidi.cache import ParseCache, cache_key, CACHE_SUFFIX
+from pymidi.chunks import parse_buffer, parse_chunks, COLUMNAR_EVENTS, DICT_EVENTS, LAZY_EVENTS, TYPED_EVENTS
+
+FORMAT_0_EXAMPLE = "data/format_0_example_1.mid"
+FORMAT_1_EXAMPLE = "data/format_1_example_1.mid"
+HEADER = b"MThd" + (6).to_bytes(4, "big") + bytes.fromhex("0000 0001 0060")
+
+
+class _Touch(object):
+    # creates a file when unpickled
+    def __init__(self, path):
+        self.path = path
+
+    def __reduce__(self):
+        return open, (self.path, "w")
+
+
+class CacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def entries(self):
+        return sorted(name for name in os.listdir(self.directory) if name.endswith(CACHE_SUFFIX))
+
+    def test_cache_hit_returns_same_chunks_as_parsing(self):
+        with open(FORMAT_1_EXAMPLE, "rb") as f:
+            expected = parse_chunks(f)
+
+        parse_cache = ParseCache(self.directory)
+        miss = parse_cache.parse_file(FORMAT_1_EXAMPLE)
+        hit = ParseCache(self.directory).parse_file(FORMAT_1_EXAMPLE)
+
+        self.assertEqual(miss, expected)
+        self.assertEqual(hit, expected)
+        self.assertEqual(parse_cache.stats["misses"], 1)
+        self.assertEqual(len(self.entries()), 1)
+
+    def test_cache_counts_hits_and_misses_and_time_saved(self):
+        parse_cache = ParseCache(self.directory)
+
+        parse_cache.parse_file(FORMAT_0_EXAMPLE)
+        parse_cache.parse_file(FORMAT_0_EXAMPLE, TYPED_EVENTS)
+        chunks = parse_cache.parse_file(FORMAT_0_EXAMPLE, COLUMNAR_EVENTS)
+
+        self.assertEqual(parse_cache.stats["hits"], 2)
+        self.assertEqual(parse_cache.stats["misses"], 1)
+        self.assertGreaterEqual(parse_cache.stats["seconds_saved"], 0.0)
+        self.assertEqual(len(chunks[1]["events"]), 14)
+        self.assertIn("2 hits, 1 misses", parse_cache.report())
+
+    def test_cache_key_depends_on_content_and_parser_version(self):
+        key = cache_key(b"MThd")
+
+        self.assertNotEqual(cache_key(b"MTrk"), key)
+        version = cache.PARSER_VERSION
+        cache.PARSER_VERSION = version + 1
+        try:
+            self.assertNotEqual(cache_key(b"MThd"), key)
+        finally:
+            cache.PARSER_VERSION = version
+
+    def test_cache_evicts_least_recently_used_entries_over_size_cap(self):
+        with open(FORMAT_0_EXAMPLE, "rb") as f:
+            format_0 = f.read()
+        with open(FORMAT_1_EXAMPLE, "rb") as f:
+            format_1 = f.read()
+        parse_cache = ParseCache(self.directory)
+        parse_cache.parse_bytes(format_0)
+        parse_cache.parse_bytes(format_1)
+        parse_cache.max_bytes = sum(os.path.getsize(os.path.join(self.directory, name)) for name in self.entries())
+
+        parse_cache.parse_bytes(format_0)
+        parse_cache.parse_bytes(format_0 + b"MTrk\x00\x00\x00\x04\x00\xff\x2f\x00")
+
+        self.assertEqual(parse_cache.stats["evictions"], 1)
+        self.assertNotIn(cache_key(format_1) + CACHE_SUFFIX, self.entries())
+        self.assertIn(cache_key(format_0) + CACHE_SUFFIX, self.entries())
+
+    def test_cache_matches_parsing_malformed_files_in_every_format(self):
+        # a Set Tempo event two bytes long
+        track = bytes.fromhex("00 FF 51 02 07 A1  00 FF 2F 00")
+        data = HEADER + b"MTrk" + len(track).to_bytes(4, "big") + track
+        parse_cache = ParseCache(self.directory)
+        for event_format in [DICT_EVENTS, LAZY_EVENTS, TYPED_EVENTS, COLUMNAR_EVENTS]:
+            expected = parse_buffer(data, event_format=event_format)
+            self.assertIsNone(expected[1])
+            for _ in range(2):
+                self.assertEqual(parse_cache.parse_bytes(data, event_format), expected)
+
+    def test_cache_entries_are_not_unpickled(self):
+        parse_cache = ParseCache(self.directory)
+        parse_cache.parse_file(FORMAT_0_EXAMPLE)
+        marker = os.path.join(self.directory, "unpickled")
+        with open(os.path.join(self.directory, self.entries()[0]), "wb") as f:
+            pickle.dump(_Touch(marker), f)
+
+        parse_cache.parse_file(FORMAT_0_EXAMPLE)
+
+        self.assertFalse(os.path.exists(marker))
+        self.assertEqual(parse_cache.stats["misses"], 2)
+
+    def test_unreadable_cache_entry_is_treated_as_miss(self):
+        parse_cache = ParseCache(self.directory)
+        parse_cache.parse_file(FORMAT_0_EXAMPLE)
+        with open(os.path.join(self.directory, self.entries()[0]), "wb") as f:
+            f.write(b"not a cache entry")
+
+        chunks = parse_cache.parse_file(FORMAT_0_EXAMPLE)
+
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual(parse_cache.stats["misses"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
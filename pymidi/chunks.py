@@ -1,11 +1,15 @@
 import logging
+import os
 import sys
+import time
+from mmap import mmap as map_file, ACCESS_READ
 
 from bitstring import BitArray
 
-from pymidi.events import process_meta_event, process_sysex_event, process_midi_event, F0_SYSEX_EVENT_PREFIX, \
-    F7_SYSEX_EVENT_PREFIX, META_EVENT_PREFIX
-from pymidi.utils import variable_length_field
+from pymidi import decoder, typed_events
+from pymidi.decoder import decode_track, recover_track, TrackStream, READ_BUFFER_SIZE
+from pymidi.errors import check_error_mode, next_chunk, ChunkError, HeaderError, TrackError, LENIENT, SKIP, STRICT
+from pymidi.lazy_events import build_lazy_event, decode_lazy
 
 log = logging.getLogger(__name__)
 log.setLevel("INFO")
@@ -20,49 +24,383 @@ TRACK_TYPE = b"MTrk"
 HEADER = "header"
 TRACK = "track"
 
+# bump whenever the parsed output for a given file changes, to invalidate anything derived from it (e.g. pymidi.cache)
+PARSER_VERSION = 1
+
+# formats track chunk events can be returned in: (delta, event dict) tuples, (delta, pymidi.lazy_events.LazyEvent)
+# tuples, pymidi.typed_events objects, or pymidi.columnar arrays (which need NumPy, and are only supported when
+# parsing whole chunks)
+DICT_EVENTS = "dict"
+LAZY_EVENTS = "lazy"
+TYPED_EVENTS = "typed"
+COLUMNAR_EVENTS = "columnar"
+EVENT_BUILDERS = {
+    DICT_EVENTS: decoder.build_event_item,
+    LAZY_EVENTS: build_lazy_event,
+    TYPED_EVENTS: typed_events.build_event,
+}
+
+
+def parse_chunks(f, event_format=DICT_EVENTS, keep_raw=False, stats=None, event_filter=None, errors=SKIP):
+    """
+    :param errors: STRICT, SKIP or LENIENT (see pymidi.errors). Resynchronising at the next chunk needs the rest of
+                   the file in memory, so with LENIENT it is read in one go and parsed by parse_buffer.
+    """
+    check_error_mode(errors)
+    if errors == LENIENT:
+        return parse_buffer(f.read(), event_format=event_format, keep_raw=keep_raw, stats=stats,
+                            event_filter=event_filter, errors=errors)
 
-def parse_chunks(f):
     chunks = []
+    track_number = 0
     chunk_type = f.read(4)
     while chunk_type:
         length = BitArray(f.read(4)).int
 
-        chunks.append(process_chunk(chunk_type, length, f.read(length)))
+        if chunk_type == TRACK_TYPE and event_filter is not None and not event_filter.matches_track(track_number):
+            _skip(f, length, READ_BUFFER_SIZE)
+            chunks.append(None)
+        else:
+            data = f.read(length)
+            if len(data) < length and errors == STRICT:
+                raise ChunkError("File ended {} bytes into a chunk of {} bytes".format(len(data), length))
+            chunks.append(process_chunk(chunk_type, length, data, event_format=event_format, keep_raw=keep_raw,
+                                        stats=stats, event_filter=event_filter, errors=errors))
+        track_number += chunk_type == TRACK_TYPE
 
         chunk_type = f.read(4)
 
     return chunks
 
 
-def process_chunk(type, length, raw_data):
-    data = BitArray(raw_data)
+def parse_file(path, mmap=False, event_format=DICT_EVENTS, keep_raw=False, stats=None, event_filter=None,
+               errors=SKIP):
+    """
+    Parses the MIDI file at path.
 
-    if type == HEADER_TYPE:
-        return process_header_chunk(length, data)
+    With mmap=True the file is memory-mapped rather than read, and each
+    chunk is decoded straight from a memoryview of the map. Meta and Sysex
+    payloads ("data", "text" and "sequence_number") are then returned as
+    memoryviews into the map instead of copies, which keep the map open
+    for as long as they are referenced.
 
-    elif type == TRACK_TYPE:
-        try:
-            return process_track_chunk(data)
-        except Exception as e:
-            log.error("Error processing Track chunk: {}".format(e))
-            return None
-    else:
-        log.warning("Found unknown chunk type {}, skipping...".format(type))
+    :param path: path of the MIDI file
+    :param mmap: whether to memory-map the file
+    :param event_format: DICT_EVENTS, LAZY_EVENTS, TYPED_EVENTS or COLUMNAR_EVENTS
+    :param keep_raw: whether to keep the raw data of each track chunk (see process_chunk)
+    :param stats: a pymidi.stats.ParseStats to collect statistics in, if any
+    :param event_filter: a pymidi.filters.EventFilter selecting the events and tracks to parse, if any
+    :param errors: STRICT, SKIP or LENIENT (see pymidi.errors)
+    :return: a list of chunks, as returned by parse_chunks
+    """
+    with open(path, "rb") as f:
+        if not mmap:
+            return parse_chunks(f, event_format, keep_raw, stats, event_filter, errors)
+        if not os.fstat(f.fileno()).st_size:
+            return []
+        data = memoryview(map_file(f.fileno(), 0, access=ACCESS_READ))
+
+    return parse_buffer(data, views=True, event_format=event_format, keep_raw=keep_raw, stats=stats,
+                        event_filter=event_filter, errors=errors)
+
+
+def parse_buffer(data, views=False, event_format=DICT_EVENTS, keep_raw=False, stats=None, event_filter=None,
+                 errors=SKIP):
+    """
+    Parses the chunks of a MIDI file already held in memory.
+
+    :param data: bytes-like object containing the whole file
+    :param views: whether to return payloads as slices of data (see decode_track)
+    :param event_format: DICT_EVENTS, LAZY_EVENTS, TYPED_EVENTS or COLUMNAR_EVENTS
+    :param keep_raw: whether to keep the raw data of each track chunk (see process_chunk)
+    :param stats: a pymidi.stats.ParseStats to collect statistics in, if any
+    :param event_filter: a pymidi.filters.EventFilter selecting the events and tracks to parse, if any. Track chunks
+                         it leaves out are returned as None.
+    :param errors: STRICT, SKIP or LENIENT (see pymidi.errors)
+    :return: a list of chunks, as returned by parse_chunks
+    """
+    check_error_mode(errors)
+    chunks = []
+    track_number = 0
+    pos = 0
+    while pos < len(data):
+        if len(data) - pos < 8:
+            _chunk_error(ChunkError("File ended part way through a chunk header", pos), errors, stats)
+            break
+        chunk_type = bytes(data[pos:pos + 4])
+        length = int.from_bytes(data[pos + 4:pos + 8], "big")
+        start = pos + 8
+
+        if errors == LENIENT and not chunk_type.isalpha():
+            # not a chunk at all: carry on from the next header or track chunk
+            resync = next_chunk(data, pos)
+            resync = len(data) if resync is None else resync
+            _chunk_error(ChunkError("Found {} bytes that are not a chunk".format(resync - pos), pos), errors,
+                         stats, resync - pos)
+            pos = resync
+            continue
+
+        pos = start + length
+        if pos > len(data) and errors != SKIP:
+            error = ChunkError("{} chunk of {} bytes overruns the end of the file by {} bytes".format(
+                chunk_type.decode("latin-1"), length, pos - len(data)), start - 8)
+            _chunk_error(error, errors, stats)
+            # take the chunk up to the next header or track chunk, if there is one, else up to the end of the file
+            resync = next_chunk(data, start - 1)
+            pos = len(data) if resync is None else resync
+
+        if chunk_type == TRACK_TYPE and event_filter is not None and not event_filter.matches_track(track_number):
+            chunks.append(None)
+        else:
+            chunks.append(process_chunk(chunk_type, length, data[start:pos], views, event_format, keep_raw, stats,
+                                        event_filter, errors))
+        track_number += chunk_type == TRACK_TYPE
+
+    return chunks
+
+
+def iter_chunks(f, buffer_size=READ_BUFFER_SIZE, event_format=DICT_EVENTS):
+    """
+    Generator version of parse_chunks, yielding each chunk as soon as it
+    is reached rather than building a list of every chunk in the file.
+
+    Track chunks are yielded with a TrackStream as their "events", which
+    decodes events from f as it is iterated over. It must be used before
+    the next chunk is requested: any events not iterated over by then are
+    skipped.
+
+    :param f: a file object opened in binary mode
+    :param buffer_size: the number of bytes to read from f at a time
+    :param event_format: DICT_EVENTS, LAZY_EVENTS or TYPED_EVENTS
+    """
+    build = _event_builder(event_format)
+    if build is None:
+        raise Exception("Track chunks cannot be streamed as {} events".format(event_format))
+    chunk_type = f.read(4)
+    while chunk_type:
+        length = int.from_bytes(f.read(4), "big")
+
+        if chunk_type == TRACK_TYPE:
+            log.info("Streaming Track Chunk...")
+            events = TrackStream(f, length, buffer_size, build)
+            yield {
+                "type": TRACK,
+                "events": events
+            }
+            events.close()
+        elif chunk_type == HEADER_TYPE:
+            yield process_chunk(chunk_type, length, f.read(length))
+        else:
+            log.warning("Found unknown chunk type {}, skipping...".format(chunk_type))
+            _skip(f, length, buffer_size)
+            yield None
+
+        chunk_type = f.read(4)
+
+
+def iter_track_events(f, buffer_size=READ_BUFFER_SIZE):
+    """
+    Yields the header chunk of a file, then a (track number, delta, event)
+    tuple for each event of each track chunk as it is decoded. Tracks are
+    numbered from 0, in the order they appear in the file.
+
+    :param f: a file object opened in binary mode
+    :param buffer_size: the number of bytes to read from f at a time
+    """
+    track = 0
+    for chunk in iter_chunks(f, buffer_size):
+        if chunk is None:
+            continue
+        if chunk["type"] == HEADER:
+            yield chunk
+            continue
+
+        for delta, event in chunk["events"]:
+            yield track, delta, event
+        track += 1
+
+
+def index_chunks(f):
+    """
+    Builds a table of contents of the chunks of a file, by reading each
+    chunk's type and length and hopping over its data without decoding it.
+
+    :param f: a file object opened in binary mode, positioned at the start of the file. Offsets in streams that
+              cannot seek, such as pipes, are counted from where reading started.
+    :return: a list of (chunk type, offset of the chunk's data, length) tuples
+    """
+    index = []
+    seekable = f.seekable()
+    # pipes support neither seek() nor tell()
+    offset = f.tell() if seekable else 0
+    chunk_type = f.read(4)
+    while chunk_type:
+        length = int.from_bytes(f.read(4), "big")
+        offset += 8
+        index.append((chunk_type, offset, length))
+        if seekable:
+            f.seek(length, os.SEEK_CUR)
+        else:
+            _skip(f, length, READ_BUFFER_SIZE)
+        offset += length
+        chunk_type = f.read(4)
+
+    return index
+
+
+def index_buffer(data):
+    """
+    index_chunks for a file already held in memory.
+    """
+    index = []
+    pos = 0
+    while pos < len(data):
+        length = int.from_bytes(data[pos + 4:pos + 8], "big")
+        index.append((bytes(data[pos:pos + 4]), pos + 8, length))
+        pos += 8 + length
+
+    return index
+
+
+def track_entries(index):
+    """
+    Returns the entries of a chunk index for track chunks, so that
+    track_entries(index)[n] locates track n (numbered from 0).
+    """
+    return [entry for entry in index if entry[0] == TRACK_TYPE]
+
+
+def numbered_tracks(chunks):
+    """
+    Returns a (track number, chunk) pair for each track chunk of a parsed
+    file, numbering tracks from 0 by their place in the file. Chunks parsed
+    as None (under SKIP, tracks that failed to parse, or chunks of unknown
+    types) are counted, so that one bad track does not renumber the rest.
+    """
+    tracks = []
+    number = 0
+    for chunk in chunks:
+        if chunk is None or chunk["type"] == TRACK:
+            if chunk is not None:
+                tracks.append((number, chunk))
+            number += 1
+    return tracks
+
+
+def read_track(f, index, track_number, event_format=DICT_EVENTS):
+    """
+    Decodes a single track chunk of a file, using an index built by
+    index_chunks to seek straight to it.
+
+    :param f: a seekable file object opened in binary mode
+    :param index: the file's chunk index
+    :param track_number: the track to decode, numbered from 0 in file order
+    :param event_format: DICT_EVENTS, LAZY_EVENTS, TYPED_EVENTS or COLUMNAR_EVENTS
+    :return: the track chunk, as returned by process_track_chunk
+    """
+    tracks = track_entries(index)
+    if not 0 <= track_number < len(tracks):
+        raise Exception("Track {} requested, but the file has {} tracks".format(track_number, len(tracks)))
+
+    _, offset, length = tracks[track_number]
+    f.seek(offset)
+    data = f.read(length)
+    if len(data) != length:
+        raise ChunkError("File ended part way through track {}".format(track_number))
+
+    return process_track_chunk(data, event_format=event_format)
+
+
+def _skip(f, length, buffer_size):
+    while length:
+        skipped = len(f.read(min(length, buffer_size)))
+        if not skipped:
+            raise ChunkError("File ended part way through a chunk")
+        length -= skipped
+
+
+def _chunk_error(error, errors, stats, skipped=0):
+    if stats is not None:
+        stats.record_error(error, skipped)
+    if errors == STRICT:
+        raise error
+    log.error("Error reading chunks: {}".format(error))
+
+
+def _event_builder(event_format):
+    if event_format == COLUMNAR_EVENTS:
         return None
+    try:
+        return EVENT_BUILDERS[event_format]
+    except KeyError:
+        raise Exception("Unrecognised event format {}".format(event_format))
+
+
+def process_chunk(type, length, raw_data, views=False, event_format=DICT_EVENTS, keep_raw=False, stats=None,
+                  event_filter=None, errors=SKIP):
+    """
+    :param keep_raw: whether to keep the raw data of track chunks as their "raw", so that pymidi.writer can write
+                     them back out by copying it. Anything editing the events of such a chunk must delete its "raw".
+                     The raw data of filtered track chunks is never kept, as it holds events they do not, and
+                     nor is that of track chunks with events skipped over as malformed.
+    :param stats: a pymidi.stats.ParseStats to record the chunk in, if any
+    :param event_filter: a pymidi.filters.EventFilter selecting the events of track chunks to parse, if any
+    :param errors: what to do if a track chunk is malformed: STRICT raises the error, SKIP returns None, and LENIENT
+                   skips over malformed events, keeping the rest (see pymidi.errors). Malformed header chunks raise
+                   a HeaderError in every mode.
+    """
+    start = time.perf_counter() if stats is not None else None
+    if type == TRACK_TYPE:
+        _event_builder(event_format)
+
+    chunk = None
+    # errors in the chunk, logged and recorded as they happen
+    failures = []
+
+    def on_error(error, skipped=0):
+        log.error("Error processing Track chunk: {}".format(error))
+        failures.append(error)
+        if stats is not None:
+            stats.record_error(error, skipped)
+
+    try:
+        if type == HEADER_TYPE:
+            chunk = process_header_chunk(length, BitArray(bytes=raw_data))
+        elif type == TRACK_TYPE:
+            chunk = process_track_chunk(raw_data, views, event_format, stats, event_filter,
+                                        on_error if errors == LENIENT else None)
+            if keep_raw and event_filter is None and not failures:
+                chunk["raw"] = raw_data
+        else:
+            log.warning("Found unknown chunk type {}, skipping...".format(type))
+    except Exception as e:
+        if errors == STRICT or type == HEADER_TYPE:
+            if stats is not None:
+                stats.record_error(e)
+            raise
+        on_error(e)
+        chunk = None
+
+    if stats is not None:
+        stats.record_chunk(chunk["type"] if chunk else bytes(type).decode("latin-1"), length,
+                           time.perf_counter() - start, len(chunk["events"]) if chunk and chunk["type"] == TRACK else 0,
+                           str(failures[0]) if failures else None)
+    return chunk
 
 
 def process_header_chunk(length, data):
     log.info("Parsing header chunk...")
     if length != 6:
-        raise Exception("Expected 6 byte length for Header chunk, found {} bytes.".format(length))
+        raise HeaderError("Expected 6 byte length for Header chunk, found {} bytes.".format(length))
+    if len(data) != 48:
+        raise HeaderError("File ended {} bytes into the Header chunk".format(len(data) // 8))
     format_ = data[:16].int
     # Format 0: a single track
     # Format 1: one or more simultaneous tracks. Normally first Track chunk here is special, and contains
     # all the tempo information in a 'Tempo Map'
     # Format 2: one or more independent tracks
     if format_ not in [0, 1, 2]:
-        log.error("Unrecognised format: {}\n Exiting...".format(format_))
-        exit(1)
+        raise HeaderError("Unrecognised format: {}".format(format_))
 
     division = data[-16:]
 
@@ -70,16 +408,16 @@ def process_header_chunk(length, data):
         # bits 0-14 represent number of delta time units in each quarter-note
         division = {
             "format": "time units per quarter note",
-            "time_units": division[1:].int
+            "time_units": division[1:].uint
         }
     else:
-        # TODO need to test this bit
         # bits 0-7 represent number of delta time units per SMTPE frame
-        # bits 8-14 make a negative number, representing number of SMTPE frames per second
+        # bits 8-15 make a negative number, representing number of SMTPE frames per second (24, 25, 29 or 30,
+        # where 29 stands for 30 drop frame, i.e. 29.97)
         division = {
             "format": "SMTPE",
-            "time_units_per_frame": division[-8:].int,
-            "frames_per_second": division[1:-8]
+            "time_units_per_frame": division[-8:].uint,
+            "frames_per_second": -division[:8].int
         }
 
     return {
@@ -90,26 +428,69 @@ def process_header_chunk(length, data):
     }
 
 
-def process_track_chunk(data):
+def process_track_chunk(data, views=False, event_format=DICT_EVENTS, stats=None, event_filter=None, on_error=None):
+    """
+    :param stats: a pymidi.stats.ParseStats to count the chunk's events in, if any
+    :param event_filter: a pymidi.filters.EventFilter selecting the events to parse, if any. Events it leaves out
+                         are skipped over without being built, and the delta of each event kept counts from the
+                         previous event kept.
+    :param on_error: if given, malformed events are skipped over instead of raising, carrying on from the next status
+                     byte (see pymidi.decoder.recover_track), and this is called with each error and the number of
+                     bytes skipped because of it
+    """
     log.info("Parsing Track Chunk...")
 
-    events = []
-    running_status = None
-    while len(data) > 0:
-        data, delta = variable_length_field(data)
-        prefix = data[:8]
-        if prefix == F0_SYSEX_EVENT_PREFIX or prefix == F7_SYSEX_EVENT_PREFIX:
-            data, event = process_sysex_event(prefix, data[8:])
-            events.append((delta, event))
-        elif prefix == META_EVENT_PREFIX:
-            data, event = process_meta_event(data[8:])
-            events.append((delta, event))
+    if isinstance(data, BitArray):
+        data = data.bytes
+
+    keep = None if event_filter is None else event_filter.keeps
+    counting = stats is not None and stats.count_events
+
+    if event_format == COLUMNAR_EVENTS:
+        from pymidi.columnar import decode_columns, from_fields
+        if on_error is not None:
+            from pymidi.filters import raw_fields
+            track = from_fields(recover_track(data, build=raw_fields, keep=keep, on_error=on_error))
+        elif event_filter is None:
+            track = decode_columns(data)
         else:
-            data, event, running_status = process_midi_event(data, running_status)
-            events.append((delta, event))
+            from pymidi.filters import filter_track, raw_fields
+            track = from_fields(filter_track(data, event_filter, build=raw_fields))
+        track["type"] = TRACK
+        if counting:
+            stats.count_columns(track)
+        return track
+
+    if event_format == LAZY_EVENTS and not counting and event_filter is None and on_error is None:
+        # events refer to their payloads in data rather than slicing them out. decode_lazy checks for the End of
+        # Track event itself.
+        return {
+            "type": TRACK,
+            "events": decode_lazy(data, views=views)
+        }
+
+    build = _event_builder(event_format)
+    if counting:
+        build = stats.counting(build)
+    if on_error is not None:
+        return {
+            "type": TRACK,
+            "events": recover_track(data, views=views, build=build, keep=keep, on_error=on_error)
+        }
+    if event_filter is not None:
+        from pymidi.filters import filter_track
+        # the End of Track event may have been filtered out, but filter_track checks that the track has one
+        return {
+            "type": TRACK,
+            "events": filter_track(data, event_filter, views=views, build=build)
+        }
+    events = decode_track(data, views=views, build=build)
 
-    if events[-1][1]["sub_type"] != "End of Track":
-        raise Exception("End of Track event missing")
+    last_event = events[-1] if events else None
+    if event_format != TYPED_EVENTS and last_event:
+        last_event = last_event[1]
+    if not last_event or last_event["sub_type"] != "End of Track":
+        raise TrackError("End of Track event missing")
 
     return {
         "type": TRACK,
@@ -1,8 +1,13 @@
+import io
+import os
+import subprocess
+import sys
 import unittest
 
 from bitstring import BitArray
 
-from pymidi.chunks import parse_chunks, process_header_chunk, process_track_chunk, HEADER, TRACK
+from pymidi.chunks import parse_chunks, process_header_chunk, process_track_chunk, iter_chunks, iter_track_events, \
+    parse_file, parse_buffer, index_chunks, index_buffer, track_entries, read_track, HEADER, TRACK, TYPED_EVENTS
 from pymidi.events import META, MIDI
 
 FORMAT_0_EXAMPLE = "data/format_0_example_1.mid"
@@ -98,6 +103,17 @@ class ChunksTest(unittest.TestCase):
         self.assertEqual(division["format"], "time units per quarter note")
         self.assertEqual(division["time_units"], 96)
 
+    def test_header_parsing_parses_smtpe_division_correctly(self):
+        input = BitArray("0x00010004E728")
+
+        header = process_header_chunk(6, input)
+
+        division = header["division"]
+
+        self.assertEqual(division["format"], "SMTPE")
+        self.assertEqual(division["frames_per_second"], 25)
+        self.assertEqual(division["time_units_per_frame"], 40)
+
     def test_header_parsing_raises_exception_if_length_is_not_6(self):
         input = BitArray("0x000000010060")
 
@@ -225,6 +241,136 @@ class ChunksTest(unittest.TestCase):
         self.assertEqual(event["note"], 60)
         self.assertEqual(event["velocity"], 96)
 
+    def test_iterating_chunks_yields_same_chunks_as_parsing(self):
+        with open(FORMAT_1_EXAMPLE, "rb") as f:
+            expected = parse_chunks(f)
+
+        with open(FORMAT_1_EXAMPLE, "rb") as f:
+            chunks = []
+            for chunk in iter_chunks(f, buffer_size=3):
+                if chunk["type"] == TRACK:
+                    chunk = {"type": TRACK, "events": list(chunk["events"])}
+                chunks.append(chunk)
+
+        self.assertEqual(chunks, expected)
+
+    def test_iterating_chunks_skips_events_that_are_not_iterated_over(self):
+        with open(FORMAT_1_EXAMPLE, "rb") as f:
+            expected = parse_chunks(f)
+
+        with open(FORMAT_1_EXAMPLE, "rb") as f:
+            first_events = []
+            for chunk in iter_chunks(f, buffer_size=4):
+                if chunk["type"] == TRACK:
+                    first_events.append(next(iter(chunk["events"])))
+
+        self.assertEqual(first_events, [chunk["events"][0] for chunk in expected[1:]])
+
+    def test_iterating_chunks_streams_large_sysex_events(self):
+        payload = bytes(range(128)) * 1000
+        track = b"\x00\xf0\x87\xe8\x00" + payload + b"\x00\xff\x2f\x00"
+        data = b"MThd\x00\x00\x00\x06\x00\x00\x00\x01\x00\x60MTrk" + len(track).to_bytes(4, "big") + track
+
+        chunks = iter_chunks(io.BytesIO(data), buffer_size=16)
+        next(chunks)
+        events = list(next(chunks)["events"])
+
+        self.assertEqual(len(events), 2)
+        self.assertEqual(events[0][1]["data"].bytes, payload)
+
+    def test_iterating_chunks_raises_exception_if_end_of_track_event_missing(self):
+        track = b"\x00\xc0\x05"
+        data = b"MTrk" + len(track).to_bytes(4, "big") + track
+
+        chunk = next(iter_chunks(io.BytesIO(data)))
+
+        self.assertRaises(Exception, list, chunk["events"])
+
+    def test_iterating_track_events_yields_header_then_numbered_events(self):
+        with open(FORMAT_1_EXAMPLE, "rb") as f:
+            items = list(iter_track_events(f))
+
+        self.assertEqual(items[0]["type"], HEADER)
+        self.assertEqual(len(items), 1 + 3 + 4 + 4 + 6)
+        self.assertEqual(items[1][0], 0)
+        self.assertEqual(items[-1][0], 3)
+        self.assertEqual(items[-1][2]["sub_type"], "End of Track")
+
+    def test_parsing_file_with_mmap_matches_parsing_file_object(self):
+        for path in [FORMAT_0_EXAMPLE, FORMAT_1_EXAMPLE]:
+            with open(path, "rb") as f:
+                expected = parse_chunks(f)
+
+            chunks = parse_file(path, mmap=True)
+
+            self.assertEqual(len(chunks), len(expected))
+            self.assertEqual(chunks[0], expected[0])
+            for chunk, expected_chunk in zip(chunks[1:], expected[1:]):
+                for (delta, event), (expected_delta, expected_event) in zip(chunk["events"], expected_chunk["events"]):
+                    self.assertEqual(delta, expected_delta)
+                    if event["type"] == META:
+                        self.assertIsInstance(event["data"], memoryview)
+                        event = dict(event, data=BitArray(bytes=event["data"]))
+                    self.assertEqual(event, expected_event)
+
+    def test_parsing_file_without_mmap_matches_parsing_file_object(self):
+        with open(FORMAT_1_EXAMPLE, "rb") as f:
+            expected = parse_chunks(f)
+
+        self.assertEqual(parse_file(FORMAT_1_EXAMPLE), expected)
+
+    def test_parsing_buffer_with_views_does_not_copy_payloads(self):
+        track = b"\x00\xff\x03\x04Name\x00\xf0\x02\x43\x12\x00\xff\x2f\x00"
+        data = memoryview(b"MTrk" + len(track).to_bytes(4, "big") + track)
+
+        events = parse_buffer(data, views=True)[0]["events"]
+
+        self.assertEqual(bytes(events[0][1]["text"]), b"Name")
+        self.assertIs(events[0][1]["text"].obj, data.obj)
+        self.assertEqual(bytes(events[1][1]["data"]), b"\x43\x12")
+        self.assertIs(events[1][1]["data"].obj, data.obj)
+
+    def test_indexing_chunks_locates_every_chunk_without_decoding(self):
+        with open(FORMAT_1_EXAMPLE, "rb") as f:
+            index = index_chunks(f)
+
+        self.assertEqual(index, [(b"MThd", 8, 6), (b"MTrk", 22, 20), (b"MTrk", 50, 16), (b"MTrk", 74, 15),
+                                 (b"MTrk", 97, 21)])
+
+    def test_indexing_unseekable_stream_and_buffer_matches_indexing_file(self):
+        with open(FORMAT_1_EXAMPLE, "rb") as f:
+            data = f.read()
+            f.seek(0)
+            expected = index_chunks(f)
+
+        read_end, write_end = os.pipe()
+        with os.fdopen(write_end, "wb") as pipe:
+            pipe.write(data)
+        with os.fdopen(read_end, "rb") as pipe:
+            self.assertEqual(index_chunks(pipe), expected)
+        self.assertEqual(index_buffer(memoryview(data)), expected)
+
+    def test_reading_single_track_with_index(self):
+        with open(FORMAT_1_EXAMPLE, "rb") as f:
+            expected = parse_chunks(f)
+
+        with open(FORMAT_1_EXAMPLE, "rb") as f:
+            index = index_chunks(f)
+            self.assertEqual(len(track_entries(index)), 4)
+            self.assertEqual(read_track(f, index, 2), expected[3])
+            self.assertEqual(read_track(f, index, 0, TYPED_EVENTS)["events"][1].tempo, 500000)
+            self.assertRaises(Exception, read_track, f, index, 4)
+
+    def test_parsing_without_numpy(self):
+        # numpy is optional for every event format but columnar
+        script = "import sys; sys.modules['numpy'] = None\n" \
+                 "from pymidi.chunks import parse_file, LAZY_EVENTS\n" \
+                 "from pymidi.filters import EventFilter\n" \
+                 "parse_file({!r}, event_format=LAZY_EVENTS, event_filter=EventFilter(types={{'MIDI'}}))\n" \
+                 .format(FORMAT_1_EXAMPLE)
+        result = subprocess.run([sys.executable, "-c", script], stderr=subprocess.PIPE)
+        self.assertEqual(result.returncode, 0, result.stderr.decode())
+
 
 if __name__ == "__main__":
     unittest.main()
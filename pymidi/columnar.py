@@ -0,0 +1,204 @@
+"""
+Columnar decoding of track chunks into NumPy arrays.
+
+A columnar track holds one row per event in a structured array, with the
+raw status and data bytes of each event rather than a decoded dict, so
+that filtering, transposition and statistics can be done with vectorised
+NumPy operations. Meta and Sysex payloads are concatenated into a single
+bytes blob, indexed through payload_offsets.
+"""
+from array import array
+
+import numpy as np
+
+from pymidi.decoder import check_meta_length, read_event, META_STATUS, END_OF_TRACK
+from pymidi.errors import TrackError
+
+# delta:   delta time of the event, in ticks
+# tick:    absolute time of the event, in ticks from the start of the track
+# status:  status byte of the event: 0x80-0xEF for channel messages (including the channel), 0xFF for meta events,
+#          0xF0/0xF7 for Sysex events. Running status is expanded, and Note On events with velocity 0 are kept as is.
+# channel: 1 - 16 for channel messages, 0 for meta and Sysex events
+# data1:   first data byte (note, controller, program...), or the meta type of meta events
+# data2:   second data byte (velocity, value...), or 0 if the event does not have one
+# payload: index of the event's payload for meta and Sysex events, otherwise -1
+EVENT_DTYPE = np.dtype([
+    ("delta", np.uint32),
+    ("tick", np.uint64),
+    ("status", np.uint8),
+    ("channel", np.uint8),
+    ("data1", np.uint8),
+    ("data2", np.uint8),
+    ("payload", np.int32),
+])
+
+
+def decode_columns(data, pos=0, end=None):
+    """
+    Decodes a track chunk into columns. Payloads are not decoded, but meta
+    events of the wrong length for their type raise, as for event dicts.
+
+    :param data: bytes-like object containing the track data
+    :param pos: offset of the first event within data
+    :param end: offset one past the last byte of the track (defaults to len(data))
+    :return: a dict with the EVENT_DTYPE structured array of events, "payload_offsets", an array giving the start
+             of each payload within "payloads" (and the end of the last one) and "payloads", the payload blob
+    """
+    if end is None:
+        end = len(data)
+
+    deltas = array("L")
+    statuses = array("B")
+    data1s = array("B")
+    data2s = array("B")
+    payload_indices = array("l")
+    payload_offsets = array("q", [0])
+    payloads = bytearray()
+
+    running_status = None
+    status = data1 = None
+    try:
+        while pos < end:
+            pos, delta, status, data1, data2, payload = read_event(data, pos, running_status)
+            deltas.append(delta)
+            statuses.append(status)
+            if status < 0xF0:
+                running_status = status
+                data1s.append(data1)
+                data2s.append(data2 or 0)
+                payload_indices.append(-1)
+            else:
+                if status == META_STATUS:
+                    check_meta_length(data1, len(payload))
+                data1s.append(data1 or 0)
+                data2s.append(0)
+                payload_indices.append(len(payload_offsets) - 1)
+                payloads += payload
+                payload_offsets.append(len(payloads))
+    except IndexError:
+        raise TrackError("Track data ended part way through an event")
+
+    if pos > end:
+        raise TrackError("Last event overruns the end of the track by {} bytes".format(pos - end))
+    if status != META_STATUS or data1 != END_OF_TRACK:
+        raise TrackError("End of Track event missing")
+
+    return _columns(deltas, statuses, data1s, data2s, payload_indices, payload_offsets, payloads)
+
+
+def from_fields(fields):
+    """
+    Builds a columnar track from the raw (delta, status, data1, data2,
+    payload) fields of its events, as read by read_event.
+    """
+    deltas = array("L")
+    statuses = array("B")
+    data1s = array("B")
+    data2s = array("B")
+    payload_indices = array("l")
+    payload_offsets = array("q", [0])
+    payloads = bytearray()
+
+    for delta, status, data1, data2, payload in fields:
+        deltas.append(delta)
+        statuses.append(status)
+        data1s.append(data1 or 0)
+        data2s.append(data2 or 0)
+        if payload is None:
+            payload_indices.append(-1)
+        else:
+            payload_indices.append(len(payload_offsets) - 1)
+            payloads += payload
+            payload_offsets.append(len(payloads))
+
+    return _columns(deltas, statuses, data1s, data2s, payload_indices, payload_offsets, payloads)
+
+
+def _columns(deltas, statuses, data1s, data2s, payload_indices, payload_offsets, payloads):
+    events = np.empty(len(deltas), dtype=EVENT_DTYPE)
+    events["delta"] = np.frombuffer(deltas, dtype=deltas.typecode)
+    np.cumsum(events["delta"], dtype=np.uint64, out=events["tick"])
+    events["status"] = np.frombuffer(statuses, dtype=np.uint8)
+    events["channel"] = np.where(events["status"] < 0xF0, (events["status"] & 0x0F) + 1, 0)
+    events["data1"] = np.frombuffer(data1s, dtype=np.uint8)
+    events["data2"] = np.frombuffer(data2s, dtype=np.uint8)
+    events["payload"] = np.frombuffer(payload_indices, dtype=payload_indices.typecode)
+
+    return {
+        "events": events,
+        "payload_offsets": np.frombuffer(payload_offsets, dtype=np.int64),
+        "payloads": bytes(payloads),
+    }
+
+
+def payload(track, event):
+    """
+    Returns the payload of a meta or Sysex event of a columnar track, as a
+    memoryview into the track's payload blob.
+
+    :param track: a columnar track chunk
+    :param event: a row of track["events"]
+    """
+    index = event["payload"]
+    if index < 0:
+        raise Exception("Event has no payload")
+    offsets = track["payload_offsets"]
+    return memoryview(track["payloads"])[offsets[index]:offsets[index + 1]]
+
+
+def to_events(track, build):
+    """
+    Rebuilds the events of a columnar track in another format.
+
+    :param track: a columnar track chunk
+    :param build: a function building an event from its raw fields, e.g. pymidi.decoder.build_event_item
+    :return: a list of events, as returned by pymidi.decoder.decode_track
+    """
+    events = track["events"]
+    offsets = track["payload_offsets"].tolist()
+    payloads = track["payloads"]
+    return [build(delta, status, data1, data2, payloads[offsets[index]:offsets[index + 1]] if index >= 0 else None,
+                  False)
+            for delta, status, data1, data2, index in zip(events["delta"].tolist(), events["status"].tolist(),
+                                                           events["data1"].tolist(), events["data2"].tolist(),
+                                                           events["payload"].tolist())]
+
+
+def message_type(events):
+    # high nibble of the status byte of channel messages, 0xF for meta and Sysex events
+    return events["status"] >> 4
+
+
+def note_on_mask(events):
+    return (message_type(events) == 0x9) & (events["data2"] > 0)
+
+
+def note_off_mask(events):
+    message_types = message_type(events)
+    return (message_types == 0x8) | ((message_types == 0x9) & (events["data2"] == 0))
+
+
+def channel_mask(events, channels):
+    """
+    :param channels: an iterable of channels, numbered 1 - 16
+    """
+    return np.isin(events["channel"], list(channels))
+
+
+def transpose(events, semitones):
+    """
+    Returns a copy of events with the notes of Note On, Note Off and
+    Polyphonic Key Pressure events moved by semitones, clipped to 0 - 127.
+    """
+    transposed = events.copy()
+    message_types = message_type(events)
+    notes = (message_types >= 0x8) & (message_types <= 0xA)
+    transposed["data1"][notes] = np.clip(events["data1"][notes].astype(np.int16) + semitones, 0, 127)
+    return transposed
+
+
+def pitch_histogram(events):
+    """
+    Returns the number of Note On events for each of the 128 MIDI notes.
+    """
+    return np.bincount(events["data1"][note_on_mask(events)], minlength=128)
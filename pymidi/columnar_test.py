@@ -0,0 +1,70 @@
+import unittest
+
+import numpy as np
+
+from pymidi.chunks import parse_chunks, parse_file, COLUMNAR_EVENTS, TRACK
+from pymidi.columnar import decode_columns, payload, note_on_mask, note_off_mask, channel_mask, transpose, \
+    pitch_histogram
+
+FORMAT_0_EXAMPLE = "data/format_0_example_1.mid"
+
+
+class ColumnarTest(unittest.TestCase):
+
+    def test_decoding_columns_expands_running_status_and_absolute_ticks(self):
+        track = decode_columns(bytes.fromhex("0092306060300000FF0102414200C20500FF2F00"))
+        events = track["events"]
+
+        self.assertEqual(list(events["delta"]), [0, 0x60, 0, 0, 0])
+        self.assertEqual(list(events["tick"]), [0, 0x60, 0x60, 0x60, 0x60])
+        self.assertEqual(list(events["status"]), [0x92, 0x92, 0xFF, 0xC2, 0xFF])
+        self.assertEqual(list(events["channel"]), [3, 3, 0, 3, 0])
+        self.assertEqual(list(events["data1"]), [0x30, 0x30, 0x01, 0x05, 0x2F])
+        self.assertEqual(list(events["data2"]), [0x60, 0, 0, 0, 0])
+        self.assertEqual(list(events["payload"]), [-1, -1, 0, -1, 1])
+
+    def test_payloads_are_stored_in_a_single_blob(self):
+        track = decode_columns(bytes.fromhex("00FF01024142 00F003431200 00FF2F00"))
+
+        self.assertEqual(track["payloads"], b"\x41\x42\x43\x12\x00")
+        self.assertEqual(list(track["payload_offsets"]), [0, 2, 5, 5])
+        self.assertEqual(bytes(payload(track, track["events"][1])), b"\x43\x12\x00")
+        self.assertEqual(bytes(payload(track, track["events"][2])), b"")
+
+    def test_decoding_columns_raises_exception_if_end_of_track_event_missing(self):
+        self.assertRaises(Exception, decode_columns, bytes.fromhex("00C005"))
+
+    def test_parsing_with_columnar_events(self):
+        with open(FORMAT_0_EXAMPLE, "rb") as f:
+            expected = parse_chunks(f)
+
+        chunks = parse_file(FORMAT_0_EXAMPLE, mmap=True, event_format=COLUMNAR_EVENTS)
+        events = chunks[1]["events"]
+
+        self.assertEqual(chunks[1]["type"], TRACK)
+        self.assertEqual(len(events), len(expected[1]["events"]))
+        self.assertEqual(list(events["delta"]), [delta for delta, _ in expected[1]["events"]])
+        self.assertEqual(int(note_on_mask(events).sum()),
+                         len([e for _, e in expected[1]["events"] if e["sub_type"] == "Note On"]))
+        self.assertEqual(int(note_off_mask(events).sum()),
+                         len([e for _, e in expected[1]["events"] if e["sub_type"] == "Note Off"]))
+
+    def test_vectorised_filtering_transposition_and_statistics(self):
+        events = decode_columns(bytes.fromhex("0090306000913C6000C10500803000 00FF2F00"))["events"]
+
+        self.assertEqual(list(channel_mask(events, [1])), [True, False, False, True, False])
+
+        transposed = transpose(events, 12)
+        self.assertEqual(list(transposed["data1"]), [0x3C, 0x48, 0x05, 0x3C, 0x2F])
+        self.assertEqual(list(events["data1"]), [0x30, 0x3C, 0x05, 0x30, 0x2F])
+        self.assertEqual(list(transpose(events, 100)["data1"][:2]), [127, 127])
+
+        histogram = pitch_histogram(events)
+        self.assertEqual(histogram.shape, (128,))
+        self.assertEqual(histogram[0x30], 1)
+        self.assertEqual(histogram[0x3C], 1)
+        self.assertEqual(int(np.sum(histogram)), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,505 @@
+import logging
+import sys
+
+from bitstring import BitArray
+
+from pymidi.errors import next_event, ChunkError, EventLengthError, MidiError, TrackError
+from pymidi.events import META, MIDI, SYSEX
+from pymidi.vlq import read_vlq
+
+log = logging.getLogger(__name__)
+log.setLevel("INFO")
+handler = logging.StreamHandler(stream=sys.stderr)
+handler.setFormatter(logging.Formatter(fmt="%(asctime)s %(levelname)s %(message)s",
+                                       datefmt="%Y-%m-%d %H:%M:%S"))
+log.addHandler(handler)
+
+
+# default number of bytes read from a file at a time when streaming a track chunk
+READ_BUFFER_SIZE = 64 * 1024
+
+META_STATUS = 0xFF
+F0_SYSEX_STATUS = 0xF0
+F7_SYSEX_STATUS = 0xF7
+END_OF_TRACK = 0x2F
+
+# number of data bytes following each channel message status, indexed by the high nibble of the status byte
+MIDI_DATA_LENGTHS = (None, None, None, None, None, None, None, None, 2, 2, 2, 2, 1, 1, 2, None)
+
+TEXT_META_TYPES = {
+    0x01: "Text Event",
+    0x02: "Copyright Notice",
+    0x03: "Sequence/Track Name",
+    0x04: "Instrument Name",
+    0x05: "Lyric",
+    0x06: "Marker",
+    0x07: "Cue Point",
+}
+
+# sub types of the meta events with their own event dicts, by meta type
+META_TYPE_NAMES = dict(TEXT_META_TYPES)
+META_TYPE_NAMES.update({
+    0x00: "Sequence Number",
+    0x20: "MIDI Channel Prefix",
+    0x21: "MIDI Prefix Port",
+    END_OF_TRACK: "End of Track",
+    0x51: "Set Tempo",
+    0x54: "SMTPE Offset",
+    0x58: "Time Signature",
+    0x59: "Key Signature",
+    0x7F: "Sequencer-Specific Meta-event",
+})
+
+# payload lengths of the meta events with a fixed one, by meta type
+META_LENGTHS = {
+    0x20: 1,
+    0x21: 1,
+    END_OF_TRACK: 0,
+    0x51: 3,
+    0x54: 5,
+    0x58: 4,
+    0x59: 2,
+}
+
+CHANNEL_MODE_MESSAGES = {
+    0x78: "All Sound Off",
+    0x79: "Reset All Controllers",
+    0x7A: "Local Control",
+    0x7B: "All Notes Off",
+    0x7C: "Omni Mode Off",
+    0x7D: "Omni Mode On",
+    0x7E: "Mono Mode On",
+    0x7F: "Poly Mode On",
+}
+
+# sub types of channel messages, indexed by the high nibble of the status byte
+_CHANNEL_MESSAGE_NAMES = (None, None, None, None, None, None, None, None, "Note Off", "Note On",
+                          "Polyphonic Key Pressure", "Controller Change", "Program Change", "Channel Key Pressure",
+                          "Pitch Bend", None)
+
+
+def decode_track(data, pos=0, end=None, views=False, build=None):
+    """
+    Decodes the events of a track chunk held in a bytes-like object, walking
+    it with an integer cursor rather than slicing off the remainder after
+    each event, so that decoding is linear in the length of the track.
+
+    With views=True, the "data", "text" and "sequence_number" payloads of
+    meta and Sysex events are left as slices of data rather than copied into
+    BitArrays/bytes, so decoding a memoryview never copies its payloads.
+
+    :param data: bytes, bytearray or memoryview containing the track data
+    :param pos: offset of the first event within data
+    :param end: offset one past the last byte of the track (defaults to len(data))
+    :param views: whether to return payloads as slices of data
+    :param build: function building each item of the list from the raw fields of an event, taking the same
+                  arguments as build_event_item (the default)
+    :return: a list of (delta, event) tuples, or of whatever build returns
+    """
+    if end is None:
+        end = len(data)
+    if build is None:
+        build = build_event_item
+
+    events = []
+    append = events.append
+    running_status = None
+    try:
+        while pos < end:
+            pos, delta, status, data1, data2, payload = read_event(data, pos, running_status)
+            if status < 0xF0:
+                running_status = status
+            append(build(delta, status, data1, data2, payload, views))
+    except IndexError:
+        raise TrackError("Track data ended part way through an event")
+
+    if pos > end:
+        raise TrackError("Last event overruns the end of the track by {} bytes".format(pos - end))
+
+    return events
+
+
+def recover_track(data, pos=0, end=None, views=False, build=None, keep=None, on_error=None):
+    """
+    decode_track for malformed track data, skipping events that cannot be
+    decoded rather than raising. An event whose payload build rejects is
+    skipped by its length, its delta carried over to the next event, but
+    after one that cannot be read at all decoding carries on from the next
+    status byte following a one byte delta, and the deltas of the bytes in
+    between are lost. A missing End of Track event is reported too.
+
+    :param keep: function of the (status, data1, data2) of each event, returning whether to keep it, if any (see
+                 pymidi.filters.EventFilter.keeps). The deltas of events left out are added to the next event kept.
+    :param on_error: function called with each MidiError and the number of bytes skipped over because of it
+    :return: a list of (delta, event) tuples, or of whatever build returns, for every event that could be decoded
+    """
+    if end is None:
+        end = len(data)
+    if build is None:
+        build = build_event_item
+
+    events = []
+    append = events.append
+    running_status = None
+    status = data1 = None
+    skipped_delta = 0
+    while pos < end:
+        try:
+            new_pos, delta, status, data1, data2, payload = read_event(data, pos, running_status)
+            if new_pos > end:
+                raise TrackError("Last event overruns the end of the track by {} bytes".format(new_pos - end), pos)
+        except (IndexError, MidiError) as e:
+            # the event cannot be framed, so where the next one starts is unknown
+            error = e if isinstance(e, MidiError) else TrackError("Track data ended part way through an event", pos)
+            resync = next_event(data, pos, end)
+            if on_error is not None:
+                on_error(_at(error, pos), resync - pos)
+            pos = resync
+            running_status = status = data1 = None
+            continue
+
+        if keep is None or keep(status, data1, data2):
+            try:
+                append(build(delta + skipped_delta, status, data1, data2, payload, views))
+                skipped_delta = 0
+            except MidiError as e:
+                # e.g. a meta event of the wrong length: skip just that event
+                if on_error is not None:
+                    on_error(_at(e, pos), new_pos - pos)
+                skipped_delta += delta
+        else:
+            skipped_delta += delta
+
+        pos = new_pos
+        if status < 0xF0:
+            running_status = status
+
+    if status != META_STATUS or data1 != END_OF_TRACK:
+        if on_error is not None:
+            on_error(TrackError("End of Track event missing", end), 0)
+
+    return events
+
+
+def _at(error, pos):
+    if error.offset is None:
+        error.offset = pos
+    return error
+
+
+class TrackStream(object):
+    """
+    Iterates over the (delta, event) tuples (or items returned by build,
+    as for decode_track) of a track chunk as they are
+    read from a file object, so that only the event being decoded and a
+    read buffer are held in memory, however long the track is.
+
+    Events can only be iterated over once. close() skips whatever part of
+    the chunk has not been read yet, leaving f at the start of the next chunk.
+    """
+
+    def __init__(self, f, length, buffer_size=READ_BUFFER_SIZE, build=None):
+        self.f = f
+        self.unread = length
+        self.buffer_size = buffer_size
+        self.build = build or build_event_item
+        self._events = self._decode()
+
+    def __iter__(self):
+        return self._events
+
+    def close(self):
+        self._events.close()
+        while self.unread:
+            self._read(self.buffer_size)
+
+    def _read(self, size):
+        data = self.f.read(min(size, self.unread))
+        if not data:
+            raise ChunkError("File ended with {} bytes of the track chunk still to read".format(self.unread))
+        self.unread -= len(data)
+        return data
+
+    def _decode(self):
+        buf = b""
+        pos = 0
+        running_status = None
+        build = self.build
+        last_event = None
+        while pos < len(buf) or self.unread:
+            try:
+                new_pos, delta, status, data1, data2, payload = read_event(buf, pos, running_status)
+                if new_pos > len(buf):
+                    raise IndexError
+            except IndexError:
+                # the event continues past the end of the buffer: keep the partial event and read more,
+                # at least doubling the buffer so that large events are read in a linear number of bytes
+                if not self.unread:
+                    raise TrackError("Track data ended part way through an event")
+                buf = buf[pos:] + self._read(max(self.buffer_size, len(buf) - pos))
+                pos = 0
+                continue
+
+            pos = new_pos
+            if status < 0xF0:
+                running_status = status
+            last_event = (status, data1)
+            yield build(delta, status, data1, data2, payload, False)
+
+        if last_event != (META_STATUS, END_OF_TRACK):
+            raise TrackError("End of Track event missing")
+
+
+def read_event(data, pos, running_status=None):
+    """
+    Reads the raw fields of the event starting at data[pos], without
+    building an event object for it.
+
+    Channel messages return their full status byte (including the channel)
+    and one or two data bytes. Meta events return 0xFF as their status and
+    the meta type in data1, and Sysex events their 0xF0/0xF7 prefix; both
+    return their payload as a slice of data (a view, if data is a memoryview).
+
+    :param data: bytes-like object containing track data
+    :param pos: offset of the event's delta time
+    :param running_status: the status byte of the previous channel message, if any
+    :return: (new pos, delta, status, data1, data2, payload)
+    """
+    byte = data[pos]
+    pos += 1
+    delta = byte & 0x7F
+    while byte & 0x80:
+        byte = data[pos]
+        pos += 1
+        delta = (delta << 7) | (byte & 0x7F)
+
+    status = data[pos]
+    if status == META_STATUS:
+        meta_type = data[pos + 1]
+        length, pos = read_vlq(data, pos + 2)
+        return pos + length, delta, status, meta_type, None, data[pos:pos + length]
+
+    if status == F0_SYSEX_STATUS or status == F7_SYSEX_STATUS:
+        length, pos = read_vlq(data, pos + 1)
+        return pos + length, delta, status, None, None, data[pos:pos + length]
+
+    if status & 0x80:
+        pos += 1
+    elif running_status is not None:
+        status = running_status
+    else:
+        raise TrackError("No status byte, and no running status set", pos)
+
+    data_length = MIDI_DATA_LENGTHS[status >> 4]
+    if data_length == 2:
+        data1 = data[pos]
+        data2 = data[pos + 1]
+        if (data1 | data2) & 0x80:
+            raise TrackError("Data byte of MIDI event {:02x} has its top bit set".format(status), pos)
+        return pos + 2, delta, status, data1, data2, None
+    if data_length == 1:
+        data1 = data[pos]
+        if data1 & 0x80:
+            raise TrackError("Data byte of MIDI event {:02x} has its top bit set".format(status), pos)
+        return pos + 1, delta, status, data1, None, None
+
+    raise TrackError("Unrecognised MIDI event {:02x}".format(status), pos)
+
+
+def event_type(status, data1, data2):
+    """
+    Returns the sub type of the event with the raw fields returned by
+    read_event, as it is named in event dicts.
+    """
+    if status < 0xF0:
+        message = status >> 4
+        if message == 0x9 and not data2:
+            return "Note Off"
+        if message == 0xB and data1 >= 0x78:
+            return CHANNEL_MODE_MESSAGES[data1]
+        return _CHANNEL_MESSAGE_NAMES[message]
+    if status == META_STATUS:
+        return META_TYPE_NAMES.get(data1, "Unknown")
+    return "{:02X}".format(status)
+
+
+def build_event_item(delta, status, data1, data2, payload, views=False):
+    """
+    Builds the (delta, event dict) tuple for a set of raw fields returned by read_event.
+    """
+    return delta, build_event(status, data1, data2, payload, views)
+
+
+def build_event(status, data1, data2, payload, views=False):
+    """
+    Builds the event dict for a set of raw fields returned by read_event.
+    """
+    if status == META_STATUS:
+        return _META_EVENTS.get(data1, _unknown_meta_event)(data1, payload, views)
+    if status == F0_SYSEX_STATUS:
+        return {"type": SYSEX, "sub_type": "F0", "data": payload if views else BitArray(bytes=payload)}
+    if status == F7_SYSEX_STATUS:
+        return {"type": SYSEX, "sub_type": "F7", "data": payload if views else BitArray(bytes=payload)}
+    # Channels are identified from 0 -> F, but are referred to as 1 - 16
+    return _MIDI_EVENTS[status >> 4]((status & 0x0F) + 1, data1, data2)
+
+
+def _note_off(channel, note, velocity):
+    return {"type": MIDI, "sub_type": "Note Off", "channel": channel, "note": note, "velocity": velocity}
+
+
+def _note_on(channel, note, velocity):
+    if velocity == 0:
+        # note-on with velocity=0 == note-off with velocity=48
+        return {"type": MIDI, "sub_type": "Note Off", "channel": channel, "note": note, "velocity": 48}
+    return {"type": MIDI, "sub_type": "Note On", "channel": channel, "note": note, "velocity": velocity}
+
+
+def _polyphonic_key_pressure(channel, key, pressure):
+    return {"type": MIDI, "sub_type": "Polyphonic Key Pressure", "channel": channel, "key": key, "pressure": pressure}
+
+
+def _controller_change(channel, controller, value):
+    if controller >= 0x78:
+        return {"type": MIDI, "sub_type": CHANNEL_MODE_MESSAGES[controller], "channel": channel, "value": value}
+    return {"type": MIDI, "sub_type": "Controller Change", "channel": channel, "new_controller": controller,
+            "value": value}
+
+
+def _program_change(channel, program, _):
+    return {"type": MIDI, "sub_type": "Program Change", "channel": channel, "new_value": program}
+
+
+def _channel_key_pressure(channel, pressure, _):
+    return {"type": MIDI, "sub_type": "Channel Key Pressure", "channel": channel, "channel_pressure": pressure}
+
+
+def _pitch_bend(channel, lsb, msb):
+    return {"type": MIDI, "sub_type": "Pitch Bend", "channel": channel, "lsb": BitArray(uint=lsb, length=8),
+            "msb": BitArray(uint=msb, length=8)}
+
+
+_MIDI_EVENTS = (None, None, None, None, None, None, None, None, _note_off, _note_on, _polyphonic_key_pressure,
+                _controller_change, _program_change, _channel_key_pressure, _pitch_bend, None)
+
+
+def _meta_event(sub_type, payload, views):
+    return {"type": META, "sub_type": sub_type, "data": payload if views else BitArray(bytes=payload)}
+
+
+def check_length(name, payload, length):
+    if len(payload) != length:
+        raise EventLengthError("{} event has the wrong length! Expected {} bytes, found {}.".format(name, length,
+                                                                                              len(payload)))
+
+
+def check_meta_length(meta_type, length):
+    """
+    Raises an EventLengthError if a meta event's payload length is wrong for
+    its type, as building its event would, for formats that do not build
+    events.
+    """
+    expected = META_LENGTHS.get(meta_type)
+    if expected is not None and length != expected:
+        raise EventLengthError("{} event has the wrong length! Expected {} bytes, found {}.".format(
+            META_TYPE_NAMES[meta_type], expected, length))
+
+
+def _unknown_meta_event(meta_type, payload, views):
+    log.warning("Unrecognised Meta event: {:02x}".format(meta_type))
+    event = _meta_event("Unknown", payload, views)
+    event["meta_type"] = meta_type
+    return event
+
+
+def _sequence_number(_, payload, views):
+    event = _meta_event("Sequence Number", payload, views)
+    event["sequence_number"] = payload if views else bytes(payload)
+    return event
+
+
+def _text_event(meta_type, payload, views):
+    event = _meta_event(TEXT_META_TYPES[meta_type], payload, views)
+    event["text"] = payload if views else bytes(payload)
+    return event
+
+
+def _channel_prefix(_, payload, views):
+    check_length("Channel Prefix", payload, 1)
+    event = _meta_event("MIDI Channel Prefix", payload, views)
+    event["channel"] = "{:02x}".format(payload[0])
+    return event
+
+
+def _prefix_port(_, payload, views):
+    check_length("MIDI Prefix Port", payload, 1)
+    event = _meta_event("MIDI Prefix Port", payload, views)
+    event["device"] = BitArray(bytes=payload)
+    return event
+
+
+def _end_of_track(_, payload, views):
+    check_length("End of Track", payload, 0)
+    return _meta_event("End of Track", payload, views)
+
+
+def _set_tempo(_, payload, views):
+    check_length("Set Tempo", payload, 3)
+    event = _meta_event("Set Tempo", payload, views)
+    event["new_tempo"] = BitArray(bytes=payload)
+    return event
+
+
+def _smtpe_offset(_, payload, views):
+    check_length("SMTPE Offset", payload, 5)
+    event = _meta_event("SMTPE Offset", payload, views)
+    event["hours"] = BitArray(bytes=payload[0:1])
+    event["minutes"] = BitArray(bytes=payload[1:2])
+    event["seconds"] = BitArray(bytes=payload[2:3])
+    event["frames"] = BitArray(bytes=payload[3:4])
+    event["fractional_frames"] = BitArray(bytes=payload[4:5])
+    return event
+
+
+def _time_signature(_, payload, views):
+    check_length("Time Signature", payload, 4)
+    event = _meta_event("Time Signature", payload, views)
+    event["numerator"] = payload[0]
+    event["denominator"] = payload[1]
+    event["clocks_per_tick"] = payload[2]
+    event["32nd_notes_per_24_clocks"] = payload[3]
+    return event
+
+
+def _key_signature(_, payload, views):
+    check_length("Key Signature", payload, 2)
+    event = _meta_event("Key Signature", payload, views)
+    # stored as a signed byte: negative numbers are flats, positive numbers sharps
+    sharps_flats = payload[0]
+    event["sharps_flats"] = sharps_flats - 256 if sharps_flats > 127 else sharps_flats
+    event["major_minor"] = payload[1]
+    return event
+
+
+def _sequencer_specific(_, payload, views):
+    return _meta_event("Sequencer-Specific Meta-event", payload, views)
+
+
+_META_EVENTS = {
+    0x00: _sequence_number,
+    0x01: _text_event,
+    0x02: _text_event,
+    0x03: _text_event,
+    0x04: _text_event,
+    0x05: _text_event,
+    0x06: _text_event,
+    0x07: _text_event,
+    0x20: _channel_prefix,
+    0x21: _prefix_port,
+    END_OF_TRACK: _end_of_track,
+    0x51: _set_tempo,
+    0x54: _smtpe_offset,
+    0x58: _time_signature,
+    0x59: _key_signature,
+    0x7F: _sequencer_specific,
+}
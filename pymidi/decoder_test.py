@@ -0,0 +1,96 @@
+import unittest
+
+from bitstring import BitArray
+
+from pymidi.decoder import decode_track, event_type, read_event
+from pymidi.events import process_meta_event, process_midi_event, META, MIDI, SYSEX
+
+
+class DecoderTest(unittest.TestCase):
+
+    def test_decoding_meta_event_matches_bitarray_parser(self):
+        _, expected = process_meta_event(BitArray("0x580404021808"))
+
+        events = decode_track(bytes.fromhex("00FF580404021808"))
+
+        self.assertEqual(events, [(0, expected)])
+
+    def test_decoding_midi_event_matches_bitarray_parser(self):
+        _, expected, _ = process_midi_event(BitArray("0x923060"))
+
+        events = decode_track(bytes.fromhex("00923060"))
+
+        self.assertEqual(events, [(0, expected)])
+
+    def test_decoding_reads_multi_byte_delta_times(self):
+        events = decode_track(bytes.fromhex("8140823040"))
+
+        self.assertEqual(events[0][0], 192)
+        self.assertEqual(events[0][1]["sub_type"], "Note Off")
+
+    def test_running_status_survives_note_on_with_zero_velocity(self):
+        events = decode_track(bytes.fromhex("0092306000300000326000FF2F00"))
+
+        self.assertEqual([e["sub_type"] for _, e in events], ["Note On", "Note Off", "Note On", "End of Track"])
+        self.assertEqual(events[1][1]["velocity"], 48)
+        self.assertEqual(events[2][1]["note"], 0x32)
+        self.assertEqual(events[2][1]["channel"], 3)
+
+    def test_decoding_sysex_event_continues_after_payload(self):
+        events = decode_track(bytes.fromhex("00F003431200" "00C005"))
+
+        self.assertEqual(events[0][1]["type"], SYSEX)
+        self.assertEqual(events[0][1]["sub_type"], "F0")
+        self.assertEqual(events[0][1]["data"], BitArray("0x431200"))
+        self.assertEqual(events[1][1]["sub_type"], "Program Change")
+        self.assertEqual(events[1][1]["new_value"], 5)
+
+    def test_decoding_channel_mode_message(self):
+        events = decode_track(bytes.fromhex("00B07B00"))
+
+        self.assertEqual(events[0][1]["type"], MIDI)
+        self.assertEqual(events[0][1]["sub_type"], "All Notes Off")
+        self.assertEqual(events[0][1]["channel"], 1)
+
+    def test_decoding_sequencer_specific_meta_event(self):
+        events = decode_track(bytes.fromhex("00FF7F03000041"))
+
+        self.assertEqual(events[0][1]["type"], META)
+        self.assertEqual(events[0][1]["sub_type"], "Sequencer-Specific Meta-event")
+        self.assertEqual(events[0][1]["data"], BitArray("0x000041"))
+
+    def test_decoding_key_signature_with_flats(self):
+        events = decode_track(bytes.fromhex("00FF5902FD01"))
+
+        self.assertEqual(events[0][1]["sharps_flats"], -3)
+        self.assertEqual(events[0][1]["major_minor"], 1)
+
+    def test_decoding_meta_event_with_wrong_length_raises_exception(self):
+        self.assertRaises(Exception, decode_track, bytes.fromhex("00FF510207A1"))
+
+    def test_decoding_truncated_event_raises_exception(self):
+        self.assertRaises(Exception, decode_track, bytes.fromhex("0092"))
+        self.assertRaises(Exception, decode_track, bytes.fromhex("00FF0105414243"))
+
+    def test_decoding_respects_start_and_end_offsets(self):
+        data = bytes.fromhex("AAAA00C005BBBB")
+
+        events = decode_track(data, 2, 5)
+
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0][1]["sub_type"], "Program Change")
+
+    def test_reading_event_returns_raw_fields(self):
+        self.assertEqual(read_event(bytes.fromhex("00923060"), 0), (4, 0, 0x92, 0x30, 0x60, None))
+        self.assertEqual(read_event(bytes.fromhex("103C60"), 0, 0x92), (3, 16, 0x92, 0x3C, 0x60, None))
+        self.assertEqual(read_event(bytes.fromhex("00FF0102ABCD"), 0), (6, 0, 0xFF, 0x01, None, b"\xab\xcd"))
+
+    def test_event_type(self):
+        self.assertEqual(event_type(0x93, 60, 0), "Note Off")
+        self.assertEqual(event_type(0xB0, 0x78, 0), "All Sound Off")
+        self.assertEqual(event_type(0xFF, 0x51, None), "Set Tempo")
+        self.assertEqual(event_type(0xF7, None, None), "F7")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+Errors raised on malformed MIDI data, and the modes for handling them.
+
+Everything pymidi raises because of the data it was given, rather than how
+it was called, is a MidiError, so that bulk ingestion can catch bad files
+without catching bugs:
+
+    MidiError
+    +-- ChunkError          chunk structure: truncated chunks and files
+    +-- HeaderError         malformed header chunks
+    +-- TrackError          malformed events in track chunks
+        +-- EventLengthError    meta events of the wrong length for their type
+
+The errors argument of parse_chunks, parse_file, parse_buffer and
+process_chunk picks what happens when a track chunk, or the chunk structure
+of a file, is malformed:
+
+STRICT:  raise the error.
+SKIP:    log it, and return the chunk as None (the default).
+LENIENT: log it and carry on from the next thing that can be decoded. In
+         track chunks, an event with a bad payload (such as a Set Tempo
+         event of the wrong length) is skipped by its length, and one that
+         cannot be read at all resynchronises at the next status byte,
+         keeping every event that can be decoded. A chunk overrunning the
+         end of the file, or a run of bytes that is not a chunk at all,
+         resynchronises at the next "MTrk" or "MThd".
+
+Lazy and columnar events do not decode payloads, but do check that meta
+events with a fixed length (such as Set Tempo) have it, and every format
+rejects channel messages with a data byte of 0x80 or over, so every mode
+treats a file the same whichever event format it is parsed into.
+
+Header chunks cannot be recovered, so a malformed one raises a HeaderError
+in every mode.
+
+Errors handled in SKIP and LENIENT modes are counted in the errors of a
+pymidi.stats.ParseStats, if one is passed.
+"""
+import re
+
+STRICT = "strict"
+SKIP = "skip"
+LENIENT = "lenient"
+ERROR_MODES = (STRICT, SKIP, LENIENT)
+
+# a one byte delta followed by a status byte, where decoding resumes after a bad event
+_EVENT_START = re.compile(b"[\x00-\x7F][\x80-\xEF\xF0\xF7\xFF]")
+_CHUNK_START = re.compile(b"MTrk|MThd")
+
+
+class MidiError(Exception):
+    """
+    Raised on malformed MIDI data.
+    """
+
+    def __init__(self, message, offset=None):
+        """
+        :param message: description of the error
+        :param offset: offset of the error within the chunk or file being decoded, if known
+        """
+        super(MidiError, self).__init__(message)
+        self.offset = offset
+
+
+class ChunkError(MidiError):
+    pass
+
+
+class HeaderError(MidiError):
+    pass
+
+
+class TrackError(MidiError):
+    pass
+
+
+class EventLengthError(TrackError):
+    pass
+
+
+def check_error_mode(errors):
+    if errors not in ERROR_MODES:
+        raise Exception("Unrecognised error mode {}".format(errors))
+
+
+def next_event(data, pos, end):
+    """
+    Returns the offset of the first event that looks valid after pos in
+    track data, or end if there is none.
+    """
+    match = _EVENT_START.search(data, pos + 1, end)
+    return match.start() if match else end
+
+
+def next_chunk(data, pos):
+    """
+    Returns the offset of the first chunk type after pos in file data, or
+    None if there is none.
+    """
+    match = _CHUNK_START.search(data, pos + 1)
+    return match.start() if match else None
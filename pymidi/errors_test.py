@@ -0,0 +1,216 @@
+import io
+import unittest
+from itertools import accumulate
+
+from bitstring import BitArray
+
+from pymidi.chunks import parse_buffer, parse_chunks, process_header_chunk, process_track_chunk, COLUMNAR_EVENTS, \
+    DICT_EVENTS, LAZY_EVENTS, TYPED_EVENTS
+from pymidi.decoder import decode_track, recover_track
+from pymidi.errors import ChunkError, EventLengthError, HeaderError, MidiError, TrackError, LENIENT, SKIP, STRICT
+from pymidi.events import process_meta_event, process_midi_event, META, MIDI
+from pymidi.filters import EventFilter
+from pymidi.stats import ParseStats
+
+HEADER = b"MThd" + (6).to_bytes(4, "big") + bytes.fromhex("0001 0002 0060")
+GOOD_TRACK = bytes.fromhex("00 90 3C 40  10 80 3C 40  00 FF 2F 00")
+# a Set Tempo event two bytes long between two notes
+BAD_TRACK = bytes.fromhex("00 90 3C 40  00 FF 51 02 07 A1  10 90 3E 40  00 FF 2F 00")
+# a Controller Change with a controller number of 0x85, which is not a data byte
+BAD_DATA_BYTE_TRACK = bytes.fromhex("00 90 3C 40  00 B0 85 10  10 90 3E 40  00 FF 2F 00")
+
+
+def track_chunk(data):
+    return b"MTrk" + len(data).to_bytes(4, "big") + data
+
+
+def notes(chunk):
+    return [(delta, event["note"]) for delta, event in chunk["events"] if event["type"] == MIDI]
+
+
+class ErrorTypesTest(unittest.TestCase):
+
+    def test_malformed_data_raises_midi_errors(self):
+        with self.assertRaises(EventLengthError):
+            decode_track(BAD_TRACK)
+        with self.assertRaises(TrackError):
+            decode_track(bytes.fromhex("00 3C 40  00 FF 2F 00"))
+        with self.assertRaises(HeaderError):
+            process_header_chunk(6, BitArray("0x000300010060"))
+        with self.assertRaises(HeaderError):
+            process_header_chunk(6, BitArray("0x0001"))
+        self.assertTrue(issubclass(ChunkError, MidiError))
+
+    def test_bit_string_events_raise_instead_of_exiting(self):
+        with self.assertRaises(EventLengthError):
+            process_meta_event(BitArray("0x51020000"))
+        with self.assertRaises(TrackError):
+            process_midi_event(BitArray("0x3C60"))
+
+    def test_unrecognised_error_mode(self):
+        with self.assertRaises(Exception):
+            parse_buffer(HEADER, errors="ignore")
+
+
+class ErrorModesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data = HEADER + track_chunk(BAD_TRACK) + track_chunk(GOOD_TRACK)
+
+    def test_strict(self):
+        stats = ParseStats()
+        with self.assertRaises(EventLengthError):
+            parse_buffer(self.data, stats=stats, errors=STRICT)
+        with self.assertRaises(EventLengthError):
+            parse_chunks(io.BytesIO(self.data), errors=STRICT)
+        self.assertEqual(stats.errors, {"EventLengthError": 1})
+
+    def test_skip(self):
+        stats = ParseStats()
+        chunks = parse_buffer(self.data, stats=stats, errors=SKIP)
+        self.assertIsNone(chunks[1])
+        self.assertEqual(notes(chunks[2]), [(0, 0x3C), (0x10, 0x3C)])
+        self.assertEqual(stats.errors, {"EventLengthError": 1})
+        self.assertEqual(chunks, parse_buffer(self.data))
+
+    def test_lenient_keeps_the_events_it_can_decode(self):
+        stats = ParseStats()
+        for chunks in [parse_buffer(self.data, stats=stats, errors=LENIENT),
+                       parse_chunks(io.BytesIO(self.data), errors=LENIENT)]:
+            self.assertEqual(notes(chunks[1]), [(0, 0x3C), (0x10, 0x3E)])
+            self.assertEqual(chunks[1]["events"][-1][1]["sub_type"], "End of Track")
+            self.assertEqual(chunks[2], parse_buffer(self.data)[2])
+        self.assertEqual(stats.errors, {"EventLengthError": 1})
+        # the Set Tempo event
+        self.assertEqual(stats.skipped_bytes, 6)
+        self.assertEqual(stats.chunks[1]["error"], "Set Tempo event has the wrong length! Expected 3 bytes, "
+                                                   "found 2.")
+
+    def test_lenient_event_formats(self):
+        dict_events = parse_buffer(self.data, errors=LENIENT)[1]["events"]
+        typed = parse_buffer(self.data, event_format=TYPED_EVENTS, errors=LENIENT)[1]["events"]
+        self.assertEqual([event.delta for event in typed], [delta for delta, _ in dict_events])
+        # lazy and columnar events are not decoded, but their meta lengths are checked, so they skip it too
+        lazy = parse_buffer(self.data, event_format=LAZY_EVENTS, errors=LENIENT)[1]["events"]
+        self.assertEqual([event["sub_type"] for _, event in lazy], ["Note On", "Note On", "End of Track"])
+        columnar = parse_buffer(self.data, event_format=COLUMNAR_EVENTS, errors=LENIENT)[1]
+        self.assertEqual(columnar["events"]["status"].tolist(), [0x90, 0x90, 0xFF])
+        self.assertEqual(columnar["events"]["tick"].tolist(), list(accumulate(delta for delta, _ in dict_events)))
+
+    def test_strict_and_skip_do_not_depend_on_event_format(self):
+        for event_format in [DICT_EVENTS, LAZY_EVENTS, TYPED_EVENTS, COLUMNAR_EVENTS]:
+            with self.assertRaises(EventLengthError):
+                parse_buffer(self.data, event_format=event_format, errors=STRICT)
+            self.assertIsNone(parse_buffer(self.data, event_format=event_format, errors=SKIP)[1])
+            for event_filter in [None, EventFilter(types={META})]:
+                with self.assertRaises(EventLengthError):
+                    process_track_chunk(BAD_TRACK, event_format=event_format, event_filter=event_filter)
+
+    def test_lenient_with_filter(self):
+        chunks = parse_buffer(self.data, event_filter=EventFilter(sub_types={"Note On"}), errors=LENIENT)
+        self.assertEqual(notes(chunks[1]), [(0, 0x3C), (0x10, 0x3E)])
+        self.assertEqual(notes(chunks[2]), [(0, 0x3C)])
+
+    def test_raw_data_of_recovered_tracks_is_not_kept(self):
+        chunks = parse_buffer(self.data, keep_raw=True, errors=LENIENT)
+        self.assertNotIn("raw", chunks[1])
+        self.assertIn("raw", chunks[2])
+
+    def test_header_errors_raise_in_every_mode(self):
+        data = b"MThd" + (6).to_bytes(4, "big") + bytes.fromhex("0007 0001 0060") + track_chunk(GOOD_TRACK)
+        for errors in [STRICT, SKIP, LENIENT]:
+            with self.assertRaises(HeaderError):
+                parse_buffer(data, errors=errors)
+
+
+class DataByteTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data = HEADER + track_chunk(BAD_DATA_BYTE_TRACK) + track_chunk(GOOD_TRACK)
+
+    def assert_rejected(self, event_format):
+        with self.assertRaises(TrackError):
+            parse_buffer(self.data, event_format=event_format, errors=STRICT)
+        for event_filter in [None, EventFilter(sub_types={"Note On"})]:
+            with self.assertRaises(TrackError):
+                process_track_chunk(BAD_DATA_BYTE_TRACK, event_format=event_format, event_filter=event_filter)
+        self.assertIsNone(parse_buffer(self.data, event_format=event_format, errors=SKIP)[1])
+        return parse_buffer(self.data, event_format=event_format, errors=LENIENT)[1]["events"]
+
+    def test_dict_events(self):
+        chunk = {"events": self.assert_rejected(DICT_EVENTS)}
+        self.assertEqual(notes(chunk), [(0, 0x3C), (0x10, 0x3E)])
+
+    def test_lazy_events(self):
+        events = self.assert_rejected(LAZY_EVENTS)
+        self.assertEqual([(delta, event["sub_type"]) for delta, event in events],
+                         [(0, "Note On"), (0x10, "Note On"), (0, "End of Track")])
+
+    def test_typed_events(self):
+        events = self.assert_rejected(TYPED_EVENTS)
+        self.assertEqual([(event.delta, event.sub_type) for event in events],
+                         [(0, "Note On"), (0x10, "Note On"), (0, "End of Track")])
+
+    def test_columnar_events(self):
+        events = self.assert_rejected(COLUMNAR_EVENTS)
+        self.assertEqual(events["status"].tolist(), [0x90, 0x90, 0xFF])
+        self.assertEqual(events["data1"].tolist(), [0x3C, 0x3E, 0x2F])
+
+
+class ResyncTest(unittest.TestCase):
+
+    def test_resyncs_at_the_next_status_byte(self):
+        # a data byte with no running status, then garbage
+        track = bytes.fromhex("00 3C 77 01 02  05 91 40 40  00 FF 2F 00")
+        errors = []
+        events = recover_track(track, on_error=lambda error, skipped: errors.append((type(error), skipped)))
+        self.assertEqual([(delta, event.get("note")) for delta, event in events], [(5, 0x40), (0, None)])
+        self.assertEqual(errors, [(TrackError, 5)])
+
+    def test_missing_end_of_track(self):
+        stats = ParseStats()
+        chunks = parse_buffer(HEADER + track_chunk(bytes.fromhex("00 90 3C 40  10 80 3C 40")), stats=stats,
+                              errors=LENIENT)
+        self.assertEqual(notes(chunks[1]), [(0, 0x3C), (0x10, 0x3C)])
+        self.assertEqual(stats.errors, {"TrackError": 1})
+
+    def test_truncated_event(self):
+        stats = ParseStats()
+        chunks = parse_buffer(HEADER + track_chunk(bytes.fromhex("00 90 3C 40  00 FF 01 05 41")), stats=stats,
+                              errors=LENIENT)
+        self.assertEqual(notes(chunks[1]), [(0, 0x3C)])
+        self.assertEqual(stats.errors, {"TrackError": 2})
+
+    def test_chunk_overrunning_the_file(self):
+        # the first track chunk claims 100 bytes, running into the second
+        data = HEADER + b"MTrk" + (100).to_bytes(4, "big") + GOOD_TRACK + track_chunk(GOOD_TRACK)
+        with self.assertRaises(ChunkError):
+            parse_buffer(data, errors=STRICT)
+        stats = ParseStats()
+        chunks = parse_buffer(data, stats=stats, errors=LENIENT)
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(chunks[1], chunks[2])
+        self.assertEqual(stats.errors, {"ChunkError": 1})
+
+    def test_bytes_between_chunks(self):
+        stats = ParseStats()
+        chunks = parse_buffer(HEADER + b"\x00\x01\xff\xfe junk" + track_chunk(GOOD_TRACK), stats=stats,
+                              errors=LENIENT)
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual(notes(chunks[1]), [(0, 0x3C), (0x10, 0x3C)])
+        self.assertEqual((stats.errors, stats.skipped_bytes), ({"ChunkError": 1}, 9))
+
+    def test_truncated_chunk_header(self):
+        with self.assertRaises(ChunkError):
+            parse_buffer(HEADER + b"MTr", errors=STRICT)
+        self.assertEqual(len(parse_buffer(HEADER + b"MTr", errors=LENIENT)), 1)
+
+    def test_report(self):
+        stats = ParseStats(count_events=False)
+        parse_buffer(HEADER + track_chunk(BAD_TRACK), stats=stats, errors=LENIENT)
+        self.assertEqual(stats.event_counts, {})
+        self.assertEqual(stats.report().splitlines()[1], "1 errors (1 EventLengthError), 6 bytes skipped")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,6 +3,7 @@ import sys
 
 from bitstring import BitArray
 
+from pymidi.errors import EventLengthError, TrackError
 from pymidi.utils import variable_length_field
 
 
@@ -19,6 +20,9 @@ F7_SYSEX_EVENT_PREFIX = BitArray("0xF7")
 META_EVENT_PREFIX = BitArray("0xFF")
 META = "META"
 MIDI = "MIDI"
+SYSEX = "SYSEX"
+# system common and realtime messages, which are only found in MIDI streams
+SYSTEM = "SYSTEM"
 
 
 def process_meta_event(data):
@@ -70,27 +74,23 @@ def process_meta_event(data):
         # Associate all following meta-events and sysex-events with the specified MIDI channel, until the next
         # <midi_event> (which must contain MIDI channel information).
         if length != 1:
-            log.error("Channel Prefix Event has the wrong length!\nExiting...")
-            exit(1)
+            raise EventLengthError("Channel Prefix event has the wrong length!")
 
         event["sub_type"] = "MIDI Channel Prefix"
         event["channel"] = event_data[:8].hex
     elif type == "21":
         # MIDI Prefix Port
         if length != 1:
-            print("MIDI Prefix Port event has the wrong length!\nExiting...")
-            exit(1)
+            raise EventLengthError("MIDI Prefix Port event has the wrong length!")
 
         event["sub_type"] = "MIDI Prefix Port"
         event["device"] = event_data[:8]
     elif type == "2f":
-        print("End of Track")
         # This event is not optional.
         # It is used to give the track a clearly defined length, which is essential information if the track is looped
         # or concatenated with another track
         if length:
-            print("End of Track event should not have any length!\nExiting...")
-            exit(1)
+            raise EventLengthError("End of Track event should not have any length!")
 
         event["sub_type"] = "End of Track"
     elif type == "51":
@@ -99,8 +99,7 @@ def process_meta_event(data):
         # tick. (note 1)
         # If not specified, the default tempo is 120 beats/minute, which is equivalent to tttttt=500000
         if length != 3:
-            print("Set Tempo event has the wrong length!\nExiting...")
-            exit(1)
+            raise EventLengthError("Set Tempo event has the wrong length!")
 
         event["sub_type"] = "Set Tempo"
         event["new_tempo"] = event_data[:8 * 3]
@@ -110,8 +109,7 @@ def process_meta_event(data):
         # This event must occur before any non-zero delta-times, and before any MIDI events.
         # In a format 1 MIDI file, this event must be on the first track (the tempo map).
         if length != 5:
-            print("SMTPE Offset event has the wrong length!\nExiting...")
-            exit(1)
+            raise EventLengthError("SMTPE Offset event has the wrong length!")
 
         event["sub_type"] = "SMTPE Offset"
         event["hours"] = event_data[:8]
@@ -122,8 +120,7 @@ def process_meta_event(data):
     elif type == "58":
         # Time Signature
         if length != 4:
-            print("Time Signature event has the wrong length!\nExiting...")
-            exit(1)
+            raise EventLengthError("Time Signature event has the wrong length!")
 
         event["sub_type"] = "Time Signature"
         event["numerator"] = event_data[:8].int
@@ -137,8 +134,7 @@ def process_meta_event(data):
         # Key Signature, expressed as the number of sharps or flats, and a major/minor flag.
         # 0 represents a key of C, negative numbers represent 'flats', while positive numbers represent 'sharps'.
         if length != 2:
-            print("Key Signature event has the wrong length!\nExiting...")
-            exit(1)
+            raise EventLengthError("Key Signature event has the wrong length!")
 
         event["sub_type"] = "Key Signature"
         event["sharps_flats"] = event_data[:8].int
@@ -185,10 +181,10 @@ def process_sysex_event(prefix, data):
     elif prefix == F7_SYSEX_EVENT_PREFIX:
         subtype = "F7"
     else:
-        raise Exception("Tried to process Sysex event but invalid prefix {} found.\nExiting...".format(prefix))
+        raise TrackError("Tried to process Sysex event but invalid prefix {} found.".format(prefix))
 
     event = {
-        "type": "SYSEX",
+        "type": SYSEX,
         "sub_type": subtype,
         "data": data[:8 * length]
     }
@@ -213,7 +209,7 @@ def process_midi_event(data, running_status=None):
             status = running_status[0]
             channel = running_status[1]
         else:
-            raise Exception("No status byte, and no running status set")
+            raise TrackError("No status byte, and no running status set")
 
     if status == 8:
         event = {
@@ -269,8 +265,7 @@ def process_midi_event(data, running_status=None):
         elif data[:4] == BitArray("0x7"):
             return process_channel_mode_message(data[4:], channel)
         else:
-            print("Unrecognised message {}\nExiting...".format(data[:16]))
-            exit(1)
+            raise TrackError("Unrecognised message {}".format(data[:16]))
     elif status == 12:
         event = {
             "type": MIDI,
@@ -297,7 +292,7 @@ def process_midi_event(data, running_status=None):
         }
         return data[16:], event, (status, channel)
     else:
-        raise Exception("Unrecognised MIDI event {}".format(data[:16]))
+        raise TrackError("Unrecognised MIDI event {}".format(data[:16]))
 
 
 # Already has leading Bn7 trimmed off
@@ -306,7 +301,7 @@ def process_channel_mode_message(data, channel):
     if data[:12] == BitArray("0x800"):
         # All Sound Off
         # Turn off all sound, including envelopes of notes still sounding, and reverb-effects (if applicable).
-        print("Sound off for channel {}".format(channel))
+        log.debug("Sound off for channel {}".format(channel))
     elif data[:12] == BitArray("0x900"):
         # Reset All Controllers
         # Reset all controllers to their 'default' positions, including all continuous and switch controllers,
@@ -315,7 +310,7 @@ def process_channel_mode_message(data, channel):
         # pitch-bend should be returned to its 'center' position.
         #
         # This message must be ignored if Omni is On (Modes 1 and 2).
-        print("Reset all controllers for channel {}".format(channel))
+        log.debug("Reset all controllers for channel {}".format(channel))
     elif data[:4] == BitArray("0xA"):
         # Local Control
         # Disconnect (or reconnect) the keyboard and the sound generator in a MIDI synthesiser.
@@ -325,7 +320,7 @@ def process_channel_mode_message(data, channel):
         # 7F == reconnect local keyboard to sound generator
         dr = data[4:12]
         # TODO process dr
-        print("Local Control for channel {}. Disconnect/reconnect: {}".format(channel, dr))
+        log.debug("Local Control for channel {}. Disconnect/reconnect: {}".format(channel, dr))
     elif data[:12] == BitArray("0xB00"):
         # All Notes Off
         # Turn off all notes which for which a note-on MIDI message has been received. (note 1)
@@ -338,19 +333,19 @@ def process_channel_mode_message(data, channel):
         #
         # If a hold-pedal is 'on' (controller 0x40), then this message should not be acted on until the hold-pedal is
         # released.
-        print("All Notes Off for channel {}".format(channel))
+        log.debug("All Notes Off for channel {}".format(channel))
     elif data[:12] == BitArray("0xC00"):
         # Omni Mode On
         # The receiver should respond only to Channel Voice messages which it receives on it's Basic Channel. (note 2)
         # This puts the receiving MIDI device into Channel Mode 3 or 4, depending on the current state of the Mono/Poly
         # switch. (note 3)
-        print("Omni Mode on for channel {}".format(channel))
+        log.debug("Omni Mode on for channel {}".format(channel))
     elif data[:12] == BitArray("0xD00"):
         # Omni Mode Off
         # The receiver should respond to Channel Voice messages which it receives on any MIDI channel. (note 2)
         # This puts the receiving MIDI device into Channel Mode 1 or 2, depending on the current state of the Mono/Poly
         # switch. (note 3)
-        print("Omni Mode off for channel {}".format(channel))
+        log.debug("Omni Mode off for channel {}".format(channel))
     elif data[:4] == BitArray("0xE"):
         # Mono Mode On
         # Puts the receiver into monophonic mode. (note 2)
@@ -362,16 +357,15 @@ def process_channel_mode_message(data, channel):
         # If n+m-1 > Ch.16 there is no wrap-around to Ch.1. Only channels n...16 are used
         # TODO validate this
         m = data[4:12]
-        print("Mono Mode on for channel {}, number of MIDI channels to use: {}".format(channel, m))
+        log.debug("Mono Mode on for channel {}, number of MIDI channels to use: {}".format(channel, m))
     elif data[:12] == BitArray("0xF00"):
         # Poly Mode On
         # Puts the receiver into polyphonic mode. (note 2)
         # This puts the receiving MIDI device into Channel Mode 1 or 3, depending on the state of the Omni switch.
         # (note 3)
-        print("Poly Mode on for channel {}".format(channel))
+        log.debug("Poly Mode on for channel {}".format(channel))
     else:
-        print("Unrecognised Channel mode message received: B{}7{}".format(channel, data[:12].hex))
-        # TODO should this exit if this case is reached?
+        log.warning("Unrecognised Channel mode message received: B{}7{}".format(channel, data[:12].hex))
 
     return data[12:]
 
@@ -0,0 +1,287 @@
+"""
+Export of parsed files to Apache Arrow record batches and Parquet.
+
+Files are decoded into columnar tracks (see pymidi.columnar), and each
+track chunk becomes one record batch, built from the NumPy arrays with
+vectorised operations: no Python object is made per event, and payloads
+are handed to Arrow as the track's payload blob without being copied. One
+row per event:
+
+file_id:  the file the event came from (its path, unless other ids are given), dictionary encoded
+track:    the track chunk, numbered from 0 among the file's track chunks, including any that failed to parse
+tick:     absolute time, in ticks from the start of the track
+seconds:  absolute time, in seconds, through the file's tempo map (each track's own, in Format 2 files)
+type:     MIDI, META or SYSEX, dictionary encoded
+sub_type: as named in event dicts, e.g. "Note On" or "Set Tempo", dictionary encoded
+status:   status byte, as in columnar tracks: running status expanded, velocity 0 Note Ons kept as is
+channel:  1 - 16, or null for meta and Sysex events
+data1:    first data byte, or the meta type of meta events
+data2:    second data byte, or 0
+payload:  payload of meta and Sysex events, or null
+
+Needs pyarrow, which is an optional dependency: the rest of pymidi works
+without it.
+"""
+import logging
+import os
+import sys
+import time
+from collections import deque
+from multiprocessing import Pool
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+from pymidi.chunks import parse_file, COLUMNAR_EVENTS, HEADER, TRACK, TRACK_TYPE
+from pymidi.decoder import META_STATUS
+from pymidi.errors import MidiError, SKIP
+from pymidi.events import META, MIDI, SYSEX
+from pymidi.stats import code_sub_type, sub_type_codes, ParseStats
+from pymidi.tempo import TempoMap
+
+log = logging.getLogger(__name__)
+log.setLevel("INFO")
+handler = logging.StreamHandler(stream=sys.stderr)
+handler.setFormatter(logging.Formatter(fmt="%(asctime)s %(levelname)s %(message)s",
+                                       datefmt="%Y-%m-%d %H:%M:%S"))
+log.addHandler(handler)
+
+
+# rows per Parquet row group
+DEFAULT_ROW_GROUP_SIZE = 1024 * 1024
+# files handed to a worker at a time
+DEFAULT_CHUNKSIZE = 16
+DEFAULT_COMPRESSION = "zstd"
+
+# how ParseStats records track chunks that failed to parse
+_TRACK_CHUNK_TYPE = TRACK_TYPE.decode("latin-1")
+
+# the dictionary of the type column
+_EVENT_TYPES = [MIDI, META, SYSEX]
+
+if pa is not None:
+    SCHEMA = pa.schema([
+        ("file_id", pa.dictionary(pa.int32(), pa.string())),
+        ("track", pa.uint16()),
+        ("tick", pa.uint64()),
+        ("seconds", pa.float64()),
+        ("type", pa.dictionary(pa.int8(), pa.string())),
+        ("sub_type", pa.dictionary(pa.int16(), pa.string())),
+        ("status", pa.uint8()),
+        ("channel", pa.uint8()),
+        ("data1", pa.uint8()),
+        ("data2", pa.uint8()),
+        ("payload", pa.binary()),
+    ])
+else:
+    SCHEMA = None
+
+
+def track_batch(chunk, track, file_id, tempo_map):
+    """
+    Builds the record batch of a columnar track chunk.
+
+    :param chunk: a track chunk, as returned by process_track_chunk with COLUMNAR_EVENTS
+    :param track: the track's number
+    :param file_id: the id of the file the track came from
+    :param tempo_map: the TempoMap to convert the track's ticks to seconds with
+    """
+    _require_pyarrow()
+    events = chunk["events"]
+    rows = len(events)
+    status = events["status"]
+
+    codes, sub_type_indices = np.unique(sub_type_codes(events), return_inverse=True)
+    type_indices = np.where(status < 0xF0, 0, np.where(status == META_STATUS, 1, 2)).astype(np.int8)
+
+    return pa.RecordBatch.from_arrays([
+        pa.DictionaryArray.from_arrays(np.zeros(rows, dtype=np.int32), [file_id]),
+        pa.array(np.full(rows, track, dtype=np.uint16)),
+        pa.array(events["tick"]),
+        pa.array(tempo_map.to_seconds(events["tick"])),
+        pa.DictionaryArray.from_arrays(type_indices, _EVENT_TYPES),
+        pa.DictionaryArray.from_arrays(sub_type_indices.astype(np.int16),
+                                       [code_sub_type(code) for code in codes.tolist()]),
+        pa.array(status),
+        pa.array(events["channel"], mask=status >= 0xF0),
+        pa.array(events["data1"]),
+        pa.array(events["data2"]),
+        _payload_array(chunk),
+    ], schema=SCHEMA)
+
+
+def file_batches(path, file_id=None, errors=SKIP):
+    """
+    Parses a file into one record batch per track chunk.
+
+    :param path: path of the MIDI file
+    :param file_id: the file's id in the file_id column (defaults to path)
+    :param errors: how to handle malformed track chunks (see pymidi.errors). Those left as None are not exported.
+    :return: a list of record batches
+    """
+    _require_pyarrow()
+    # records the type of every chunk, including those that come back as None
+    stats = ParseStats(count_events=False)
+    chunks = parse_file(path, event_format=COLUMNAR_EVENTS, stats=stats, errors=errors)
+    if not chunks or not chunks[0] or chunks[0]["type"] != HEADER:
+        raise MidiError("{} does not start with a header chunk".format(path))
+
+    # tracks are numbered by their place among the file's track chunks, counting those that failed to parse
+    tracks = []
+    failed = 0
+    for chunk, record in zip(chunks, stats.chunks):
+        if record["type"] in (TRACK, _TRACK_CHUNK_TYPE):
+            if chunk:
+                tracks.append((failed + len(tracks), chunk))
+            else:
+                failed += 1
+    if failed:
+        log.warning("Left out {} malformed track chunks of {}".format(failed, path))
+
+    # Format 2 tracks are independent sequences, each with its own tempo map
+    independent = chunks[0]["format"] == 2
+    tempo_map = None if independent else TempoMap.from_chunks(chunks)
+    return [track_batch(chunk, number, path if file_id is None else file_id,
+                        TempoMap.from_chunks([chunks[0], chunk]) if independent else tempo_map)
+            for number, chunk in tracks]
+
+
+def iter_batches(paths, file_ids=None, jobs=1, chunksize=DEFAULT_CHUNKSIZE, errors=SKIP):
+    """
+    Yields the record batches of each file in turn, parsing files across a
+    pool of worker processes if jobs is not 1. Files that fail to parse are
+    logged and left out.
+
+    :param paths: the files to export
+    :param file_ids: the id of each file in the file_id column (defaults to their paths)
+    :param jobs: number of worker processes (None for the number of CPUs)
+    :param chunksize: number of files sent to a worker at a time
+    :param errors: how to handle malformed track chunks (see pymidi.errors)
+    """
+    for _, batches, _ in _exported_files(paths, file_ids, jobs, chunksize, errors):
+        for batch in batches:
+            yield batch
+
+
+def write_parquet(paths, output, row_group_size=DEFAULT_ROW_GROUP_SIZE, file_ids=None, jobs=1,
+                  chunksize=DEFAULT_CHUNKSIZE, errors=SKIP, compression=DEFAULT_COMPRESSION):
+    """
+    Exports files to a Parquet file, streaming their record batches into
+    row groups of row_group_size rows, so that at most a row group and the
+    files in flight (up to two chunks of files per worker) are held in
+    memory at once.
+
+    :param paths: the files to export
+    :param output: path or file object to write the Parquet file to
+    :param row_group_size: number of rows per row group (the last may be shorter)
+    :param file_ids: the id of each file in the file_id column (defaults to their paths)
+    :param jobs: number of worker processes (None for the number of CPUs)
+    :param chunksize: number of files sent to a worker at a time
+    :param errors: how to handle malformed track chunks (see pymidi.errors)
+    :param compression: Parquet compression codec
+    :return: a dict of totals: "files" exported, "failures", "rows" and "row_groups" written, and "seconds" taken
+    """
+    _require_pyarrow()
+    if row_group_size < 1:
+        raise Exception("Row groups must have at least 1 row, found {}".format(row_group_size))
+
+    totals = {"files": 0, "failures": 0, "rows": 0, "row_groups": 0}
+    start = time.perf_counter()
+    pending = []
+    pending_rows = 0
+    with pq.ParquetWriter(output, SCHEMA, compression=compression) as writer:
+        for _, batches, error in _exported_files(paths, file_ids, jobs, chunksize, errors):
+            if error:
+                totals["failures"] += 1
+                continue
+            totals["files"] += 1
+            pending.extend(batches)
+            pending_rows += sum(batch.num_rows for batch in batches)
+            while pending_rows >= row_group_size:
+                table = pa.Table.from_batches(pending, SCHEMA)
+                writer.write_table(table.slice(0, row_group_size), row_group_size)
+                pending = table.slice(row_group_size).to_batches()
+                pending_rows -= row_group_size
+                totals["rows"] += row_group_size
+                totals["row_groups"] += 1
+
+        if pending_rows:
+            writer.write_table(pa.Table.from_batches(pending, SCHEMA), row_group_size)
+            totals["rows"] += pending_rows
+            totals["row_groups"] += 1
+
+    totals["seconds"] = time.perf_counter() - start
+    return totals
+
+
+def _exported_files(paths, file_ids, jobs, chunksize, errors):
+    tasks = [(path, None if file_ids is None else file_id, errors)
+             for path, file_id in zip(paths, paths if file_ids is None else file_ids)]
+    if jobs == 1:
+        for task in tasks:
+            yield _logged(_export_file(task))
+        return
+
+    # chunks of files sent to the pool but not yet consumed, at most two per worker: when the consumer (e.g. the
+    # Parquet writer) is slower than the workers, they wait for it rather than piling up finished batches
+    window = 2 * (jobs or os.cpu_count())
+    in_flight = deque()
+    with Pool(jobs, initializer=_init_worker) as pool:
+        for start in range(0, len(tasks), chunksize):
+            if len(in_flight) == window:
+                for result in in_flight.popleft().get():
+                    yield _logged(result)
+            in_flight.append(pool.apply_async(_export_files, (tasks[start:start + chunksize],)))
+        while in_flight:
+            for result in in_flight.popleft().get():
+                yield _logged(result)
+
+
+def _export_files(tasks):
+    return [_export_file(task) for task in tasks]
+
+
+def _export_file(task):
+    path, file_id, errors = task
+    try:
+        return path, file_batches(path, file_id, errors), None
+    except Exception as e:
+        return path, [], "{}: {}".format(type(e).__name__, e)
+
+
+def _logged(result):
+    path, _, error = result
+    if error:
+        log.warning("Failed to export {}: {}".format(path, error))
+    return result
+
+
+def _init_worker():
+    # per-chunk progress logging costs more than parsing a small file
+    for name in ["pymidi.chunks", "pymidi.decoder"]:
+        logging.getLogger(name).setLevel("WARNING")
+
+
+def _payload_array(chunk):
+    index = chunk["events"]["payload"]
+    has_payload = index >= 0
+    lengths = np.diff(chunk["payload_offsets"])
+    row_lengths = np.zeros(len(index), dtype=np.int64)
+    row_lengths[has_payload] = lengths[index[has_payload]]
+    # payloads are stored in event order, so the blob already holds the rows' payloads one after another
+    offsets = np.zeros(len(index) + 1, dtype=np.int32)
+    np.cumsum(row_lengths, out=offsets[1:])
+    validity = np.packbits(has_payload, bitorder="little")
+    return pa.Array.from_buffers(pa.binary(), len(index), [pa.py_buffer(validity), pa.py_buffer(offsets),
+                                                           pa.py_buffer(chunk["payloads"])],
+                                 null_count=len(index) - int(has_payload.sum()))
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise Exception("Exporting to Arrow needs pyarrow, which is not installed")
@@ -0,0 +1,106 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from pymidi.chunks import parse_file, COLUMNAR_EVENTS
+from pymidi.export import file_batches, iter_batches, write_parquet, pa, pq
+from pymidi.generate import generate_corpus
+from pymidi.tempo import TempoMap
+
+FORMAT_0_EXAMPLE = "data/format_0_example_1.mid"
+FORMAT_1_EXAMPLE = "data/format_1_example_1.mid"
+# a Set Tempo of 1 second per quarter note
+TEMPO_TRACK = bytes.fromhex("00 FF 51 03 0F 42 40  00 FF 2F 00")
+# a Note On, then an undefined status byte
+BAD_TRACK = bytes.fromhex("00 90 3C 40  10 F4 00  00 FF 2F 00")
+GOOD_TRACK = bytes.fromhex("00 90 3C 40  60 80 3C 40  00 FF 2F 00")
+
+
+def midi_file(midi_format, *tracks):
+    header = b"MThd" + (6).to_bytes(4, "big") + bytes([0, midi_format, 0, len(tracks), 0, 0x60])
+    return header + b"".join(b"MTrk" + len(track).to_bytes(4, "big") + track for track in tracks)
+
+
+@unittest.skipIf(pa is None, "needs pyarrow")
+class ExportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_rows_match_parsed_events(self):
+        generate_corpus(self.directory, 1, seed=3, jobs=1, tracks=3, events=2000, tempo_rate=0.01,
+                        sysex_rate=0.01, sysex_size=100)
+        path = os.path.join(self.directory, "000000.mid")
+        chunks = parse_file(path)
+        tempo_map = TempoMap.from_chunks(chunks)
+        batches = file_batches(path, file_id="a")
+
+        self.assertEqual(len(batches), 3)
+        for track, (batch, chunk) in enumerate(zip(batches, chunks[1:])):
+            rows = batch.to_pydict()
+            ticks = np.cumsum([delta for delta, _ in chunk["events"]])
+            self.assertEqual(rows["file_id"], ["a"] * len(ticks))
+            self.assertEqual(rows["track"], [track] * len(ticks))
+            self.assertEqual(rows["tick"], ticks.tolist())
+            np.testing.assert_allclose(rows["seconds"], tempo_map.to_seconds(ticks))
+            events = [event for _, event in chunk["events"]]
+            self.assertEqual(rows["type"], [event["type"] for event in events])
+            self.assertEqual(rows["sub_type"], [event["sub_type"] for event in events])
+            self.assertEqual(rows["channel"], [event["channel"] if event["type"] == "MIDI" else None
+                                               for event in events])
+            self.assertEqual(rows["payload"], [event["data"].bytes if event["type"] != "MIDI" else None
+                                               for event in events])
+
+    def test_columns_match_columnar_tracks(self):
+        columnar = parse_file(FORMAT_1_EXAMPLE, event_format=COLUMNAR_EVENTS)
+        table = pa.Table.from_batches(list(iter_batches([FORMAT_1_EXAMPLE])))
+        events = np.concatenate([chunk["events"] for chunk in columnar[1:]])
+        for column in ["status", "data1", "data2"]:
+            self.assertEqual(table.column(column).to_pylist(), events[column].tolist())
+
+    def test_writing_parquet_in_row_groups(self):
+        output = os.path.join(self.directory, "events.parquet")
+        broken = os.path.join(self.directory, "broken.mid")
+        with open(broken, "wb") as f:
+            f.write(b"MThd\x00\x00\x00\x06\x00")
+
+        totals = write_parquet([FORMAT_0_EXAMPLE, broken, FORMAT_1_EXAMPLE], output, row_group_size=5,
+                               file_ids=["zero", "broken", "one"])
+
+        self.assertEqual((totals["files"], totals["failures"], totals["rows"], totals["row_groups"]), (2, 1, 31, 7))
+        parquet = pq.ParquetFile(output)
+        self.assertEqual([parquet.metadata.row_group(i).num_rows for i in range(7)], [5] * 6 + [1])
+        table = parquet.read()
+        self.assertEqual(table.column("file_id").to_pylist(), ["zero"] * 14 + ["one"] * 17)
+        self.assertEqual(table.to_pylist(), pa.Table.from_batches(
+            file_batches(FORMAT_0_EXAMPLE, "zero") + file_batches(FORMAT_1_EXAMPLE, "one")).to_pylist())
+
+    def test_tracks_are_numbered_by_their_place_in_the_file(self):
+        for midi_format, seconds in ((1, [0.0, 1.0, 1.0]), (2, [0.0, 0.5, 0.5])):
+            path = os.path.join(self.directory, "{}.mid".format(midi_format))
+            with open(path, "wb") as f:
+                f.write(midi_file(midi_format, TEMPO_TRACK, BAD_TRACK, GOOD_TRACK))
+
+            with self.assertLogs("pymidi.export", "WARNING"):
+                batches = file_batches(path)
+            self.assertEqual(len(batches), 2)
+            rows = batches[1].to_pydict()
+            self.assertEqual(rows["track"], [2, 2, 2])
+            self.assertEqual(rows["seconds"], seconds)
+
+    def test_exporting_in_parallel_keeps_file_order(self):
+        generate_corpus(self.directory, 4, seed=1, jobs=1, tracks=2, events=100)
+        paths = sorted(os.path.join(self.directory, name) for name in os.listdir(self.directory))
+
+        self.assertEqual(pa.Table.from_batches(list(iter_batches(paths, jobs=2, chunksize=1))).to_pylist(),
+                         pa.Table.from_batches(list(iter_batches(paths))).to_pylist())
+
+
+if __name__ == "__main__":
+    unittest.main()
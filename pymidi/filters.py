@@ -0,0 +1,199 @@
+"""
+Parsing only the events a job needs.
+
+An EventFilter passed as the event_filter argument of parse_chunks,
+parse_file, parse_buffer, process_chunk or process_track_chunk selects
+events by type, sub type and channel, and track chunks by number. Events
+that do not match are stepped over by their lengths as they are read,
+without building event objects for them or copying their payloads, and
+track chunks that do not match are not decoded at all.
+"""
+from pymidi.decoder import build_event_item, check_meta_length, event_type, CHANNEL_MODE_MESSAGES, F0_SYSEX_STATUS, \
+    F7_SYSEX_STATUS, META_STATUS, META_TYPE_NAMES, MIDI_DATA_LENGTHS, END_OF_TRACK
+from pymidi.errors import TrackError
+from pymidi.events import META, MIDI, SYSEX
+from pymidi.vlq import read_vlq
+
+# the sub types each kind of channel message can be decoded as, indexed by the high nibble of the status byte
+_CHANNEL_SUB_TYPES = (None, None, None, None, None, None, None, None, {"Note Off"}, {"Note On", "Note Off"},
+                      {"Polyphonic Key Pressure"}, {"Controller Change"} | set(CHANNEL_MODE_MESSAGES.values()),
+                      {"Program Change"}, {"Channel Key Pressure"}, {"Pitch Bend"}, None)
+
+SUB_TYPES = set().union(*(sub_types for sub_types in _CHANNEL_SUB_TYPES if sub_types)) | \
+    set(META_TYPE_NAMES.values()) | {"Unknown", "F0", "F7"}
+
+
+class EventFilter(object):
+    """
+    Selects the events and track chunks to parse. An event is kept if it
+    matches every criterion given; None matches everything.
+
+    Deltas of the events kept are relative to the previous event kept, so
+    their absolute times are the same as in a full parse.
+    """
+
+    def __init__(self, types=None, sub_types=None, channels=None, tracks=None):
+        """
+        :param types: event types to keep: MIDI, META and/or SYSEX
+        :param sub_types: event sub types to keep, as named in event dicts, e.g. "Note On" or "Set Tempo". Note On
+                          events with velocity 0 are Note Off events, as in event dicts.
+        :param channels: channels (1 - 16) of the channel messages to keep. Meta and Sysex events have no channel, and
+                         are not affected.
+        :param tracks: numbers of the track chunks to parse, from 0 in file order. The others are returned as None.
+        """
+        self.types = None if types is None else set(types)
+        self.sub_types = None if sub_types is None else set(sub_types)
+        self.channels = None if channels is None else set(channels)
+        self.tracks = None if tracks is None else set(tracks)
+        if self.types is not None and not self.types <= {MIDI, META, SYSEX}:
+            raise Exception("Unrecognised event types {}".format(self.types - {MIDI, META, SYSEX}))
+        if self.sub_types is not None and not self.sub_types <= SUB_TYPES:
+            raise Exception("Unrecognised event sub types {}".format(self.sub_types - SUB_TYPES))
+
+        # whether to keep events with each status byte: True, False, or None if it also depends on their data bytes
+        self.statuses = tuple(self._status_matches(status) for status in range(256))
+        # whether to keep meta events of each meta type
+        self.meta_types = tuple(self._sub_type_matches(META, META_TYPE_NAMES.get(meta_type, "Unknown"))
+                                for meta_type in range(256))
+
+    def matches_track(self, track_number):
+        return self.tracks is None or track_number in self.tracks
+
+    def matches(self, status, data1, data2):
+        """
+        Returns whether to keep a channel message whose status byte alone
+        does not decide it.
+        """
+        return event_type(status, data1, data2) in self.sub_types
+
+    def keeps(self, status, data1, data2):
+        """
+        Returns whether to keep an event, from the raw fields returned by
+        read_event.
+        """
+        if status == META_STATUS:
+            return self.meta_types[data1]
+        keep = self.statuses[status]
+        return self.matches(status, data1, data2) if keep is None else keep
+
+    def _status_matches(self, status):
+        if status == F0_SYSEX_STATUS or status == F7_SYSEX_STATUS:
+            return self._sub_type_matches(SYSEX, "{:02X}".format(status))
+        sub_types = _CHANNEL_SUB_TYPES[status >> 4]
+        if sub_types is None:
+            return False
+        if self.types is not None and MIDI not in self.types:
+            return False
+        if self.channels is not None and (status & 0x0F) + 1 not in self.channels:
+            return False
+        if self.sub_types is None or sub_types <= self.sub_types:
+            return True
+        return None if sub_types & self.sub_types else False
+
+    def _sub_type_matches(self, type_, sub_type):
+        return (self.types is None or type_ in self.types) and (self.sub_types is None or sub_type in self.sub_types)
+
+
+def raw_fields(delta, status, data1, data2, payload, views=False):
+    """
+    An event builder returning the raw (delta, status, data1, data2, payload) fields of each event. Meta events of the
+    wrong length for their type raise, as building their event would.
+    """
+    if status == META_STATUS:
+        check_meta_length(data1, len(payload))
+    return delta, status, data1, data2, payload
+
+
+def filter_track(data, event_filter, pos=0, end=None, views=False, build=None):
+    """
+    decode_track for the events of a track chunk that match an EventFilter.
+
+    :param data: bytes, bytearray or memoryview containing the track data
+    :param event_filter: the EventFilter to apply
+    :param pos: offset of the first event within data
+    :param end: offset one past the last byte of the track (defaults to len(data))
+    :param views: whether to return payloads as slices of data
+    :param build: function building each item of the list from the raw fields of an event, as for decode_track
+    :return: a list of (delta, event) tuples, or of whatever build returns, for the events kept
+    """
+    if end is None:
+        end = len(data)
+    if build is None:
+        build = build_event_item
+    statuses = event_filter.statuses
+    meta_types = event_filter.meta_types
+    matches = event_filter.matches
+
+    events = []
+    append = events.append
+    running_status = None
+    status = meta_type = None
+    # ticks since the last event kept
+    delta = 0
+    try:
+        while pos < end:
+            byte = data[pos]
+            pos += 1
+            event_delta = byte & 0x7F
+            while byte & 0x80:
+                byte = data[pos]
+                pos += 1
+                event_delta = (event_delta << 7) | (byte & 0x7F)
+            delta += event_delta
+
+            status = data[pos]
+            if status == META_STATUS:
+                meta_type = data[pos + 1]
+                length, pos = read_vlq(data, pos + 2)
+                if meta_types[meta_type]:
+                    append(build(delta, status, meta_type, None, data[pos:pos + length], views))
+                    delta = 0
+                pos += length
+                continue
+
+            if status == F0_SYSEX_STATUS or status == F7_SYSEX_STATUS:
+                length, pos = read_vlq(data, pos + 1)
+                if statuses[status]:
+                    append(build(delta, status, None, None, data[pos:pos + length], views))
+                    delta = 0
+                pos += length
+                continue
+
+            if status & 0x80:
+                pos += 1
+                running_status = status
+            elif running_status is not None:
+                status = running_status
+            else:
+                raise TrackError("No status byte, and no running status set")
+
+            data_length = MIDI_DATA_LENGTHS[status >> 4]
+            keep = statuses[status]
+            if data_length == 2:
+                data1 = data[pos]
+                data2 = data[pos + 1]
+                if (data1 | data2) & 0x80:
+                    raise TrackError("Data byte of MIDI event {:02x} has its top bit set".format(status))
+                if keep or keep is None and matches(status, data1, data2):
+                    append(build(delta, status, data1, data2, None, views))
+                    delta = 0
+                pos += 2
+            elif data_length == 1:
+                data1 = data[pos]
+                if data1 & 0x80:
+                    raise TrackError("Data byte of MIDI event {:02x} has its top bit set".format(status))
+                if keep or keep is None and matches(status, data1, None):
+                    append(build(delta, status, data1, None, None, views))
+                    delta = 0
+                pos += 1
+            else:
+                raise TrackError("Unrecognised MIDI event {:02x}".format(status))
+    except IndexError:
+        raise TrackError("Track data ended part way through an event")
+
+    if pos > end:
+        raise TrackError("Last event overruns the end of the track by {} bytes".format(pos - end))
+    if status != META_STATUS or meta_type != END_OF_TRACK:
+        raise TrackError("End of Track event missing")
+
+    return events
@@ -0,0 +1,126 @@
+import io
+import unittest
+
+import numpy as np
+
+from pymidi.chunks import parse_buffer, parse_chunks, parse_file, process_track_chunk, COLUMNAR_EVENTS, TYPED_EVENTS
+from pymidi.events import META, MIDI, SYSEX
+from pymidi.filters import EventFilter, filter_track
+from pymidi.generate import generate_track
+from pymidi.stats import ParseStats
+
+FORMAT_1_EXAMPLE = "data/format_1_example_1.mid"
+
+
+def absolute(events):
+    tick = 0
+    timed = []
+    for delta, event in events:
+        tick += delta
+        timed.append((tick, event))
+    return timed
+
+
+class EventFilterTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.track = generate_track(np.random.default_rng(1), 5000, channels=16, tempo_rate=0.01, sysex_rate=0.01,
+                                   sysex_size=100)
+        cls.events = absolute(process_track_chunk(cls.track)["events"])
+
+    def assertFiltered(self, event_filter, keep):
+        events = absolute(process_track_chunk(self.track, event_filter=event_filter)["events"])
+        expected = [(tick, event) for tick, event in self.events if keep(event)]
+        self.assertTrue(expected)
+        self.assertEqual(events, expected)
+
+    def test_sub_types_and_channels(self):
+        self.assertFiltered(EventFilter(sub_types={"Note On", "Note Off"}, channels={1, 2}),
+                            lambda event: event["sub_type"] in ("Note On", "Note Off") and event["channel"] in (1, 2))
+
+    def test_note_offs_include_note_ons_with_velocity_0(self):
+        self.assertFiltered(EventFilter(sub_types={"Note Off"}), lambda event: event["sub_type"] == "Note Off")
+
+    def test_types(self):
+        self.assertFiltered(EventFilter(types={META, SYSEX}), lambda event: event["type"] in (META, SYSEX))
+
+    def test_channels_do_not_affect_meta_events(self):
+        self.assertFiltered(EventFilter(channels={3}), lambda event: event["type"] != MIDI or event["channel"] == 3)
+
+    def test_meta_sub_types(self):
+        self.assertFiltered(EventFilter(sub_types={"Set Tempo", "End of Track"}),
+                            lambda event: event["sub_type"] in ("Set Tempo", "End of Track"))
+
+    def test_channel_mode_messages(self):
+        track = bytes.fromhex("00 B0 07 40  10 7B 00  10 79 00  00 FF 2F 00")
+        events = process_track_chunk(track, event_filter=EventFilter(sub_types={"All Notes Off"}))["events"]
+        self.assertEqual(events, [(0x10, {"type": MIDI, "sub_type": "All Notes Off", "channel": 1, "value": 0})])
+
+    def test_empty_filter_keeps_everything(self):
+        self.assertEqual(absolute(process_track_chunk(self.track, event_filter=EventFilter())["events"]), self.events)
+
+    def test_typed_and_columnar(self):
+        event_filter = EventFilter(sub_types={"Note On"}, channels={5})
+        dict_events = process_track_chunk(self.track, event_filter=event_filter)["events"]
+        typed = process_track_chunk(self.track, event_format=TYPED_EVENTS, event_filter=event_filter)["events"]
+        self.assertEqual([(event.delta, event.channel, event.note) for event in typed],
+                         [(delta, event["channel"], event["note"]) for delta, event in dict_events])
+        columns = process_track_chunk(self.track, event_format=COLUMNAR_EVENTS, event_filter=event_filter)["events"]
+        self.assertEqual(columns["tick"].tolist(), [tick for tick, _ in absolute(dict_events)])
+        self.assertEqual(columns["data1"].tolist(), [event["note"] for _, event in dict_events])
+
+    def test_columnar_payloads(self):
+        columnar = process_track_chunk(self.track, event_format=COLUMNAR_EVENTS, event_filter=EventFilter(
+            types={SYSEX}))
+        sysexes = [event for _, event in self.events if event["type"] == SYSEX]
+        self.assertEqual(len(columnar["events"]), len(sysexes))
+        self.assertEqual(columnar["payloads"], b"".join(event["data"].bytes for event in sysexes))
+
+    def test_end_of_track_is_checked_even_if_filtered_out(self):
+        with self.assertRaisesRegex(Exception, "End of Track event missing"):
+            filter_track(bytes.fromhex("00 90 3C 40"), EventFilter(sub_types={"Note On"}))
+        with self.assertRaisesRegex(Exception, "overruns the end of the track"):
+            filter_track(bytes.fromhex("00 FF 01 05 41"), EventFilter(sub_types={"Note On"}))
+
+    def test_running_status_across_skipped_events(self):
+        # the second Note On uses the running status of a Note On on channel 2, which is filtered out
+        track = bytes.fromhex("00 90 3C 40  00 91 3E 40  05 40 40  00 FF 2F 00")
+        events = process_track_chunk(track, event_filter=EventFilter(channels={2}, types={MIDI}))["events"]
+        self.assertEqual([(delta, event["note"]) for delta, event in events], [(0, 0x3E), (5, 0x40)])
+
+    def test_unrecognised_sub_types(self):
+        with self.assertRaises(Exception):
+            EventFilter(sub_types={"Note"})
+        with self.assertRaises(Exception):
+            EventFilter(types={"NOTE"})
+
+    def test_counts_only_events_kept(self):
+        stats = ParseStats()
+        process_track_chunk(self.track, stats=stats, event_filter=EventFilter(sub_types={"Note On"}))
+        self.assertEqual(list(stats.event_counts), ["Note On"])
+
+
+class TrackFilterTest(unittest.TestCase):
+
+    def test_tracks_left_out_are_none(self):
+        with open(FORMAT_1_EXAMPLE, "rb") as f:
+            data = f.read()
+        full = parse_buffer(data)
+        event_filter = EventFilter(tracks={0, 2})
+        for chunks in [parse_buffer(data, event_filter=event_filter),
+                       parse_chunks(io.BytesIO(data), event_filter=event_filter),
+                       parse_file(FORMAT_1_EXAMPLE, event_filter=event_filter)]:
+            self.assertEqual(chunks[0], full[0])
+            self.assertEqual(chunks[1]["events"], full[1]["events"])
+            self.assertIsNone(chunks[2])
+            self.assertEqual(chunks[3]["events"], full[3]["events"])
+            self.assertIsNone(chunks[4])
+
+    def test_raw_data_is_not_kept(self):
+        chunks = parse_file(FORMAT_1_EXAMPLE, keep_raw=True, event_filter=EventFilter(types={MIDI}))
+        self.assertNotIn("raw", chunks[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,202 @@
+"""
+Generation of synthetic Standard MIDI Files at scale, for load testing.
+
+Files are seeded: the same seed, file number and options always give the
+same bytes, whichever files are generated alongside them. Each track is a
+random mix of notes, controller changes, program changes, pitch bends,
+tempo changes and Sysex events, in proportions given by the options. Notes
+are written as Note On pairs, the second with velocity 0, and the status
+byte of a channel message is left out whenever it repeats the previous
+one, so tracks with few channels are mostly running status.
+
+Tracks are assembled with NumPy, a field at a time for every event at
+once, rather than an event at a time.
+"""
+import os
+import time
+from functools import partial
+from multiprocessing import Pool
+
+import numpy as np
+
+from pymidi.chunks import HEADER, TRACK_TYPE
+from pymidi.vlq import encode_vlq, vlq_lengths
+from pymidi.writer import encode_header_chunk
+
+DEFAULT_DIVISION = 480
+# largest mean delta time, which keeps every delta within two bytes
+MAX_MEAN_DELTA = 0x1000
+END_OF_TRACK = b"\x00\xff\x2f\x00"
+
+# kinds of event, in the order of the probabilities passed to generate_track
+NOTE = 0
+CONTROLLER = 1
+PROGRAM = 2
+PITCH_BEND = 3
+TEMPO = 4
+SYSEX = 5
+
+_STATUS_BYTES = np.array([0x90, 0xB0, 0xC0, 0xE0, 0xFF, 0xF0], dtype=np.int16)
+# bytes following the status byte, except for Sysex events, whose length varies
+_BODY_LENGTHS = np.array([2, 2, 1, 2, 5, 0], dtype=np.int64)
+
+
+def generate_track(rng, events, channels=4, controller_rate=0.05, program_rate=0.005, pitch_bend_rate=0.02,
+                   tempo_rate=0.001, sysex_rate=0.0001, sysex_size=64 * 1024, mean_delta=60):
+    """
+    Generates the data of a track chunk.
+
+    :param rng: a numpy.random.Generator
+    :param events: number of events, including the End of Track event
+    :param channels: number of channels used, from channel 1 up
+    :param controller_rate: fraction of events that are Controller Change events
+    :param program_rate: fraction of events that are Program Change events
+    :param pitch_bend_rate: fraction of events that are Pitch Bend events
+    :param tempo_rate: fraction of events that are Set Tempo events
+    :param sysex_rate: fraction of events that are Sysex events
+    :param sysex_size: largest Sysex event generated, in bytes of data. Sizes are uniform from 1 up to this.
+    :param mean_delta: mean delta time between events, in ticks. Half of all deltas are 0.
+    :return: the track data, without the chunk's type and length, as bytes
+    """
+    count = events - 1
+    if count < 0:
+        raise Exception("A track needs at least 1 event, for its End of Track, found {}".format(events))
+    if not 1 <= channels <= 16:
+        raise Exception("Channels must be from 1 to 16, found {}".format(channels))
+    rates = [controller_rate, program_rate, pitch_bend_rate, tempo_rate, sysex_rate]
+    note_rate = 1.0 - sum(rates)
+    if note_rate < 0 or min(rates) < 0:
+        raise Exception("Event rates must be positive and sum to at most 1, found {}".format(rates))
+    if not 0 < mean_delta <= MAX_MEAN_DELTA:
+        raise Exception("Mean delta must be from 1 to {}, found {}".format(MAX_MEAN_DELTA, mean_delta))
+
+    kinds = rng.choice(6, size=count, p=[note_rate] + rates).astype(np.int8)
+    channel_messages = kinds <= PITCH_BEND
+    channel = rng.integers(0, channels, size=count, dtype=np.uint8)
+    data1, data2 = np.frombuffer(rng.bytes(2 * count), dtype=np.uint8).reshape(2, count) & 0x7F
+
+    # notes are in pairs, the second ending the first: same channel and pitch, velocity 0. An unpaired last note is
+    # left sounding, to be ended by the End of Track event.
+    notes = np.flatnonzero(kinds == NOTE)
+    note_ons, note_offs = notes[0:len(notes) - 1:2], notes[1::2]
+    channel[note_offs] = channel[note_ons]
+    data1[note_offs] = data1[note_ons]
+    data2[note_ons] |= data2[note_ons] == 0
+    data2[note_offs] = 0
+    # controller numbers from 0x78 up are channel mode messages, which are not generated
+    controllers = np.flatnonzero(kinds == CONTROLLER)
+    data1[controllers] %= 0x78
+
+    status = _STATUS_BYTES[kinds] | (channel * channel_messages)
+    previous = np.roll(status, 1)
+    previous[:1] = -1
+    # meta events and Sysex events always have their status byte, and cancel running status, as their status bytes
+    # differ from any channel message's
+    has_status = (status != previous) | ~channel_messages
+
+    # half of all deltas are 0, and the rest uniform below 4 * mean_delta
+    random = np.frombuffer(rng.bytes(4 * count), dtype=np.uint32)
+    deltas = (random >> 1) % (4 * mean_delta) * (random & 1)
+    long_deltas = deltas >= 0x80
+    delta_lengths = 1 + long_deltas
+
+    sysexes = np.flatnonzero(kinds == SYSEX)
+    sysex_lengths = rng.integers(1, sysex_size + 1, size=len(sysexes))
+    lengths = delta_lengths + has_status + _BODY_LENGTHS[kinds]
+    lengths[sysexes] += sysex_lengths + vlq_lengths(sysex_lengths)
+
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    size = int(ends[-1]) if count else 0
+    data = np.empty(size + len(END_OF_TRACK), dtype=np.uint8)
+
+    # every event's fields are written to the same place in it whatever its kind, working back from the second data
+    # byte to the first delta byte, so that each field overwrites whatever a field of another kind of event wrote
+    # there. A Program Change's second data byte lands on the next event's first delta byte, and the last event's on
+    # the End of Track, both written later. Meta and Sysex event bodies are written last of all.
+    body = starts + delta_lengths + has_status
+    data[body + 1] = data2
+    data[body] = data1
+    data[body - 1] = status
+    data[body - has_status - 1] = deltas & 0x7F
+    data[starts] = np.where(long_deltas, 0x80 | (deltas >> 7), deltas)
+
+    tempos = body[kinds == TEMPO]
+    # 30 to 200 beats per minute
+    microseconds = rng.integers(300000, 2000000, size=len(tempos))
+    data[tempos] = 0x51
+    data[tempos + 1] = 3
+    data[tempos + 2] = microseconds >> 16
+    data[tempos + 3] = (microseconds >> 8) & 0xFF
+    data[tempos + 4] = microseconds & 0xFF
+
+    for pos, length in zip(body[sysexes].tolist(), sysex_lengths.tolist()):
+        vlq = encode_vlq(length)
+        data[pos:pos + len(vlq)] = np.frombuffer(vlq, dtype=np.uint8)
+        pos += len(vlq)
+        data[pos:pos + length - 1] = rng.integers(0, 0x80, size=length - 1, dtype=np.uint8)
+        data[pos + length - 1] = 0xF7
+
+    data[size:] = np.frombuffer(END_OF_TRACK, dtype=np.uint8)
+    return data.tobytes()
+
+
+def generate_file(f, seed, number=0, tracks=16, events=10000, division=DEFAULT_DIVISION, **options):
+    """
+    Writes a synthetic MIDI file to a binary file object. Files of a single
+    track are Format 0, and the rest Format 1.
+
+    :param seed: seed of the corpus the file belongs to
+    :param number: number of the file in the corpus, which seeds it together with seed
+    :param tracks: number of track chunks
+    :param events: number of events in each track, including its End of Track event
+    :param division: ticks per quarter note
+    :param options: keyword arguments for generate_track
+    :return: number of bytes written
+    """
+    if not 1 <= tracks <= 0xFFFF:
+        raise Exception("Files must have from 1 to 65535 tracks, found {}".format(tracks))
+    header = {
+        "type": HEADER,
+        "format": 0 if tracks == 1 else 1,
+        "track_count": tracks,
+        "division": {"format": "time units per quarter note", "time_units": division},
+    }
+    written = f.write(encode_header_chunk(header))
+    for track in range(tracks):
+        # a generator per track, so that a track's content does not depend on the options of those before it
+        data = generate_track(np.random.default_rng([seed, number, track]), events, **options)
+        written += f.write(TRACK_TYPE + len(data).to_bytes(4, "big"))
+        written += f.write(data)
+    return written
+
+
+def generate_corpus(directory, files, seed=0, jobs=None, **options):
+    """
+    Writes synthetic MIDI files across a pool of worker processes, to a
+    directory, named by their number. Files are the same whatever the number
+    of workers.
+
+    :param directory: directory to write the files to, created if need be
+    :param files: number of files
+    :param seed: seed of the corpus
+    :param jobs: number of worker processes (defaults to the number of CPUs)
+    :param options: keyword arguments for generate_file
+    :return: a dict of totals: files and bytes written, seconds taken, and MB written per second
+    """
+    os.makedirs(directory, exist_ok=True)
+    totals = {"files": 0, "bytes": 0}
+    start = time.perf_counter()
+    with Pool(jobs) as pool:
+        for written in pool.imap_unordered(partial(_generate_numbered_file, directory, seed, options), range(files)):
+            totals["files"] += 1
+            totals["bytes"] += written
+
+    totals["seconds"] = time.perf_counter() - start
+    totals["mb_per_second"] = totals["bytes"] / 1e6 / totals["seconds"] if totals["seconds"] else 0.0
+    return totals
+
+
+def _generate_numbered_file(directory, seed, options, number):
+    with open(os.path.join(directory, "{:06d}.mid".format(number)), "wb") as f:
+        return generate_file(f, seed, number, **options)
@@ -0,0 +1,107 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from pymidi.chunks import parse_buffer, COLUMNAR_EVENTS
+from pymidi.decoder import decode_track
+from pymidi.generate import generate_corpus, generate_file, generate_track
+from pymidi.notes import NoteTable
+
+
+def generate_bytes(seed, number=0, **options):
+    f = io.BytesIO()
+    written = generate_file(f, seed, number, **options)
+    assert written == len(f.getvalue())
+    return f.getvalue()
+
+
+class GenerateTrackTest(unittest.TestCase):
+
+    def test_decodes_to_the_requested_number_of_events(self):
+        data = generate_track(np.random.default_rng(1), 5000, sysex_rate=0.01, sysex_size=300)
+        events = decode_track(data)
+        self.assertEqual(len(events), 5000)
+        self.assertEqual(events[-1][1]["sub_type"], "End of Track")
+        self.assertEqual(sum(1 for _, event in events if event["sub_type"] == "End of Track"), 1)
+
+    def test_event_mix(self):
+        data = generate_track(np.random.default_rng(2), 20000, tempo_rate=0.05, sysex_rate=0.01, sysex_size=3000)
+        sub_types = [event["sub_type"] for _, event in decode_track(data)]
+        for sub_type in ["Note On", "Note Off", "Controller Change", "Program Change", "Pitch Bend", "Set Tempo",
+                         "F0"]:
+            self.assertIn(sub_type, sub_types)
+        self.assertAlmostEqual(sub_types.count("Set Tempo") / len(sub_types), 0.05, delta=0.01)
+        self.assertAlmostEqual(sub_types.count("F0") / len(sub_types), 0.01, delta=0.005)
+
+    def test_running_status(self):
+        # on one channel, with only notes, every event after the first leaves out its status byte
+        data = generate_track(np.random.default_rng(3), 1001, channels=1, controller_rate=0, program_rate=0,
+                              pitch_bend_rate=0, tempo_rate=0, sysex_rate=0, mean_delta=1)
+        self.assertEqual(len(data), 1 + 1000 * 3 + 4)
+
+    def test_notes_are_paired(self):
+        data = b"MThd" + (6).to_bytes(4, "big") + bytes.fromhex("0000 0001 0060")
+        track = generate_track(np.random.default_rng(4), 10000)
+        data += b"MTrk" + len(track).to_bytes(4, "big") + track
+        table = NoteTable.from_chunks(parse_buffer(data, event_format=COLUMNAR_EVENTS))
+        self.assertEqual(table.unmatched_note_offs, 0)
+        self.assertLessEqual(table.unterminated, 1)
+
+    def test_empty_track(self):
+        self.assertEqual(generate_track(np.random.default_rng(5), 1), b"\x00\xff\x2f\x00")
+
+    def test_invalid_options(self):
+        rng = np.random.default_rng(6)
+        with self.assertRaises(Exception):
+            generate_track(rng, 0)
+        with self.assertRaises(Exception):
+            generate_track(rng, 10, channels=17)
+        with self.assertRaises(Exception):
+            generate_track(rng, 10, controller_rate=0.6, pitch_bend_rate=0.6)
+
+
+class GenerateFileTest(unittest.TestCase):
+
+    def test_parses(self):
+        chunks = parse_buffer(generate_bytes(1, tracks=3, events=500, division=96))
+        self.assertEqual(chunks[0]["format"], 1)
+        self.assertEqual(chunks[0]["track_count"], 3)
+        self.assertEqual(chunks[0]["division"]["time_units"], 96)
+        self.assertEqual([len(chunk["events"]) for chunk in chunks[1:]], [500, 500, 500])
+
+    def test_single_track_is_format_0(self):
+        self.assertEqual(parse_buffer(generate_bytes(1, tracks=1, events=10))[0]["format"], 0)
+
+    def test_seeded(self):
+        self.assertEqual(generate_bytes(1, 2, tracks=2, events=1000), generate_bytes(1, 2, tracks=2, events=1000))
+        self.assertNotEqual(generate_bytes(1, 2, tracks=2, events=1000), generate_bytes(2, 2, tracks=2, events=1000))
+        self.assertNotEqual(generate_bytes(1, 2, tracks=2, events=1000), generate_bytes(1, 3, tracks=2, events=1000))
+        # a track does not depend on the tracks after it
+        self.assertTrue(generate_bytes(1, tracks=3, events=1000)[14:].startswith(
+            generate_bytes(1, tracks=1, events=1000)[14:]))
+
+
+class GenerateCorpusTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_writes_numbered_files(self):
+        totals = generate_corpus(self.directory, 3, seed=9, jobs=2, tracks=2, events=100)
+        names = sorted(os.listdir(self.directory))
+        self.assertEqual(names, ["000000.mid", "000001.mid", "000002.mid"])
+        self.assertEqual(totals["files"], 3)
+        self.assertEqual(totals["bytes"], sum(os.path.getsize(os.path.join(self.directory, n)) for n in names))
+        with open(os.path.join(self.directory, "000001.mid"), "rb") as f:
+            self.assertEqual(f.read(), generate_bytes(9, 1, tracks=2, events=100))
+
+
+if __name__ == "__main__":
+    unittest.main()
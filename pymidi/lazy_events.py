@@ -0,0 +1,177 @@
+"""
+Lazy events, which put off decoding their fields until they are read.
+
+Parsing with event_format=LAZY_EVENTS returns (delta, LazyEvent) tuples,
+as for dict events, but each LazyEvent only holds the event's status and
+data bytes, and for meta and Sysex events a (buffer, offset, length)
+reference to its payload in the track data, rather than a copy. The first
+time a field other than "type", "sub_type" or a channel message's
+"channel" is read, the event's dict is built by pymidi.decoder and kept.
+
+For files dominated by lyrics, markers or Sysex dumps that are never read,
+this saves decoding their payloads and holding a copy of each one. In
+return, every event holds a reference to its track's data, which stays in
+memory (or, when parsing a memory map, mapped) as long as any of them do.
+Meta events of the wrong length for their type are found while parsing,
+as for event dicts, so decoding a lazy event does not raise.
+"""
+from collections.abc import Mapping
+
+from pymidi.decoder import build_event, check_meta_length, event_type, F0_SYSEX_STATUS, F7_SYSEX_STATUS, META_STATUS, \
+    MIDI_DATA_LENGTHS, END_OF_TRACK
+from pymidi.errors import TrackError
+from pymidi.events import META, MIDI, SYSEX
+from pymidi.vlq import read_vlq
+
+
+class LazyEvent(Mapping):
+    """
+    An event dict that is only built when one of its fields is read. The
+    raw fields are kept as attributes: status, data1 and data2 as returned
+    by read_event, and payload(), which returns a memoryview of the payload
+    without decoding it.
+    """
+
+    __slots__ = ("status", "data1", "data2", "_buffer", "_offset", "_length", "_views", "_event")
+
+    def __init__(self, status, data1, data2, buffer=None, offset=0, length=0, views=False):
+        self.status = status
+        self.data1 = data1
+        self.data2 = data2
+        self._buffer = buffer
+        self._offset = offset
+        self._length = length
+        self._views = views
+        self._event = None
+
+    def payload(self):
+        """
+        Returns the payload of a meta or Sysex event as a memoryview of the
+        track data, or None for channel messages.
+        """
+        if self._buffer is None:
+            return None
+        return memoryview(self._buffer)[self._offset:self._offset + self._length]
+
+    def decoded(self):
+        """
+        Returns whether the event's dict has been built.
+        """
+        return self._event is not None
+
+    def __getitem__(self, key):
+        event = self._event
+        if event is None:
+            if key == "sub_type":
+                return event_type(self.status, self.data1, self.data2)
+            if key == "type":
+                return MIDI if self.status < 0xF0 else META if self.status == META_STATUS else SYSEX
+            if key == "channel" and self.status < 0xF0:
+                return (self.status & 0x0F) + 1
+            event = self._decode()
+        return event[key]
+
+    def __iter__(self):
+        return iter(self._decode())
+
+    def __len__(self):
+        return len(self._decode())
+
+    def __repr__(self):
+        return "LazyEvent({!r})".format(self._decode())
+
+    def _decode(self):
+        if self._event is None:
+            # slicing the buffer itself, so that payloads are decoded from the same types as by decode_track
+            payload = None if self._buffer is None else self._buffer[self._offset:self._offset + self._length]
+            self._event = build_event(self.status, self.data1, self.data2, payload, self._views)
+        return self._event
+
+
+def build_lazy_event(delta, status, data1, data2, payload, views=False):
+    """
+    Builds the (delta, LazyEvent) tuple for a set of raw fields returned by
+    read_event, keeping its payload as given. Can be passed as the build
+    argument of decode_track, but decode_lazy avoids slicing payloads at all.
+    """
+    if status == META_STATUS:
+        check_meta_length(data1, len(payload))
+    return delta, LazyEvent(status, data1, data2, payload, 0, len(payload) if payload is not None else 0, views)
+
+
+def decode_lazy(data, pos=0, end=None, views=False):
+    """
+    decode_track for lazy events: reads each event's delta, status and data
+    bytes, and the offset and length of its payload, and nothing else.
+
+    :param data: bytes, bytearray or memoryview containing the track data
+    :param pos: offset of the first event within data
+    :param end: offset one past the last byte of the track (defaults to len(data))
+    :param views: whether to return payloads as slices of data once decoded
+    :return: a list of (delta, LazyEvent) tuples
+    """
+    if end is None:
+        end = len(data)
+
+    events = []
+    append = events.append
+    running_status = None
+    status = data1 = None
+    try:
+        while pos < end:
+            byte = data[pos]
+            pos += 1
+            delta = byte & 0x7F
+            while byte & 0x80:
+                byte = data[pos]
+                pos += 1
+                delta = (delta << 7) | (byte & 0x7F)
+
+            status = data[pos]
+            if status == META_STATUS:
+                data1 = data[pos + 1]
+                length, pos = read_vlq(data, pos + 2)
+                check_meta_length(data1, length)
+                append((delta, LazyEvent(status, data1, None, data, pos, length, views)))
+                pos += length
+                continue
+
+            if status == F0_SYSEX_STATUS or status == F7_SYSEX_STATUS:
+                length, pos = read_vlq(data, pos + 1)
+                append((delta, LazyEvent(status, None, None, data, pos, length, views)))
+                pos += length
+                continue
+
+            if status & 0x80:
+                pos += 1
+                running_status = status
+            elif running_status is not None:
+                status = running_status
+            else:
+                raise TrackError("No status byte, and no running status set")
+
+            data_length = MIDI_DATA_LENGTHS[status >> 4]
+            if data_length == 2:
+                data1 = data[pos]
+                data2 = data[pos + 1]
+                if (data1 | data2) & 0x80:
+                    raise TrackError("Data byte of MIDI event {:02x} has its top bit set".format(status))
+                append((delta, LazyEvent(status, data1, data2)))
+                pos += 2
+            elif data_length == 1:
+                data1 = data[pos]
+                if data1 & 0x80:
+                    raise TrackError("Data byte of MIDI event {:02x} has its top bit set".format(status))
+                append((delta, LazyEvent(status, data1, None)))
+                pos += 1
+            else:
+                raise TrackError("Unrecognised MIDI event {:02x}".format(status))
+    except IndexError:
+        raise TrackError("Track data ended part way through an event")
+
+    if pos > end:
+        raise TrackError("Last event overruns the end of the track by {} bytes".format(pos - end))
+    if status != META_STATUS or data1 != END_OF_TRACK:
+        raise TrackError("End of Track event missing")
+
+    return events
@@ -0,0 +1,97 @@
+import io
+import unittest
+
+import numpy as np
+
+from pymidi.chunks import iter_chunks, parse_buffer, parse_file, process_track_chunk, COLUMNAR_EVENTS, LAZY_EVENTS
+from pymidi.events import META, MIDI, SYSEX
+from pymidi.filters import EventFilter
+from pymidi.generate import generate_track
+from pymidi.lazy_events import LazyEvent, decode_lazy
+from pymidi.stats import ParseStats
+from pymidi.writer import encode_events, raw_fields
+
+FORMAT_1_EXAMPLE = "data/format_1_example_1.mid"
+
+# a lyric, a marker, a vendor Sysex event, a Note On with velocity 0 and a Program Change under running status
+TRACK = bytes.fromhex("00 FF 05 05 68 65 6C 6C 6F  00 FF 06 03 65 6E 64  00 F0 03 43 10 F7  00 C1 05  10 90 3C 00 "
+                      "00 FF 2F 00")
+
+
+class LazyEventTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.track = generate_track(np.random.default_rng(1), 3000, channels=16, tempo_rate=0.01, sysex_rate=0.01,
+                                   sysex_size=100)
+
+    def test_events_equal_dict_events(self):
+        for track in [TRACK, self.track]:
+            self.assertEqual(process_track_chunk(track, event_format=LAZY_EVENTS)["events"],
+                             process_track_chunk(track)["events"])
+
+    def test_views(self):
+        lazy = process_track_chunk(memoryview(TRACK), views=True, event_format=LAZY_EVENTS)["events"]
+        self.assertIsInstance(lazy[0][1]["text"], memoryview)
+        self.assertEqual(bytes(lazy[0][1]["text"]), b"hello")
+
+    def test_fields_are_decoded_on_first_access(self):
+        events = [event for _, event in decode_lazy(TRACK)]
+        self.assertEqual([(event["type"], event["sub_type"]) for event in events],
+                         [(META, "Lyric"), (META, "Marker"), (SYSEX, "F0"), (MIDI, "Program Change"),
+                          (MIDI, "Note Off"), (META, "End of Track")])
+        self.assertEqual(events[3]["channel"], 2)
+        self.assertFalse(any(event.decoded() for event in events))
+
+        self.assertEqual(events[0]["text"], b"hello")
+        self.assertEqual(events[4]["velocity"], 48)
+        self.assertEqual([event.decoded() for event in events], [True, False, False, False, True, False])
+
+    def test_payloads_are_not_copied(self):
+        lyric = decode_lazy(TRACK)[0][1]
+        self.assertEqual((lyric.status, lyric.data1, lyric.data2), (0xFF, 0x05, None))
+        self.assertEqual(lyric.payload(), b"hello")
+        self.assertIs(lyric.payload().obj, TRACK)
+        self.assertIsNone(decode_lazy(TRACK)[3][1].payload())
+
+    def test_meta_lengths_are_checked_while_parsing(self):
+        # a Set Tempo event two bytes long
+        with self.assertRaisesRegex(Exception, "wrong length"):
+            decode_lazy(bytes.fromhex("00 FF 51 02 07 A1  00 FF 2F 00"))
+
+    def test_end_of_track_is_checked(self):
+        with self.assertRaisesRegex(Exception, "End of Track event missing"):
+            decode_lazy(bytes.fromhex("00 90 3C 40"))
+        with self.assertRaisesRegex(Exception, "overruns the end of the track"):
+            decode_lazy(bytes.fromhex("00 FF 01 05 41"))
+
+    def test_written_from_raw_fields(self):
+        lazy = process_track_chunk(self.track, event_format=LAZY_EVENTS)
+        # unlike event dicts, lazy events keep Note Ons with velocity 0 as they are, as columnar tracks do
+        self.assertEqual(encode_events(raw_fields(lazy)), encode_events(raw_fields(
+            process_track_chunk(self.track, event_format=COLUMNAR_EVENTS))))
+        self.assertFalse(any(event.decoded() for _, event in lazy["events"]))
+
+    def test_stats_and_filters(self):
+        stats = ParseStats()
+        events = process_track_chunk(self.track, event_format=LAZY_EVENTS, stats=stats,
+                                     event_filter=EventFilter(types={SYSEX}))["events"]
+        self.assertTrue(events)
+        self.assertTrue(all(isinstance(event, LazyEvent) for _, event in events))
+        self.assertEqual(events, process_track_chunk(self.track, event_filter=EventFilter(types={SYSEX}))["events"])
+        self.assertEqual(list(stats.event_counts), ["F0"])
+
+    def test_parsing_and_streaming_files(self):
+        with open(FORMAT_1_EXAMPLE, "rb") as f:
+            data = f.read()
+        expected = parse_buffer(data)
+        self.assertEqual(parse_file(FORMAT_1_EXAMPLE, event_format=LAZY_EVENTS), expected)
+        self.assertEqual(parse_file(FORMAT_1_EXAMPLE, mmap=True, event_format=LAZY_EVENTS),
+                         parse_file(FORMAT_1_EXAMPLE, mmap=True))
+        streamed = [list(chunk["events"]) for chunk in iter_chunks(io.BytesIO(data), event_format=LAZY_EVENTS)
+                    if chunk["type"] == "track"]
+        self.assertEqual(streamed, [chunk["events"] for chunk in expected[1:]])
+
+
+if __name__ == "__main__":
+    unittest.main()
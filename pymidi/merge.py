@@ -0,0 +1,142 @@
+"""
+Merging of the track chunks of a file into a single timeline, and
+conversion of Format 1 files to Format 0.
+
+Works with track chunks in any of the formats returned by pymidi.chunks:
+(delta, event dict) tuples, pymidi.typed_events objects, or columnar arrays.
+"""
+import copy
+from heapq import merge
+from operator import itemgetter
+
+from pymidi.chunks import HEADER, TRACK
+from pymidi.decoder import META_STATUS, END_OF_TRACK
+from pymidi.typed_events import Event, EndOfTrack
+
+
+def merge_tracks(tracks):
+    """
+    Lazily merges tracks into one timeline, keeping a heap of the next
+    event of each track, so that merging n events of k tracks takes
+    O(n log k) time and holds only k events at a time.
+
+    Events at the same tick are yielded in track order, and in file order
+    within a track.
+
+    :param tracks: a list of track chunks, e.g. the chunks of a file after the header
+    :return: an iterator of (absolute tick, track index, event) tuples, where track index is the position of the
+             track in tracks, and event is an event dict, typed event or columnar row
+    """
+    return merge(*[_timed_events(track, index) for index, track in enumerate(tracks)], key=itemgetter(0))
+
+
+def merge_chunks(chunks):
+    """
+    merge_tracks for the chunks of a whole file, as returned by
+    parse_chunks. Tracks are numbered from 0, leaving out unknown chunks.
+    """
+    return merge_tracks([chunk for chunk in chunks if chunk and chunk["type"] == TRACK])
+
+
+def _timed_events(track, index):
+    events = track["events"]
+    tick = 0
+    if "payload_offsets" in track:
+        for event, tick in zip(events, events["tick"].tolist()):
+            yield tick, index, event
+        return
+
+    for item in events:
+        if isinstance(item, Event):
+            tick += item.delta
+            yield tick, index, item
+        else:
+            delta, event = item
+            tick += delta
+            yield tick, index, event
+
+
+def to_format_0(chunks):
+    """
+    Converts the chunks of a Format 1 file into those of a Format 0 file
+    with the same events, merging every track into one. The End of Track
+    events of the original tracks are replaced by a single one, at the
+    time the last track ended.
+
+    :param chunks: the chunks of a file, as returned by parse_chunks, starting with the header
+    :return: a new list of chunks: a header chunk, and the merged track chunk. Events are shared with chunks,
+             except for typed events, which are copied to hold their new delta times.
+    """
+    header = chunks[0]
+    if not header or header["type"] != HEADER:
+        raise Exception("Chunks must start with a header chunk")
+    if header["format"] == 2:
+        raise Exception("Format 2 tracks are independent sequences, and cannot be merged into one track")
+    tracks = [chunk for chunk in chunks[1:] if chunk and chunk["type"] == TRACK]
+    if not tracks:
+        raise Exception("No track chunks to merge")
+
+    new_header = dict(header, format=0, track_count=1)
+    if "payload_offsets" in tracks[0]:
+        return [new_header, _merge_columns(tracks)]
+
+    typed = any(track["events"] and isinstance(track["events"][0], Event) for track in tracks)
+    events = []
+    previous_tick = 0
+    end_of_track = None
+    for tick, _, event in merge_tracks(tracks):
+        if event["sub_type"] == "End of Track":
+            end_of_track = event
+            continue
+        if typed:
+            event = copy.copy(event)
+            event.delta = tick - previous_tick
+            events.append(event)
+        else:
+            events.append((tick - previous_tick, event))
+        previous_tick = tick
+
+    # every track ends in an End of Track event, so the last one merged is at the time the last track ended
+    end_tick = tick
+    if typed:
+        events.append(EndOfTrack(end_tick - previous_tick))
+    else:
+        events.append((end_tick - previous_tick, end_of_track))
+
+    return [new_header, {"type": TRACK, "events": events}]
+
+
+def _merge_columns(tracks):
+    import numpy as np
+
+    payload_offsets = [0]
+    payloads = []
+    columns = []
+    for track in tracks:
+        events = track["events"].copy()
+        # renumber payloads to index the merged payload blob
+        events["payload"][events["payload"] >= 0] += len(payload_offsets) - 1
+        payload_offsets.extend((track["payload_offsets"][1:] + payload_offsets[-1]).tolist())
+        payloads.append(track["payloads"])
+        columns.append(events[~((events["status"] == META_STATUS) & (events["data1"] == END_OF_TRACK))])
+
+    end_tick = max(int(track["events"]["tick"][-1]) for track in tracks if len(track["events"]))
+    events = np.concatenate(columns)
+    # a stable sort on tick keeps events at the same tick in track order, then file order
+    events = events[np.argsort(events["tick"], kind="stable")]
+
+    end_of_track = np.zeros(1, dtype=events.dtype)
+    end_of_track["tick"] = end_tick
+    end_of_track["status"] = META_STATUS
+    end_of_track["data1"] = END_OF_TRACK
+    end_of_track["payload"] = len(payload_offsets) - 1
+    payload_offsets.append(payload_offsets[-1])
+    events = np.concatenate([events, end_of_track])
+    events["delta"] = np.diff(events["tick"], prepend=np.uint64(0))
+
+    return {
+        "type": TRACK,
+        "events": events,
+        "payload_offsets": np.array(payload_offsets, dtype=np.int64),
+        "payloads": b"".join(payloads),
+    }
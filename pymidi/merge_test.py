@@ -0,0 +1,81 @@
+import unittest
+
+from pymidi.chunks import parse_file, parse_buffer, TYPED_EVENTS, COLUMNAR_EVENTS
+from pymidi.merge import merge_chunks, merge_tracks, to_format_0
+from pymidi.typed_events import NoteOn, EndOfTrack
+from pymidi.writer import encode_chunks
+
+FORMAT_0_EXAMPLE = "data/format_0_example_1.mid"
+FORMAT_1_EXAMPLE = "data/format_1_example_1.mid"
+
+
+def track(*events):
+    return {"type": "track", "events": list(events)}
+
+
+class MergeTest(unittest.TestCase):
+
+    def test_merging_yields_events_in_time_order_with_ties_in_track_order(self):
+        first = track(NoteOn(0, 1, 60, 100), NoteOn(10, 1, 61, 100), EndOfTrack(5))
+        second = track(NoteOn(10, 2, 62, 100), NoteOn(0, 2, 63, 100), EndOfTrack(0))
+
+        merged = [(tick, index, getattr(event, "note", None)) for tick, index, event in merge_tracks([first, second])]
+
+        self.assertEqual(merged, [(0, 0, 60), (10, 0, 61), (10, 1, 62), (10, 1, 63), (10, 1, None), (15, 0, None)])
+
+    def test_merging_is_lazy(self):
+        merged = merge_tracks([track(NoteOn(0, 1, 60, 100), None)])
+
+        self.assertEqual(next(merged)[0], 0)
+
+    def test_merging_file_yields_every_event(self):
+        chunks = parse_file(FORMAT_1_EXAMPLE)
+
+        merged = list(merge_chunks(chunks))
+
+        self.assertEqual(len(merged), sum(len(chunk["events"]) for chunk in chunks[1:]))
+        self.assertEqual([tick for tick, _, _ in merged], sorted(tick for tick, _, _ in merged))
+
+    def test_converting_format_1_to_format_0(self):
+        for event_format in [None, TYPED_EVENTS, COLUMNAR_EVENTS]:
+            kwargs = {"event_format": event_format} if event_format else {}
+            expected = parse_file(FORMAT_0_EXAMPLE, event_format=TYPED_EVENTS)
+
+            chunks = to_format_0(parse_file(FORMAT_1_EXAMPLE, **kwargs))
+            # compare as typed events, after a round trip through the writer
+            converted = parse_buffer(encode_chunks(chunks), event_format=TYPED_EVENTS)
+
+            self.assertEqual(converted[0]["format"], 0)
+            self.assertEqual(converted[0]["track_count"], 1)
+            self.assertEqual(self.timeline(converted), self.timeline(expected))
+
+    def test_converting_keeps_single_end_of_track_at_end_of_longest_track(self):
+        chunks = [{"type": "header", "format": 1, "track_count": 2,
+                   "division": {"format": "time units per quarter note", "time_units": 96}},
+                  track(NoteOn(0, 1, 60, 100), EndOfTrack(50)),
+                  track(NoteOn(10, 2, 62, 100), EndOfTrack(0))]
+
+        events = to_format_0(chunks)[1]["events"]
+
+        self.assertEqual(events, [NoteOn(0, 1, 60, 100), NoteOn(10, 2, 62, 100), EndOfTrack(40)])
+
+    def test_converting_format_2_raises_exception(self):
+        chunks = parse_file(FORMAT_1_EXAMPLE)
+        chunks[0]["format"] = 2
+
+        with self.assertRaises(Exception):
+            to_format_0(chunks)
+
+    def timeline(self, chunks):
+        # events at each tick, ignoring their order within the tick and Note Off velocities
+        timeline = {}
+        for tick, _, event in merge_chunks(chunks):
+            if event.sub_type == "Note Off":
+                event.velocity = None
+            event.delta = None
+            timeline.setdefault(tick, []).append(repr(event))
+        return {tick: sorted(events) for tick, events in timeline.items()}
+
+
+if __name__ == "__main__":
+    unittest.main()
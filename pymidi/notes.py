@@ -0,0 +1,243 @@
+"""
+Extraction of notes from track chunks, pairing each Note On event with the
+Note Off event that ends it, into a table with an interval index for
+queries like "which notes sound between two ticks".
+
+Works with track chunks in any of the formats returned by pymidi.chunks:
+(delta, event dict) tuples, pymidi.typed_events objects, or columnar arrays.
+Note On events with velocity 0 are treated as Note Off events throughout.
+"""
+from bisect import bisect_left, bisect_right
+from collections import deque
+
+import numpy as np
+
+from pymidi.chunks import numbered_tracks
+from pymidi.typed_events import Event
+
+# start:    tick the note starts at (its Note On event)
+# end:      tick the note ends at (its Note Off event, or the end of the track if it has none)
+# pitch:    MIDI note number
+# velocity: velocity of the Note On event
+# channel:  1 - 16
+# track:    number of the track the note is in, from 0
+NOTE_DTYPE = np.dtype([
+    ("start", np.uint64),
+    ("end", np.uint64),
+    ("pitch", np.uint8),
+    ("velocity", np.uint8),
+    ("channel", np.uint8),
+    ("track", np.uint16),
+])
+
+
+class NoteTable(object):
+    """
+    The notes of a file, as a NOTE_DTYPE structured array sorted by start
+    tick, indexed by a centred interval tree.
+
+    Each node of the tree holds the notes sounding at its centre tick,
+    sorted both by start and by end, with the notes ending before it to its
+    left and those starting after it to its right. Finding the notes
+    sounding at a tick visits one node per level of the tree, taking a
+    binary search at each plus the time to gather the k notes found. Nodes
+    of up to LEAF_SIZE notes are not split any further, and are scanned.
+    """
+
+    LEAF_SIZE = 32
+
+    def __init__(self, notes, unterminated=0, unmatched_note_offs=0):
+        """
+        :param notes: a NOTE_DTYPE array
+        :param unterminated: number of notes without a Note Off, ended at the end of their track
+        :param unmatched_note_offs: number of Note Off events without a sounding note to end
+        """
+        self.notes = notes[np.argsort(notes["start"], kind="stable")]
+        self.unterminated = unterminated
+        self.unmatched_note_offs = unmatched_note_offs
+        self._starts = self.notes["start"]
+        self._start_list = self._starts.tolist()
+        # nodes are (centre, left node, right node, starts, indices by start, negated ends, indices by end) tuples of
+        # plain lists, which are quicker to binary search one value at a time than arrays. Leaves are (None, starts,
+        # ends, indices) tuples.
+        self._nodes = []
+        # zero length notes never sound at a tick, so are left out of the tree: overlapping() finds those inside a
+        # range by their starts. Every note in the tree then ends after its start, so every node holds at least one.
+        indices = np.flatnonzero(self.notes["end"] > self._starts)
+        self._root = self._build(indices, self._starts[indices].astype(np.int64),
+                                 self.notes["end"][indices].astype(np.int64))
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        """
+        Extracts the notes of every track chunk of a parsed file, numbering
+        tracks from 0 by their place in the file (see numbered_tracks).
+        """
+        return cls(*file_notes(chunks))
+
+    def __len__(self):
+        return len(self.notes)
+
+    def sounding_at(self, tick):
+        """
+        Returns the notes sounding at tick, i.e. with start <= tick < end,
+        in order of start.
+        """
+        indices = self._stab(tick)
+        indices.sort()
+        return self.notes[indices]
+
+    def overlapping(self, start, end):
+        """
+        Returns the notes sounding at any point from start up to (but not
+        including) end, i.e. with note start < end and note end > start, in
+        order of start.
+        """
+        if end <= start:
+            return self.notes[:0]
+        # the notes already sounding at start, then those starting after it, found by binary search on start
+        indices = self._stab(start)
+        indices.sort()
+        first = bisect_right(self._start_list, start)
+        last = bisect_left(self._start_list, end, first)
+        indices.extend(range(first, last))
+        return self.notes[indices]
+
+    def _stab(self, tick):
+        found = []
+        nodes = self._nodes
+        node = self._root
+        while node >= 0:
+            node = nodes[node]
+            centre = node[0]
+            if centre is None:
+                _, starts, ends, indices = node
+                found.extend(index for node_start, node_end, index in zip(starts, ends, indices)
+                             if node_start <= tick < node_end)
+                break
+            if tick < centre:
+                # the node's notes all end after its centre, so those that have started by tick are sounding
+                found.extend(node[4][:bisect_right(node[3], tick)])
+                node = node[1]
+            else:
+                # the node's notes all start at or before its centre, so those that have not ended are sounding
+                found.extend(node[6][:bisect_left(node[5], -tick)])
+                node = node[2]
+
+        return found
+
+    def _build(self, indices, starts, ends):
+        if not len(indices):
+            return -1
+        node = len(self._nodes)
+        if len(indices) <= self.LEAF_SIZE:
+            self._nodes.append((None, starts.tolist(), ends.tolist(), indices.tolist()))
+            return node
+
+        # the median start puts at most half the notes on either side
+        centre = int(np.median(starts))
+        here = (starts <= centre) & (ends > centre)
+        left = ends <= centre
+
+        self._nodes.append(None)
+        by_start = np.argsort(starts[here], kind="stable")
+        # sorted by descending end, as negated ends in ascending order
+        by_end = np.argsort(-ends[here], kind="stable")
+        right = ~(here | left)
+        self._nodes[node] = (centre,
+                             self._build(indices[left], starts[left], ends[left]),
+                             self._build(indices[right], starts[right], ends[right]),
+                             starts[here][by_start].tolist(), indices[here][by_start].tolist(),
+                             (-ends[here][by_end]).tolist(), indices[here][by_end].tolist())
+        return node
+
+
+def file_notes(chunks):
+    """
+    Extracts the notes of every track chunk of a parsed file, as
+    NoteTable.from_chunks does, without building an interval tree over them.
+
+    :return: a NOTE_DTYPE array sorted by start tick, the number of notes without a Note Off, and the number of Note
+             Off events without a sounding note to end
+    """
+    notes = []
+    unterminated = unmatched = 0
+    for track_number, track in numbered_tracks(chunks):
+        track_notes, track_unterminated, track_unmatched = extract_notes(track, track_number)
+        notes.extend(track_notes)
+        unterminated += track_unterminated
+        unmatched += track_unmatched
+
+    notes = np.array(notes, dtype=NOTE_DTYPE)
+    return notes[np.argsort(notes["start"], kind="stable")], unterminated, unmatched
+
+
+def extract_notes(track, track_number=0):
+    """
+    Pairs the Note On and Note Off events of a track chunk into notes.
+
+    Overlapping notes of the same pitch on the same channel are paired
+    first in, first out: each Note Off ends the earliest sounding one.
+
+    :param track: a track chunk, as returned by process_track_chunk
+    :param track_number: the track number to give each note
+    :return: a list of (start, end, pitch, velocity, channel, track) tuples in order of end, the number of notes
+             ended at the end of the track for lack of a Note Off, and the number of Note Off events ignored for lack
+             of a sounding note
+    """
+    notes = []
+    sounding = {}
+    unmatched = 0
+    tick = 0
+    for tick, note_on, channel, pitch, velocity in _note_events(track):
+        if note_on is None:
+            continue
+        key = (channel, pitch)
+        if note_on:
+            sounding.setdefault(key, deque()).append((tick, velocity))
+        elif sounding.get(key):
+            start, start_velocity = sounding[key].popleft()
+            notes.append((start, tick, pitch, start_velocity, channel, track_number))
+        else:
+            unmatched += 1
+
+    unterminated = 0
+    for (channel, pitch), starts in sounding.items():
+        for start, velocity in starts:
+            notes.append((start, tick, pitch, velocity, channel, track_number))
+            unterminated += 1
+
+    return notes, unterminated, unmatched
+
+
+def _note_events(track):
+    # yields (tick, whether the event is a Note On, channel, note, velocity) for every event of the track, with
+    # None for whether it is a Note On if it is neither a Note On nor a Note Off
+    events = track["events"]
+    if "payload_offsets" in track:
+        for tick, status, data1, data2 in zip(events["tick"].tolist(), events["status"].tolist(),
+                                              events["data1"].tolist(), events["data2"].tolist()):
+            message = status >> 4
+            if message == 0x9:
+                yield tick, data2 > 0, (status & 0x0F) + 1, data1, data2
+            elif message == 0x8:
+                yield tick, False, (status & 0x0F) + 1, data1, data2
+            else:
+                yield tick, None, None, None, None
+        return
+
+    tick = 0
+    for item in events:
+        if isinstance(item, Event):
+            tick += item.delta
+            event = item
+        else:
+            delta, event = item
+            tick += delta
+        sub_type = event["sub_type"]
+        if sub_type == "Note On":
+            yield tick, True, event["channel"], event["note"], event["velocity"]
+        elif sub_type == "Note Off":
+            yield tick, False, event["channel"], event["note"], event["velocity"]
+        else:
+            yield tick, None, None, None, None
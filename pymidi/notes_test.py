@@ -0,0 +1,96 @@
+import unittest
+
+import numpy as np
+
+from pymidi.chunks import parse_file, LAZY_EVENTS, TYPED_EVENTS, COLUMNAR_EVENTS
+from pymidi.notes import NoteTable, NOTE_DTYPE, extract_notes, file_notes
+from pymidi.typed_events import NoteOn, NoteOff, EndOfTrack
+
+FORMAT_1_EXAMPLE = "data/format_1_example_1.mid"
+
+
+def track(*events):
+    return {"type": "track", "events": list(events)}
+
+
+class NotesTest(unittest.TestCase):
+
+    def test_extracting_notes_from_file_in_any_event_format(self):
+        expected = [(0, 384, 48, 96, 3, 3), (0, 384, 60, 96, 3, 3), (96, 384, 67, 64, 2, 2), (192, 384, 76, 32, 1, 1)]
+
+        for event_format in [None, LAZY_EVENTS, TYPED_EVENTS, COLUMNAR_EVENTS]:
+            kwargs = {"event_format": event_format} if event_format else {}
+            chunks = parse_file(FORMAT_1_EXAMPLE, **kwargs)
+            notes = NoteTable.from_chunks(chunks)
+
+            self.assertEqual(notes.notes.tolist(), expected)
+            self.assertEqual((notes.unterminated, notes.unmatched_note_offs), (0, 0))
+            array, unterminated, unmatched = file_notes(chunks)
+            self.assertEqual((array.tolist(), unterminated, unmatched), (expected, 0, 0))
+
+    def test_tracks_left_out_are_counted_in_track_numbers(self):
+        chunks = parse_file(FORMAT_1_EXAMPLE)
+        # as a track that fails to parse is under SKIP
+        chunks[2] = None
+
+        self.assertEqual(NoteTable.from_chunks(chunks).notes.tolist(),
+                         [(0, 384, 48, 96, 3, 3), (0, 384, 60, 96, 3, 3), (96, 384, 67, 64, 2, 2)])
+
+    def test_overlapping_notes_of_same_pitch_are_paired_first_in_first_out(self):
+        notes, _, _ = extract_notes(track(NoteOn(0, 1, 60, 100), NoteOn(10, 1, 60, 90), NoteOff(5, 1, 60, 0),
+                                          NoteOff(5, 1, 60, 0), EndOfTrack(0)))
+
+        self.assertEqual(notes, [(0, 15, 60, 100, 1, 0), (10, 20, 60, 90, 1, 0)])
+
+    def test_notes_on_other_channels_are_paired_separately(self):
+        notes, _, _ = extract_notes(track(NoteOn(0, 1, 60, 100), NoteOn(0, 2, 60, 90), NoteOff(5, 2, 60, 0),
+                                          NoteOff(5, 1, 60, 0), EndOfTrack(0)))
+
+        self.assertEqual(notes, [(0, 5, 60, 90, 2, 0), (0, 10, 60, 100, 1, 0)])
+
+    def test_unterminated_notes_end_with_track_and_unmatched_note_offs_are_counted(self):
+        notes, unterminated, unmatched = extract_notes(
+            track(NoteOff(0, 1, 62, 0), NoteOn(0, 1, 60, 100), EndOfTrack(50)), 2)
+
+        self.assertEqual(notes, [(0, 50, 60, 100, 1, 2)])
+        self.assertEqual((unterminated, unmatched), (1, 1))
+
+    def test_querying_notes_sounding_at_tick_and_in_range(self):
+        rng = np.random.RandomState(0)
+        notes = np.zeros(1000, dtype=NOTE_DTYPE)
+        notes["start"] = rng.randint(0, 5000, len(notes))
+        notes["end"] = notes["start"] + rng.randint(0, 200, len(notes))
+        notes["pitch"] = np.arange(len(notes)) % 128
+        table = NoteTable(notes)
+
+        for tick in rng.randint(0, 5200, 50).tolist():
+            found = table.sounding_at(tick)
+            expected = notes[(notes["start"] <= tick) & (notes["end"] > tick)]
+            self.assertEqual(sorted(found.tolist()), sorted(expected.tolist()))
+
+            found = table.overlapping(tick, tick + 100)
+            expected = notes[(notes["start"] < tick + 100) & (notes["end"] > tick)]
+            self.assertEqual(sorted(found.tolist()), sorted(expected.tolist()))
+            self.assertTrue((np.diff(found["start"].astype(np.int64)) >= 0).all())
+
+    def test_zero_length_notes_do_not_hide_notes_ending_before_them(self):
+        notes = np.zeros(33, dtype=NOTE_DTYPE)
+        notes["end"][:16] = 3
+        notes["start"][16:] = notes["end"][16:] = 5
+        table = NoteTable(notes)
+
+        self.assertEqual(len(table.sounding_at(1)), 16)
+        self.assertEqual(len(table.sounding_at(5)), 0)
+        self.assertEqual(len(table.overlapping(0, 4)), 16)
+        self.assertEqual(len(table.overlapping(4, 6)), 17)
+
+    def test_querying_empty_range_finds_nothing(self):
+        table = NoteTable(np.array([(0, 10, 60, 100, 1, 0)], dtype=NOTE_DTYPE))
+
+        self.assertEqual(len(table.overlapping(5, 5)), 0)
+        self.assertEqual(len(table.sounding_at(10)), 0)
+        self.assertEqual(len(table.overlapping(9, 20)), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
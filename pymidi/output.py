@@ -0,0 +1,176 @@
+"""
+Streaming the events of a file out as records, one per event, written as
+each event is decoded, so that a file of any size is converted in the
+memory of a read buffer and an output buffer.
+
+JSONL:  a JSON object per line. The first is the header chunk, as returned
+        by process_header_chunk; then each event's dict, with the number of
+        its track chunk (from 0, among track chunks) as "track" and its
+        absolute time in ticks as "tick". Payloads are made JSON values:
+        "data" as a hex string, "text" as a string (decoded as Latin-1, so
+        every byte is kept), "sequence_number" as an int, and the other
+        BitArray fields (e.g. "new_tempo", "lsb") as unsigned ints.
+BINARY: the file's header chunk, as written by pymidi.writer, then per
+        event a little-endian RECORD (track, tick, status, data1, data2,
+        payload length) followed by the payload. Fields are as returned by
+        read_event, with absent data bytes written as 0: running status is
+        expanded, Note On events with velocity 0 are kept as they are, meta
+        events have status 0xFF and their meta type in data1. read_binary
+        reads it back.
+TEXT:   the CLI's original printout, built from a full parse; not handled here.
+"""
+import json
+import logging
+import struct
+import sys
+
+from bitstring import BitArray
+
+from pymidi.chunks import iter_chunks, process_chunk, DICT_EVENTS, HEADER, LAZY_EVENTS
+from pymidi.decoder import READ_BUFFER_SIZE
+from pymidi.errors import check_error_mode, ChunkError, TrackError, SKIP, STRICT
+from pymidi.events import MIDI
+from pymidi.writer import encode_header_chunk
+
+log = logging.getLogger(__name__)
+log.setLevel("INFO")
+handler = logging.StreamHandler(stream=sys.stderr)
+handler.setFormatter(logging.Formatter(fmt="%(asctime)s %(levelname)s %(message)s",
+                                       datefmt="%Y-%m-%d %H:%M:%S"))
+log.addHandler(handler)
+
+
+TEXT = "text"
+JSONL = "jsonl"
+BINARY = "binary"
+OUTPUT_FORMATS = (TEXT, JSONL, BINARY)
+
+# track, tick, status, data1, data2, payload length
+RECORD = struct.Struct("<HQBBBI")
+HEADER_CHUNK_SIZE = 14
+
+_encode = json.JSONEncoder(separators=(",", ":")).encode
+
+
+def write_events(f, out, output_format=JSONL, errors=SKIP, buffer_size=READ_BUFFER_SIZE):
+    """
+    Writes a record for each event of a file to out as it is decoded.
+
+    Records already written cannot be taken back, so a malformed track
+    chunk is handled as far as it has been read: STRICT raises, and SKIP
+    and LENIENT log the error and carry on from the next chunk, keeping
+    the records of the events before it.
+
+    :param f: a file object opened in binary mode
+    :param out: a binary file object to write to, ideally buffered
+    :param output_format: JSONL or BINARY
+    :param errors: STRICT, SKIP or LENIENT (see pymidi.errors)
+    :param buffer_size: the number of bytes to read from f at a time
+    :return: a dict of the number of "events" written, and of "errors" handled
+    """
+    check_error_mode(errors)
+    if output_format == JSONL:
+        write_header, write_event, event_format = _write_json, _write_json_event, DICT_EVENTS
+    elif output_format == BINARY:
+        write_header, write_event, event_format = _write_binary_header, _write_binary_event, LAZY_EVENTS
+    else:
+        raise Exception("Events cannot be streamed as {}".format(output_format))
+
+    counts = {"events": 0, "errors": 0}
+    track = 0
+    for chunk in iter_chunks(f, buffer_size, event_format):
+        if chunk is None:
+            continue
+        if chunk["type"] == HEADER:
+            write_header(out, chunk)
+            continue
+
+        tick = 0
+        events = 0
+        try:
+            for delta, event in chunk["events"]:
+                tick += delta
+                write_event(out, track, tick, event)
+                events += 1
+        except (ChunkError, TrackError) as e:
+            if errors == STRICT:
+                raise
+            log.warning("Stopped streaming track {} after {} events: {}".format(track, events, e))
+            counts["errors"] += 1
+            # a ChunkError means the file ended part way through the chunk, so there is nothing after it
+            stop = isinstance(e, ChunkError)
+        else:
+            stop = False
+        counts["events"] += events
+        track += 1
+        if stop:
+            break
+    return counts
+
+
+def read_binary(f):
+    """
+    Reads a stream written with BINARY, yielding its header chunk, as
+    returned by process_header_chunk, then a (track, tick, status, data1,
+    data2, payload) tuple per event, with payload None for channel messages.
+
+    :param f: a file object opened in binary mode
+    """
+    header = f.read(HEADER_CHUNK_SIZE)
+    if len(header) != HEADER_CHUNK_SIZE:
+        raise ChunkError("Stream ended part way through its header chunk")
+    yield process_chunk(header[:4], HEADER_CHUNK_SIZE - 8, header[8:])
+
+    record = f.read(RECORD.size)
+    while record:
+        if len(record) != RECORD.size:
+            raise ChunkError("Stream ended part way through a record")
+        track, tick, status, data1, data2, length = RECORD.unpack(record)
+        payload = f.read(length) if status >= 0xF0 else None
+        if payload is not None and len(payload) != length:
+            raise ChunkError("Stream ended part way through a payload")
+        yield track, tick, status, data1, data2, payload
+        record = f.read(RECORD.size)
+
+
+def json_record(track, tick, event):
+    """
+    Returns the dict written for an event as a JSONL record.
+    """
+    record = {"track": track, "tick": tick}
+    if event["type"] == MIDI and event["sub_type"] != "Pitch Bend":
+        # every field of the other channel messages is already an int or a string
+        record.update(event)
+        return record
+    for key, value in event.items():
+        if key == "data":
+            value = value.hex if isinstance(value, BitArray) else bytes(value).hex()
+        elif key == "text":
+            value = bytes(value).decode("latin-1")
+        elif key == "sequence_number":
+            value = int.from_bytes(value, "big")
+        elif isinstance(value, BitArray):
+            value = value.uint
+        record[key] = value
+    return record
+
+
+def _write_json(out, record):
+    out.write((_encode(record) + "\n").encode())
+
+
+def _write_json_event(out, track, tick, event):
+    _write_json(out, json_record(track, tick, event))
+
+
+def _write_binary_header(out, header):
+    out.write(encode_header_chunk(header))
+
+
+def _write_binary_event(out, track, tick, event):
+    payload = event.payload()
+    if payload is None:
+        out.write(RECORD.pack(track, tick, event.status, event.data1, event.data2 or 0, 0))
+    else:
+        out.write(RECORD.pack(track, tick, event.status, event.data1 or 0, 0, len(payload)))
+        out.write(payload)
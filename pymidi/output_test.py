@@ -0,0 +1,123 @@
+import io
+import json
+import unittest
+
+from click.testing import CliRunner
+
+from pymidi.__main__ import main
+from pymidi.chunks import parse_buffer, LAZY_EVENTS
+from pymidi.errors import TrackError, SKIP, STRICT
+from pymidi.generate import generate_file
+from pymidi.output import json_record, read_binary, write_events, BINARY, JSONL, TEXT
+
+FORMAT_1_EXAMPLE = "data/format_1_example_1.mid"
+HEADER = b"MThd" + (6).to_bytes(4, "big") + bytes.fromhex("0001 0002 0060")
+# a Note On, then an undefined status byte
+BAD_TRACK = bytes.fromhex("00 90 3C 40  10 F4 00  00 FF 2F 00")
+GOOD_TRACK = bytes.fromhex("00 90 3C 40  10 80 3C 40  00 FF 2F 00")
+
+
+def track_chunk(data):
+    return b"MTrk" + len(data).to_bytes(4, "big") + data
+
+
+def read_example():
+    with open(FORMAT_1_EXAMPLE, "rb") as f:
+        return f.read()
+
+
+def timed_events(chunks):
+    """
+    Returns (track, tick, event) tuples for the events of parsed chunks.
+    """
+    timed = []
+    for track, chunk in enumerate(chunks[1:]):
+        tick = 0
+        for delta, event in chunk["events"]:
+            tick += delta
+            timed.append((track, tick, event))
+    return timed
+
+
+class WriteEventsTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        f = io.BytesIO()
+        generate_file(f, 1, tracks=3, events=2000, sysex_rate=0.01, sysex_size=100, tempo_rate=0.01)
+        cls.data = f.getvalue()
+
+    def stream(self, data, output_format, errors=SKIP):
+        out = io.BytesIO()
+        counts = write_events(io.BytesIO(data), out, output_format, errors)
+        return counts, out.getvalue()
+
+    def test_jsonl(self):
+        counts, output = self.stream(self.data, JSONL)
+        lines = [json.loads(line) for line in output.decode().splitlines()]
+        chunks = parse_buffer(self.data)
+        events = timed_events(chunks)
+
+        self.assertEqual(counts, {"events": len(events), "errors": 0})
+        self.assertEqual(lines[0], chunks[0])
+        self.assertEqual(lines[1:], [json.loads(json.dumps(json_record(*event))) for event in events])
+        self.assertLessEqual({"Note On", "Pitch Bend", "Set Tempo", "F0"}, {line["sub_type"] for line in lines[1:]})
+
+    def test_json_values(self):
+        chunks = parse_buffer(read_example())
+        tempo = next(event for _, _, event in timed_events(chunks) if event["sub_type"] == "Set Tempo")
+        self.assertEqual(json_record(0, 0, tempo), {"track": 0, "tick": 0, "type": "META", "sub_type": "Set Tempo",
+                                                    "data": "07a120", "new_tempo": 500000})
+        text = {"type": "META", "sub_type": "Lyric", "data": b"\xe9t\xe9", "text": b"\xe9t\xe9"}
+        self.assertEqual(json_record(1, 5, text)["text"], "\xe9t\xe9")
+
+    def test_binary_round_trip(self):
+        counts, output = self.stream(self.data, BINARY)
+        records = list(read_binary(io.BytesIO(output)))
+        chunks = parse_buffer(self.data, event_format=LAZY_EVENTS)
+
+        self.assertEqual(records[0], chunks[0])
+        expected = [(track, tick, event.status, event.data1 or 0, event.data2 or 0,
+                     None if event.payload() is None else bytes(event.payload()))
+                    for track, tick, event in timed_events(chunks)]
+        self.assertEqual(records[1:], expected)
+        self.assertEqual(counts["events"], len(expected))
+
+    def test_malformed_tracks(self):
+        data = HEADER + track_chunk(BAD_TRACK) + track_chunk(GOOD_TRACK)
+        with self.assertRaises(TrackError):
+            self.stream(data, JSONL, STRICT)
+
+        counts, output = self.stream(data, JSONL)
+        lines = [json.loads(line) for line in output.decode().splitlines()]
+        self.assertEqual(counts, {"events": 4, "errors": 1})
+        # the events before the error are kept, and the next track is numbered as if the bad one was complete
+        self.assertEqual([(line["track"], line["tick"], line["sub_type"]) for line in lines[1:]],
+                         [(0, 0, "Note On"), (1, 0, "Note On"), (1, 16, "Note Off"), (1, 16, "End of Track")])
+
+    def test_truncated_file(self):
+        data = HEADER + track_chunk(GOOD_TRACK)[:-2]
+        counts, output = self.stream(data, BINARY)
+        self.assertEqual(counts, {"events": 2, "errors": 1})
+        self.assertEqual(len(list(read_binary(io.BytesIO(output)))), 3)
+
+    def test_text_is_not_streamed(self):
+        with self.assertRaises(Exception):
+            self.stream(self.data, TEXT)
+
+
+class MainTest(unittest.TestCase):
+
+    def test_format_option(self):
+        runner = CliRunner()
+        result = runner.invoke(main, ["--file", FORMAT_1_EXAMPLE, "--format", "jsonl"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        lines = [json.loads(line) for line in result.output.splitlines() if line.startswith("{")]
+        self.assertEqual(len(lines), 1 + len(timed_events(parse_buffer(read_example()))))
+
+        result = runner.invoke(main, ["--file", FORMAT_1_EXAMPLE, "--format", "binary", "--stats"])
+        self.assertNotEqual(result.exit_code, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,218 @@
+"""
+Seek indexes, for starting to decode a track part way through without
+decoding everything before it.
+
+Every interval events, a SeekIndex records a checkpoint of where each
+track's decoder is: the byte offset of the next event, the absolute tick,
+the running status, and the state of each channel (program, controllers,
+pitch bend and sounding notes). Seeking to a tick then starts from the
+last checkpoint before it, decoding at most interval events to catch up.
+"""
+import numpy as np
+
+from pymidi.chunks import index_buffer, TRACK_TYPE
+from pymidi.decoder import read_event, build_event_item
+from pymidi.errors import TrackError
+
+DEFAULT_INTERVAL = 1000
+
+CHANNELS = 16
+# controller numbers of the channel mode messages that silence every sounding note on a channel
+ALL_SOUND_OFF = 0x78
+ALL_NOTES_OFF = 0x7B
+PITCH_BEND_CENTRE = 0x2000
+
+
+class SeekIndex(object):
+    """
+    Checkpoints of every track chunk of a file, as arrays with one row per
+    checkpoint. Tracks are numbered from 0, in file order. Indexes can be
+    pickled, and cached by pymidi.cache.ParseCache.seek_index.
+
+    For each track, in self.tracks:
+    "start", "end":    byte offsets of the track's data in the file
+    "events":          number of events decoded before each checkpoint
+    "positions":       byte offset of the next event in the file
+    "ticks":           absolute tick of the last event decoded (0 at the start of the track)
+    "running_status":  status byte of the last channel message, or -1
+    "programs":        (checkpoints, 16) program of each channel, or -1 if none has been set
+    "controllers":     (checkpoints, 16, 128) value of each controller of each channel, or -1 if none has been set
+    "pitch_bends":     (checkpoints, 16) pitch bend of each channel, centred on 0
+    "notes":           (checkpoints, 16, 128) velocity of each sounding note of each channel, or 0 if it is not sounding
+    """
+
+    def __init__(self, interval, tracks):
+        self.interval = interval
+        self.tracks = tracks
+
+    @classmethod
+    def build(cls, data, interval=DEFAULT_INTERVAL):
+        """
+        Indexes a whole MIDI file, held in memory. Events are read as raw
+        fields and never built, so indexing costs a fraction of parsing.
+
+        :param data: bytes-like object containing the file
+        :param interval: number of events between checkpoints
+        """
+        if interval < 1:
+            raise Exception("Checkpoint interval must be at least 1, found {}".format(interval))
+        tracks = [_index_track(data, offset, offset + length, interval)
+                  for chunk_type, offset, length in index_buffer(data) if chunk_type == TRACK_TYPE]
+        return cls(interval, tracks)
+
+    @classmethod
+    def from_file(cls, path, interval=DEFAULT_INTERVAL):
+        with open(path, "rb") as f:
+            return cls.build(f.read(), interval)
+
+    def checkpoint(self, track, tick):
+        """
+        Returns the number of the last checkpoint of track at which every
+        event decoded so far is before tick.
+        """
+        ticks = self.tracks[track]["ticks"]
+        # ticks[0] is the start of the track, before any event has been decoded
+        return int(np.searchsorted(ticks[1:], tick, side="left"))
+
+    def state(self, track, checkpoint):
+        """
+        Returns the channel state at a checkpoint, as a dict of "programs",
+        "controllers", "pitch_bends" and "notes" arrays (see SeekIndex).
+        """
+        index = self.tracks[track]
+        return {name: index[name][checkpoint].copy() for name in ["programs", "controllers", "pitch_bends", "notes"]}
+
+    def seek(self, data, track, tick, build=None):
+        """
+        Resumes decoding a track from the first event at or after tick.
+
+        :param data: bytes-like object containing the file the index was built from
+        :param track: the track to decode, numbered from 0
+        :param tick: absolute tick to seek to
+        :param build: function building each event from its raw fields, as for decode_track (defaults to
+                      build_event_item)
+        :return: the channel state once every event before tick has been applied (see state), and an iterator of
+                 (absolute tick, item) tuples for the rest of the track, where item is what build returns. The
+                 deltas of items are relative to the previous event, decoded or not.
+        """
+        if build is None:
+            build = build_event_item
+        index = self.tracks[track]
+        checkpoint = self.checkpoint(track, tick)
+        state = self.state(track, checkpoint)
+        tracker = _ChannelState(state)
+
+        pos = int(index["positions"][checkpoint])
+        end = index["end"]
+        running_status = int(index["running_status"][checkpoint])
+        if running_status < 0:
+            running_status = None
+        event_tick = int(index["ticks"][checkpoint])
+        while pos < end:
+            new_pos, delta, status, data1, data2, payload = read_event(data, pos, running_status)
+            if event_tick + delta >= tick:
+                break
+            pos = new_pos
+            event_tick += delta
+            if status < 0xF0:
+                running_status = status
+                tracker.apply(status, data1, data2)
+
+        return tracker.export(), _events_from(data, pos, end, running_status, event_tick, build)
+
+
+def _events_from(data, pos, end, running_status, tick, build):
+    while pos < end:
+        pos, delta, status, data1, data2, payload = read_event(data, pos, running_status)
+        if status < 0xF0:
+            running_status = status
+        tick += delta
+        yield tick, build(delta, status, data1, data2, payload, False)
+
+
+class _ChannelState(object):
+    # channel state as nested lists, which are much quicker than arrays to update an event at a time
+
+    def __init__(self, state=None):
+        if state is None:
+            self.programs = [-1] * CHANNELS
+            self.controllers = [[-1] * 128 for _ in range(CHANNELS)]
+            self.pitch_bends = [0] * CHANNELS
+            self.notes = [[0] * 128 for _ in range(CHANNELS)]
+        else:
+            self.programs = state["programs"].tolist()
+            self.controllers = state["controllers"].tolist()
+            self.pitch_bends = state["pitch_bends"].tolist()
+            self.notes = state["notes"].tolist()
+
+    def apply(self, status, data1, data2):
+        message = status >> 4
+        channel = status & 0x0F
+        if message == 0x9 and data2:
+            self.notes[channel][data1] = data2
+        elif message == 0x8 or message == 0x9:
+            self.notes[channel][data1] = 0
+        elif message == 0xB:
+            self.controllers[channel][data1] = data2
+            if data1 == ALL_SOUND_OFF or data1 == ALL_NOTES_OFF:
+                self.notes[channel] = [0] * 128
+        elif message == 0xC:
+            self.programs[channel] = data1
+        elif message == 0xE:
+            self.pitch_bends[channel] = ((data2 << 7) | data1) - PITCH_BEND_CENTRE
+
+    def export(self):
+        return {
+            "programs": np.array(self.programs, dtype=np.int16),
+            "controllers": np.array(self.controllers, dtype=np.int16),
+            "pitch_bends": np.array(self.pitch_bends, dtype=np.int16),
+            "notes": np.array(self.notes, dtype=np.uint8),
+        }
+
+
+def _index_track(data, pos, end, interval):
+    events = []
+    positions = []
+    ticks = []
+    running_statuses = []
+    states = []
+    state = _ChannelState()
+
+    def checkpoint():
+        events.append(count)
+        positions.append(pos)
+        ticks.append(tick)
+        running_statuses.append(-1 if running_status is None else running_status)
+        states.append(state.export())
+
+    start = pos
+    count = 0
+    tick = 0
+    running_status = None
+    try:
+        while pos < end:
+            if count % interval == 0:
+                checkpoint()
+            pos, delta, status, data1, data2, _ = read_event(data, pos, running_status)
+            tick += delta
+            count += 1
+            if status < 0xF0:
+                running_status = status
+                state.apply(status, data1, data2)
+    except IndexError:
+        raise TrackError("Track data ended part way through an event")
+    if not events:
+        checkpoint()
+
+    return {
+        "start": start,
+        "end": end,
+        "events": np.array(events, dtype=np.int64),
+        "positions": np.array(positions, dtype=np.int64),
+        "ticks": np.array(ticks, dtype=np.uint64),
+        "running_status": np.array(running_statuses, dtype=np.int16),
+        "programs": np.array([state["programs"] for state in states]),
+        "controllers": np.array([state["controllers"] for state in states]),
+        "pitch_bends": np.array([state["pitch_bends"] for state in states]),
+        "notes": np.array([state["notes"] for state in states]),
+    }
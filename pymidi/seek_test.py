@@ -0,0 +1,107 @@
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from pymidi.cache import ParseCache
+from pymidi.chunks import parse_buffer
+from pymidi.seek import SeekIndex
+
+FORMAT_1_EXAMPLE = "data/format_1_example_1.mid"
+
+
+def synthetic_file(events):
+    # notes under running status, with program, controller and pitch bend changes, on four channels
+    track = bytearray()
+    for i in range(events):
+        channel = i % 4
+        if i % 50 == 0:
+            track += bytes((0, 0xC0 | channel, i % 128))
+        elif i % 20 == 0:
+            track += bytes((3, 0xB0 | channel, 7, i % 128))
+        elif i % 30 == 0:
+            track += bytes((1, 0xE0 | channel, i % 128, 0x40))
+        else:
+            track += bytes((i % 5, 0x90 | channel, 40 + i % 37, i % 3 * 50))
+    track += bytes.fromhex("00FF2F00")
+    header = b"MThd" + (6).to_bytes(4, "big") + bytes.fromhex("0000 0001 0060")
+    return header + b"MTrk" + len(track).to_bytes(4, "big") + track
+
+
+class SeekIndexTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.data = synthetic_file(2000)
+        cls.events = []
+        tick = 0
+        for delta, event in parse_buffer(cls.data)[1]["events"]:
+            tick += delta
+            cls.events.append((tick, (delta, event)))
+
+    def test_checkpoints_are_recorded_every_interval_events(self):
+        index = SeekIndex.build(self.data, interval=100)
+
+        track = index.tracks[0]
+        self.assertEqual(track["events"].tolist(), list(range(0, len(self.events), 100)))
+        self.assertEqual(track["positions"][0], track["start"])
+        self.assertEqual(track["ticks"][1], self.events[99][0])
+
+    def test_seeking_yields_the_events_from_tick(self):
+        index = SeekIndex.build(self.data, interval=64)
+
+        for tick in [0, 1, self.events[500][0], self.events[-1][0]]:
+            _, events = index.seek(self.data, 0, tick)
+
+            self.assertEqual(list(events), [item for item in self.events if item[0] >= tick])
+
+    def test_seeking_restores_channel_state(self):
+        index = SeekIndex.build(self.data, interval=64)
+        tick = self.events[777][0]
+        sounding = {}
+        for event_tick, (_, event) in self.events:
+            if event_tick >= tick:
+                break
+            if event["sub_type"] == "Note On":
+                sounding[(event["channel"], event["note"])] = event["velocity"]
+            elif event["sub_type"] == "Note Off":
+                sounding.pop((event["channel"], event["note"]), None)
+
+        state, _ = index.seek(self.data, 0, tick)
+
+        found = {(channel + 1, note): int(velocity) for (channel, note), velocity in
+                 zip(zip(*state["notes"].nonzero()), state["notes"][state["notes"].nonzero()])}
+        self.assertEqual(found, sounding)
+
+    def test_seeking_resumes_running_status(self):
+        with open(FORMAT_1_EXAMPLE, "rb") as f:
+            data = f.read()
+        expected = parse_buffer(data)[4]["events"]
+        index = SeekIndex.build(data, interval=1)
+
+        state, events = index.seek(data, 3, 192)
+
+        # the last event of track 3 is a Note On with velocity 0 under running status
+        self.assertEqual([item for _, item in events], expected[-3:])
+        self.assertEqual(state["programs"][2], 70)
+        self.assertEqual(state["notes"][2][48], 96)
+
+    def test_index_round_trips_through_pickle_and_cache(self):
+        index = SeekIndex.build(self.data, interval=100)
+        loaded = pickle.loads(pickle.dumps(index))
+        directory = tempfile.mkdtemp()
+        try:
+            cache = ParseCache(directory)
+            cache.seek_index(self.data, 100)
+            cached = ParseCache(directory).seek_index(self.data, 100)
+        finally:
+            shutil.rmtree(directory)
+
+        for other in [loaded, cached]:
+            self.assertEqual(other.interval, 100)
+            self.assertEqual(other.tracks[0]["ticks"].tolist(), index.tracks[0]["ticks"].tolist())
+            self.assertEqual(other.tracks[0]["notes"].tolist(), index.tracks[0]["notes"].tolist())
+
+
+if __name__ == "__main__":
+    unittest.main()
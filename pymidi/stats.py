@@ -0,0 +1,139 @@
+"""
+Opt-in instrumentation of parsing, for finding out why a file parses
+slowly.
+
+Pass a ParseStats as the stats argument of parse_chunks, parse_file,
+parse_buffer, process_chunk or process_track_chunk to collect per-chunk
+timings, counts of each type of event, and the number of bytes and VLQs
+decoded. Nothing is collected, and nothing is added to the decoding loops,
+unless one is passed: events are counted by wrapping the function that
+builds them, and columnar tracks are counted from their arrays once they
+have been decoded.
+"""
+import numpy as np
+
+from pymidi.decoder import event_type, META_STATUS
+from pymidi.vlq import vlq_length, vlq_lengths
+
+
+class ParseStats(object):
+    """
+    Statistics of the chunks parsed with it, accumulated across calls.
+
+    "chunks":        a dict per chunk, in the order they were parsed: "type", "bytes" of data, number of "events",
+                     "seconds" taken, and the first "error" found in it, if any
+    "event_counts":  the number of events of each sub type, as named in event dicts
+    "bytes":         the number of bytes of chunk data parsed
+    "seconds":       the time taken to parse them
+    "vlqs":          the number of VLQs decoded: delta times, and the lengths of meta and Sysex events
+    "vlq_bytes":     the number of bytes taken up by those VLQs
+    "errors":        the number of malformed chunks and events handled (see pymidi.errors), by error class
+    "skipped_bytes": the number of bytes skipped over to resynchronise after them
+    """
+
+    def __init__(self, on_chunk=None, count_events=True):
+        """
+        :param on_chunk: function called with the dict of each chunk as soon as it has been parsed
+        :param count_events: whether to count events and VLQs. Without, collecting statistics costs nothing per event.
+        """
+        self.on_chunk = on_chunk
+        self.count_events = count_events
+        self.chunks = []
+        self.event_counts = {}
+        self.bytes = 0
+        self.seconds = 0.0
+        self.vlqs = 0
+        self.vlq_bytes = 0
+        self.errors = {}
+        self.skipped_bytes = 0
+
+    def record_chunk(self, chunk_type, length, seconds, events=0, error=None):
+        chunk = {"type": chunk_type, "bytes": length, "events": events, "seconds": seconds, "error": error}
+        self.chunks.append(chunk)
+        self.bytes += length
+        self.seconds += seconds
+        if self.on_chunk is not None:
+            self.on_chunk(chunk)
+
+    def record_error(self, error, skipped=0):
+        name = type(error).__name__
+        self.errors[name] = self.errors.get(name, 0) + 1
+        self.skipped_bytes += skipped
+
+    def counting(self, build):
+        """
+        Wraps a function building events from their raw fields, as passed to
+        decode_track, to count the events it builds.
+        """
+        counts = self.event_counts
+
+        def build_counted(delta, status, data1, data2, payload, views=False):
+            name = event_type(status, data1, data2)
+            counts[name] = counts.get(name, 0) + 1
+            vlqs = 1
+            vlq_bytes = vlq_length(delta)
+            if payload is not None:
+                vlqs += 1
+                vlq_bytes += vlq_length(len(payload))
+            self.vlqs += vlqs
+            self.vlq_bytes += vlq_bytes
+            return build(delta, status, data1, data2, payload, views)
+
+        return build_counted
+
+    def count_columns(self, track):
+        """
+        Counts the events of a track chunk in columnar form, as returned by
+        pymidi.columnar.decode_columns.
+        """
+        events = track["events"]
+        for code, count in zip(*(values.tolist() for values in np.unique(sub_type_codes(events),
+                                                                         return_counts=True))):
+            name = code_sub_type(code)
+            self.event_counts[name] = self.event_counts.get(name, 0) + count
+
+        lengths = np.diff(track["payload_offsets"])
+        self.vlqs += len(events) + len(lengths)
+        self.vlq_bytes += int(vlq_lengths(events["delta"]).sum() + vlq_lengths(lengths).sum())
+
+    def report(self):
+        """
+        Returns a summary of the statistics, one line for the totals and then
+        one per event type, most common first.
+        """
+        events = sum(self.event_counts.values())
+        lines = ["{} chunks, {} bytes, {} events, {} VLQs ({} bytes) in {:.4f}s: {:.2f} MB/s".format(
+            len(self.chunks), self.bytes, events, self.vlqs, self.vlq_bytes, self.seconds,
+            self.bytes / 1e6 / self.seconds if self.seconds else 0.0)]
+        if self.errors:
+            lines.append("{} errors ({}), {} bytes skipped".format(
+                sum(self.errors.values()), ", ".join("{} {}".format(count, name) for name, count in
+                                                     sorted(self.errors.items())), self.skipped_bytes))
+        for name, count in sorted(self.event_counts.items(), key=lambda item: -item[1]):
+            lines.append("{:>12} {}".format(count, name))
+        return "\n".join(lines)
+
+
+def sub_type_codes(events):
+    """
+    Returns an integer code per event of a columnar track (see
+    pymidi.columnar) standing for its sub type, which code_sub_type names:
+    its status byte, with velocity 0 Note Ons as Note Offs, and the meta type
+    of meta events or the controller of channel mode messages in the low byte.
+    """
+    status = events["status"].astype(np.int64)
+    data1 = events["data1"].astype(np.int64)
+    message = status >> 4
+    codes = np.where(status < 0xF0, np.where((message == 0x9) & (events["data2"] == 0), 0x8, message) << 12,
+                     status << 8)
+    codes |= np.where((status == META_STATUS) | ((message == 0xB) & (data1 >= 0x78)), data1, 0)
+    return codes
+
+
+def code_sub_type(code):
+    """
+    Returns the sub type, as named in event dicts, of a code returned by sub_type_codes.
+    """
+    status = (code >> 12) << 4 if code < 0xF000 else code >> 8
+    # a nonzero data2, as velocity 0 Note Ons are already coded as Note Offs
+    return event_type(status, code & 0xFF, 1)
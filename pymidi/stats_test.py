@@ -0,0 +1,98 @@
+import unittest
+from collections import Counter
+
+import numpy as np
+
+from pymidi.chunks import parse_buffer, parse_file, COLUMNAR_EVENTS, TYPED_EVENTS
+from pymidi.generate import generate_track
+from pymidi.stats import ParseStats
+
+FORMAT_1_EXAMPLE = "data/format_1_example_1.mid"
+HEADER = b"MThd" + (6).to_bytes(4, "big") + bytes.fromhex("0001 0002 0060")
+
+
+def track_chunk(data):
+    return b"MTrk" + len(data).to_bytes(4, "big") + data
+
+
+# a channel mode message, a velocity 0 Note On, an unknown meta event and a long delta
+UNUSUAL_TRACK = bytes.fromhex("00 B0 7B 00  00 90 3C 40  81 00 3C 00  00 FF 60 02 01 02  83 FF 7F F7 01 01 "
+                              "00 FF 2F 00")
+
+
+class ParseStatsTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.data = HEADER + track_chunk(generate_track(np.random.default_rng(1), 3000, sysex_rate=0.01,
+                                                       sysex_size=500)) + track_chunk(UNUSUAL_TRACK)
+
+    def test_counts_events_by_sub_type(self):
+        stats = ParseStats()
+        chunks = parse_buffer(self.data, stats=stats)
+        expected = Counter(event["sub_type"] for chunk in chunks[1:] for _, event in chunk["events"])
+        self.assertEqual(stats.event_counts, dict(expected))
+        self.assertEqual(stats.event_counts["All Notes Off"], 1)
+        self.assertEqual(stats.event_counts["Unknown"], 1)
+
+    def test_columnar_counts_match(self):
+        stats = ParseStats()
+        parse_buffer(self.data, stats=stats)
+        columnar = ParseStats()
+        parse_buffer(self.data, event_format=COLUMNAR_EVENTS, stats=columnar)
+        self.assertEqual(columnar.event_counts, stats.event_counts)
+        self.assertEqual((columnar.vlqs, columnar.vlq_bytes), (stats.vlqs, stats.vlq_bytes))
+
+    def test_typed_counts_match(self):
+        stats = ParseStats()
+        parse_buffer(self.data, stats=stats)
+        typed = ParseStats()
+        parse_buffer(self.data, event_format=TYPED_EVENTS, stats=typed)
+        self.assertEqual(typed.event_counts, stats.event_counts)
+
+    def test_counts_vlqs(self):
+        stats = ParseStats()
+        parse_buffer(HEADER + track_chunk(UNUSUAL_TRACK), stats=stats)
+        # six deltas, one of two bytes and one of three, and the lengths of three meta and Sysex events
+        self.assertEqual(stats.vlqs, 9)
+        self.assertEqual(stats.vlq_bytes, 6 + 1 + 2 + 3)
+
+    def test_records_chunks(self):
+        recorded = []
+        stats = ParseStats(on_chunk=recorded.append)
+        parse_file(FORMAT_1_EXAMPLE, stats=stats)
+        self.assertEqual(recorded, stats.chunks)
+        self.assertEqual([chunk["type"] for chunk in stats.chunks], ["header", "track", "track", "track", "track"])
+        self.assertEqual([chunk["events"] for chunk in stats.chunks], [0, 3, 4, 4, 6])
+        self.assertEqual(stats.bytes, sum(chunk["bytes"] for chunk in stats.chunks))
+        self.assertEqual(stats.bytes, 6 + 20 + 16 + 15 + 21)
+        self.assertAlmostEqual(stats.seconds, sum(chunk["seconds"] for chunk in stats.chunks))
+
+    def test_records_failed_and_unknown_chunks(self):
+        stats = ParseStats()
+        data = HEADER + track_chunk(b"\x00\x90\x3c\x40") + b"XTRA\x00\x00\x00\x01\x00"
+        chunks = parse_buffer(data, stats=stats)
+        self.assertEqual(chunks[1:], [None, None])
+        self.assertEqual(stats.chunks[1]["type"], "MTrk")
+        self.assertEqual(stats.chunks[1]["error"], "End of Track event missing")
+        self.assertEqual(stats.chunks[2]["type"], "XTRA")
+        self.assertIsNone(stats.chunks[2]["error"])
+
+    def test_accumulates_across_files(self):
+        stats = ParseStats()
+        parse_file(FORMAT_1_EXAMPLE, stats=stats)
+        parse_file(FORMAT_1_EXAMPLE, mmap=True, stats=stats)
+        self.assertEqual(len(stats.chunks), 10)
+        self.assertEqual(stats.event_counts["End of Track"], 8)
+
+    def test_report(self):
+        stats = ParseStats()
+        with open(FORMAT_1_EXAMPLE, "rb") as f:
+            parse_buffer(f.read(), stats=stats)
+        lines = stats.report().splitlines()
+        self.assertTrue(lines[0].startswith("5 chunks, 78 bytes, 17 events, 23 VLQs"))
+        self.assertEqual(lines[1].split(None, 1), ["4", "End of Track"])
+
+
+if __name__ == "__main__":
+    unittest.main()
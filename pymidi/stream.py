@@ -0,0 +1,185 @@
+"""
+Incremental parsing of a live MIDI byte stream, e.g. from a serial port
+or USB-MIDI device.
+
+Unlike track chunks, a stream has no delta times or meta events: it is a
+sequence of channel messages (with running status), Sysex messages ended
+by 0xF7, system common messages, and single byte system realtime messages
+(0xF8 - 0xFF), which may arrive at any point, even in the middle of
+another message.
+"""
+import logging
+import re
+import sys
+
+from pymidi.decoder import build_event, F0_SYSEX_STATUS, F7_SYSEX_STATUS, MIDI_DATA_LENGTHS
+from pymidi.events import SYSTEM
+
+log = logging.getLogger(__name__)
+log.setLevel("INFO")
+handler = logging.StreamHandler(stream=sys.stderr)
+handler.setFormatter(logging.Formatter(fmt="%(asctime)s %(levelname)s %(message)s",
+                                       datefmt="%Y-%m-%d %H:%M:%S"))
+log.addHandler(handler)
+
+
+REALTIME_STATUS = 0xF8
+
+# number of data bytes following each system common status byte
+SYSTEM_COMMON_DATA_LENGTHS = {0xF1: 1, 0xF2: 2, 0xF3: 1, 0xF4: 0, 0xF5: 0, 0xF6: 0}
+
+SYSTEM_MESSAGES = {
+    0xF1: "MIDI Time Code Quarter Frame",
+    0xF2: "Song Position Pointer",
+    0xF3: "Song Select",
+    0xF4: "Undefined",
+    0xF5: "Undefined",
+    0xF6: "Tune Request",
+    0xF8: "Timing Clock",
+    0xF9: "Undefined",
+    0xFA: "Start",
+    0xFB: "Continue",
+    0xFC: "Stop",
+    0xFD: "Undefined",
+    0xFE: "Active Sensing",
+    0xFF: "System Reset",
+}
+
+_STATUS_BYTE = re.compile(b"[\x80-\xff]")
+
+
+class StreamParser(object):
+    """
+    Parses a MIDI byte stream fed to it in pieces of any size, keeping
+    running status, partially received messages and Sysex data between
+    calls to feed.
+
+    Data bytes received without a status byte to apply them to (e.g. on
+    joining a stream part way through a message) are dropped, and counted
+    in discarded.
+    """
+
+    def __init__(self, build=None):
+        """
+        :param build: function building each message from its raw fields, taking the same arguments as
+                      build_message (the default). Pass raw_message to get (status, data1, data2, payload) tuples.
+        """
+        self.build = build or build_message
+        self.discarded = 0
+        self.reset()
+
+    def reset(self):
+        """
+        Forgets any running status and partially received message.
+        """
+        # status byte of the message being received, which is also the running status for channel messages
+        self._status = None
+        # number of data bytes the message takes, and its first data byte once received
+        self._data_length = 0
+        self._data1 = None
+        self._sysex = None
+
+    def feed(self, data):
+        """
+        Parses the next piece of a stream.
+
+        :param data: bytes-like object of any length
+        :return: a list of the messages completed by data, as built by build
+        """
+        build = self.build
+        messages = []
+        append = messages.append
+        status = self._status
+        data_length = self._data_length
+        data1 = self._data1
+        sysex = self._sysex
+
+        pos = 0
+        end = len(data)
+        while pos < end:
+            if sysex is not None:
+                # copy Sysex data up to the next status byte in one go
+                match = _STATUS_BYTE.search(data, pos)
+                stop = match.start() if match else end
+                sysex += data[pos:stop]
+                pos = stop
+                if pos == end:
+                    break
+
+            byte = data[pos]
+            pos += 1
+
+            if byte < 0x80:
+                if status is None:
+                    self.discarded += 1
+                elif data_length == 1:
+                    append(build(status, byte, None, None))
+                    if status >= 0xF0:
+                        status = None
+                elif data1 is None:
+                    data1 = byte
+                else:
+                    append(build(status, data1, byte, None))
+                    data1 = None
+                    if status >= 0xF0:
+                        status = None
+            elif byte >= REALTIME_STATUS:
+                # realtime messages leave any message in progress, and the running status, as they are
+                append(build(byte, None, None, None))
+            else:
+                # any other status byte ends a Sysex message
+                if sysex is not None:
+                    if byte != F7_SYSEX_STATUS:
+                        log.warning("Sysex message ended by status byte {:02x} rather than F7".format(byte))
+                    append(build(F0_SYSEX_STATUS, None, None, bytes(sysex)))
+                    sysex = None
+                    if byte == F7_SYSEX_STATUS:
+                        continue
+                data1 = None
+                if byte < 0xF0:
+                    status = byte
+                    data_length = MIDI_DATA_LENGTHS[byte >> 4]
+                    continue
+
+                # system common messages cancel running status
+                status = None
+                if byte == F0_SYSEX_STATUS:
+                    sysex = bytearray()
+                elif byte == F7_SYSEX_STATUS:
+                    self.discarded += 1
+                else:
+                    data_length = SYSTEM_COMMON_DATA_LENGTHS[byte]
+                    if data_length:
+                        status = byte
+                    else:
+                        append(build(byte, None, None, None))
+
+        self._status = status
+        self._data_length = data_length
+        self._data1 = data1
+        self._sysex = sysex
+        return messages
+
+
+def raw_message(status, data1, data2, payload):
+    return status, data1, data2, payload
+
+
+def build_message(status, data1, data2, payload):
+    """
+    Builds the message dict for a set of raw fields. Channel and Sysex
+    messages are built as the events of the same kind in track chunks.
+    """
+    if status < 0xF0 or status == F0_SYSEX_STATUS:
+        return build_event(status, data1, data2, payload)
+
+    message = {"type": SYSTEM, "sub_type": SYSTEM_MESSAGES[status]}
+    if status == 0xF1:
+        message["message_type"] = data1 >> 4
+        message["values"] = data1 & 0x0F
+    elif status == 0xF2:
+        # number of MIDI beats (sixteenth notes) since the start of the song
+        message["beats"] = (data2 << 7) | data1
+    elif status == 0xF3:
+        message["song"] = data1
+    return message
@@ -0,0 +1,81 @@
+import unittest
+
+from bitstring import BitArray
+
+from pymidi.events import MIDI, SYSEX, SYSTEM
+from pymidi.stream import StreamParser, raw_message
+
+
+class StreamParserTest(unittest.TestCase):
+
+    def test_feeding_complete_messages(self):
+        parser = StreamParser()
+
+        messages = parser.feed(bytes.fromhex("923060 C205"))
+
+        self.assertEqual(messages, [
+            {"type": MIDI, "sub_type": "Note On", "channel": 3, "note": 48, "velocity": 96},
+            {"type": MIDI, "sub_type": "Program Change", "channel": 3, "new_value": 5},
+        ])
+
+    def test_messages_split_across_feeds_are_completed_later(self):
+        parser = StreamParser(raw_message)
+        stream = bytes.fromhex("923060 3040 B0077F")
+
+        messages = []
+        for i in range(len(stream)):
+            messages += parser.feed(stream[i:i + 1])
+
+        self.assertEqual(messages, [(0x92, 0x30, 0x60, None), (0x92, 0x30, 0x40, None), (0xB0, 0x07, 0x7F, None)])
+
+    def test_realtime_bytes_mid_message_leave_message_and_running_status_alone(self):
+        parser = StreamParser(raw_message)
+
+        messages = parser.feed(bytes.fromhex("92 F8 30 FE 60 31 FA 61"))
+
+        self.assertEqual(messages, [(0xF8, None, None, None), (0xFE, None, None, None), (0x92, 0x30, 0x60, None),
+                                    (0xFA, None, None, None), (0x92, 0x31, 0x61, None)])
+
+    def test_sysex_is_collected_across_feeds_and_realtime_bytes(self):
+        parser = StreamParser()
+
+        messages = parser.feed(bytes.fromhex("F0 4110")) + parser.feed(bytes.fromhex("42 F8 1201 F7"))
+
+        self.assertEqual(messages[0]["sub_type"], "Timing Clock")
+        self.assertEqual(messages[1], {"type": SYSEX, "sub_type": "F0", "data": BitArray("0x41104212 01")})
+
+    def test_sysex_ended_by_another_status_byte(self):
+        parser = StreamParser(raw_message)
+
+        messages = parser.feed(bytes.fromhex("F0 7E7F 903C64"))
+
+        self.assertEqual(messages, [(0xF0, None, None, b"\x7e\x7f"), (0x90, 0x3C, 0x64, None)])
+
+    def test_system_common_messages_cancel_running_status(self):
+        parser = StreamParser()
+
+        messages = parser.feed(bytes.fromhex("903C64 F21001 3C00 F6"))
+
+        self.assertEqual(messages[1], {"type": SYSTEM, "sub_type": "Song Position Pointer", "beats": 144})
+        self.assertEqual(messages[2], {"type": SYSTEM, "sub_type": "Tune Request"})
+        self.assertEqual(len(messages), 3)
+        self.assertEqual(parser.discarded, 2)
+
+    def test_data_bytes_before_first_status_byte_are_discarded(self):
+        parser = StreamParser(raw_message)
+
+        messages = parser.feed(bytes.fromhex("3060 D040"))
+
+        self.assertEqual(messages, [(0xD0, 0x40, None, None)])
+        self.assertEqual(parser.discarded, 2)
+
+    def test_feeding_memoryview(self):
+        parser = StreamParser(raw_message)
+
+        messages = parser.feed(memoryview(bytes.fromhex("F0 0102 F7 E00040")))
+
+        self.assertEqual(messages, [(0xF0, None, None, b"\x01\x02"), (0xE0, 0x00, 0x40, None)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,249 @@
+"""
+Offline rendering of parsed MIDI files to audio, a block of samples at a
+time with NumPy.
+
+Notes are extracted with pymidi.notes.file_notes and timed with a
+pymidi.tempo.TempoMap. Each block, notes starting in it are given voices
+from a fixed size pool, and every sounding voice is rendered at once: one
+wavetable oscillator per voice, read with vectorised phase accumulators,
+shaped by an ADSR envelope computed for the whole block, and mixed by
+summing. There are no per-sample Python loops.
+"""
+import logging
+import sys
+import time
+import wave
+
+import numpy as np
+
+from pymidi.notes import file_notes
+from pymidi.tempo import TempoMap
+
+log = logging.getLogger(__name__)
+log.setLevel("INFO")
+handler = logging.StreamHandler(stream=sys.stderr)
+handler.setFormatter(logging.Formatter(fmt="%(asctime)s %(levelname)s %(message)s",
+                                       datefmt="%Y-%m-%d %H:%M:%S"))
+log.addHandler(handler)
+
+
+DEFAULT_SAMPLE_RATE = 44100
+DEFAULT_BLOCK_SIZE = 512
+DEFAULT_VOICES = 64
+TABLE_SIZE = 2048
+# harmonics summed into the band-limited wavetables
+HARMONICS = 32
+
+SINE = "sine"
+TRIANGLE = "triangle"
+SAWTOOTH = "sawtooth"
+SQUARE = "square"
+
+
+def wavetable(waveform, size=TABLE_SIZE, harmonics=HARMONICS):
+    """
+    Returns one cycle of a waveform, built from its first harmonics so that
+    high notes do not alias as badly, with its first sample repeated at the
+    end for interpolation.
+    """
+    phase = 2 * np.pi * np.arange(size + 1) / size
+    if waveform == SINE:
+        table = np.sin(phase)
+    else:
+        table = np.zeros(size + 1)
+        for harmonic in range(1, harmonics + 1):
+            if waveform == SAWTOOTH:
+                table += np.sin(harmonic * phase) * (-1) ** (harmonic + 1) / harmonic
+            elif harmonic % 2:
+                if waveform == SQUARE:
+                    table += np.sin(harmonic * phase) / harmonic
+                elif waveform == TRIANGLE:
+                    table += np.sin(harmonic * phase) * (-1) ** (harmonic // 2) / harmonic ** 2
+                else:
+                    raise Exception("Unrecognised waveform {}".format(waveform))
+    return (table / np.abs(table).max()).astype(np.float32)
+
+
+class Synth(object):
+    """
+    A polyphonic wavetable synthesiser with a pool of voices.
+
+    When more notes sound at once than there are voices, the voice that
+    started earliest is stolen for the new note.
+    """
+
+    def __init__(self, sample_rate=DEFAULT_SAMPLE_RATE, block_size=DEFAULT_BLOCK_SIZE, voices=DEFAULT_VOICES,
+                 waveform=SAWTOOTH, attack=0.01, decay=0.1, sustain=0.7, release=0.2, gain=0.2):
+        """
+        :param sample_rate: samples per second
+        :param block_size: number of samples rendered at a time
+        :param voices: maximum number of notes sounding at once
+        :param waveform: SINE, TRIANGLE, SAWTOOTH or SQUARE
+        :param attack: seconds to rise to full level at the start of a note
+        :param decay: seconds to fall from full level to the sustain level
+        :param sustain: level held until the end of the note, from 0 to 1
+        :param release: seconds to fall silent after the end of the note
+        :param gain: level of a single note at full velocity
+        """
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.table = wavetable(waveform)
+        # envelope stage lengths in samples, at least one to avoid dividing by zero
+        self.attack = max(attack * sample_rate, 1.0)
+        self.decay = max(decay * sample_rate, 1.0)
+        self.sustain = sustain
+        self.release = max(release * sample_rate, 1.0)
+        self.gain = gain
+
+        # the voice pool: one element of each array per voice
+        self.active = np.zeros(voices, dtype=bool)
+        self.phase = np.zeros(voices)
+        self.increment = np.zeros(voices)
+        self.amplitude = np.zeros(voices, dtype=np.float32)
+        self.on_sample = np.zeros(voices, dtype=np.int64)
+        self.off_sample = np.zeros(voices, dtype=np.int64)
+        self.stats = {"notes": 0, "voices_stolen": 0, "notes_dropped": 0, "peak_voices": 0}
+        self._offsets = np.arange(block_size, dtype=np.float32)
+        self._table = np.append(self.table, self.table[1])
+
+    def render(self, chunks):
+        """
+        Renders the notes of a parsed file.
+
+        :param chunks: a list of chunks, as returned by parse_chunks, starting with the header
+        :return: a float32 array of mono samples
+        """
+        notes, _, _ = file_notes(chunks)
+        tempo_map = TempoMap.from_chunks(chunks)
+        starts = np.round(tempo_map.to_seconds(notes["start"]) * self.sample_rate).astype(np.int64)
+        ends = np.round(tempo_map.to_seconds(notes["end"]) * self.sample_rate).astype(np.int64)
+        return self.render_notes(starts, ends, notes["pitch"], notes["velocity"])
+
+    def render_notes(self, starts, ends, pitches, velocities):
+        """
+        Renders notes given as arrays of start and end samples, MIDI note
+        numbers and velocities, sorted by start.
+        """
+        self.active[:] = False
+        length = int(ends.max() + self.release) if len(ends) else 0
+        block_size = self.block_size
+        blocks = -(-length // block_size)
+        output = np.zeros(blocks * block_size, dtype=np.float32)
+        frequencies = 440.0 * 2.0 ** ((pitches.astype(np.float64) - 69) / 12)
+        increments = frequencies * len(self.table[:-1]) / self.sample_rate
+        amplitudes = (velocities.astype(np.float32) / 127) * self.gain
+        # notes starting in each block are the range of notes up to the first starting in a later block
+        block_firsts = np.searchsorted(starts, np.arange(blocks + 1) * block_size)
+
+        for block in range(blocks):
+            block_start = block * block_size
+            first, last = block_firsts[block], block_firsts[block + 1]
+            if last > first:
+                self._allocate(block_start, starts[first:last], np.maximum(ends[first:last], starts[first:last] + 1),
+                               increments[first:last], amplitudes[first:last])
+            output[block_start:block_start + block_size] = self._render_block(block_start)
+
+        self.stats["notes"] += len(starts)
+        return output[:length]
+
+    def _allocate(self, block_start, starts, ends, increments, amplitudes):
+        count = len(starts)
+        free = np.flatnonzero(~self.active)
+        if count > len(free):
+            # steal the voices that started earliest
+            busy = np.flatnonzero(self.active)
+            stolen = busy[np.argsort(self.on_sample[busy], kind="stable")[:count - len(free)]]
+            self.stats["voices_stolen"] += len(stolen)
+            free = np.concatenate([free, stolen])
+        # if there are more notes than voices in one block, only the last ones to start get a voice
+        voices = free[:count]
+        self.stats["notes_dropped"] += count - len(voices)
+        starts, ends, increments, amplitudes = starts[-len(voices):], ends[-len(voices):], increments[-len(voices):], \
+            amplitudes[-len(voices):]
+
+        self.active[voices] = True
+        self.on_sample[voices] = starts
+        self.off_sample[voices] = ends
+        self.increment[voices] = increments
+        self.amplitude[voices] = amplitudes
+        # start each oscillator so that it reaches phase 0 at its note's first sample
+        self.phase[voices] = -increments * (starts - block_start)
+        self.stats["peak_voices"] = max(self.stats["peak_voices"], int(self.active.sum()))
+
+    def _render_block(self, block_start):
+        voices = np.flatnonzero(self.active)
+        if not len(voices):
+            return 0.0
+        offsets = self._offsets
+        # float32 rounding can take np.mod to exactly table_size, so the table wraps round by one more sample
+        table = self._table
+        table_size = len(table) - 2
+
+        # oscillators: read the wavetable at each voice's phase, interpolating linearly. Single precision is plenty
+        # within a block, and the phases carried between blocks are kept in double precision.
+        increment = self.increment[voices]
+        phase = self.phase[voices].astype(np.float32)[:, None] + increment.astype(np.float32)[:, None] * offsets
+        np.mod(phase, table_size, out=phase)
+        index = phase.astype(np.int32)
+        phase -= index
+        low = table[index]
+        signal = low + phase * (table[index + 1] - low)
+        self.phase[voices] = np.mod(self.phase[voices] + increment * self.block_size, table_size)
+
+        # envelopes: attack, decay and sustain from the note's start, held at the level reached at its end (the
+        # stages are linear, so that is the min of the attack ramp and the decay ramp, floored at the sustain
+        # level), then faded out over the release
+        held_for = (self.off_sample[voices] - self.on_sample[voices]).astype(np.float32)[:, None]
+        since_on = (block_start - self.on_sample[voices]).astype(np.float32)[:, None] + offsets
+        held = np.minimum(since_on, held_for)
+        envelope = np.minimum(held * (1 / self.attack),
+                              np.maximum(1 - (1 - self.sustain) / self.decay * (held - self.attack), self.sustain))
+        np.maximum(envelope, 0, out=envelope)
+        since_on -= held_for
+        envelope *= np.clip(1 - since_on * (1 / self.release), 0, 1)
+        envelope *= self.amplitude[voices, None]
+
+        # voices whose release ends in this block are free for the next one
+        self.active[voices[self.off_sample[voices] + self.release <= block_start + self.block_size]] = False
+
+        signal *= envelope
+        return signal.sum(axis=0)
+
+
+def write_wav(path, samples, sample_rate=DEFAULT_SAMPLE_RATE):
+    """
+    Writes mono float samples to a 16 bit WAV file, clipping them to -1 to 1.
+    """
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(pcm.tobytes())
+
+
+def render_file(chunks, path, **options):
+    """
+    Renders a parsed file to a WAV file.
+
+    :param chunks: a list of chunks, as returned by parse_chunks, starting with the header
+    :param path: path of the WAV file to write
+    :param options: keyword arguments for Synth
+    :return: a dict of statistics: seconds of audio rendered, seconds taken, the real-time factor (seconds taken
+             per second of audio, so below 1 is faster than real time), and the number of renders one core could
+             keep up with in real time
+    """
+    synth = Synth(**options)
+    start = time.perf_counter()
+    samples = synth.render(chunks)
+    render_seconds = time.perf_counter() - start
+    write_wav(path, samples, synth.sample_rate)
+
+    audio_seconds = len(samples) / synth.sample_rate
+    real_time_factor = render_seconds / audio_seconds if audio_seconds else 0.0
+    stats = dict(synth.stats, audio_seconds=audio_seconds, render_seconds=render_seconds,
+                 real_time_factor=real_time_factor,
+                 renders_per_core=1 / real_time_factor if real_time_factor else 0.0)
+    log.info("Rendered {audio_seconds:.2f}s of audio in {render_seconds:.2f}s: real-time factor "
+             "{real_time_factor:.4f}, {renders_per_core:.0f} real-time renders per core".format(**stats))
+    return stats
@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+import wave
+
+import numpy as np
+
+from pymidi.chunks import parse_file
+from pymidi.synth import Synth, render_file, wavetable, SINE, SQUARE, TRIANGLE, SAWTOOTH
+
+FORMAT_1_EXAMPLE = "data/format_1_example_1.mid"
+RATE = 8000
+
+
+def one_note(synth, pitch=69, start=0, end=RATE, velocity=127):
+    return synth.render_notes(np.array([start]), np.array([end]), np.array([pitch]), np.array([velocity]))
+
+
+class SynthTest(unittest.TestCase):
+
+    def test_wavetables_are_normalised_single_cycles(self):
+        for waveform in [SINE, SQUARE, TRIANGLE, SAWTOOTH]:
+            table = wavetable(waveform)
+
+            self.assertAlmostEqual(float(np.abs(table).max()), 1.0, places=5)
+            self.assertAlmostEqual(float(table[0]), float(table[-1]), places=5)
+
+    def test_unrecognised_waveform_raises_exception(self):
+        with self.assertRaises(Exception):
+            wavetable("noise")
+
+    def test_note_is_rendered_at_its_pitch(self):
+        samples = one_note(Synth(sample_rate=RATE, waveform=SINE, block_size=100))
+
+        spectrum = np.abs(np.fft.rfft(samples[:RATE]))
+
+        self.assertEqual(int(np.argmax(spectrum)), 440)
+
+    def test_envelope_attacks_sustains_and_releases(self):
+        synth = Synth(sample_rate=RATE, waveform=SQUARE, attack=0.1, decay=0.1, sustain=0.5, release=0.1, gain=1.0)
+
+        samples = one_note(synth, start=RATE // 2, end=RATE)
+
+        self.assertEqual(len(samples), RATE + RATE // 10)
+        self.assertEqual(float(np.abs(samples[:RATE // 2]).max()), 0.0)
+        # peaks just after the attack, holds at the sustain level, and fades out over the release
+        self.assertAlmostEqual(float(np.abs(samples[RATE // 2:RATE // 2 + RATE // 5]).max()), 1.0, delta=0.1)
+        self.assertAlmostEqual(float(np.abs(samples[RATE * 3 // 4:RATE]).max()), 0.5, delta=0.05)
+        self.assertLess(float(np.abs(samples[-RATE // 100:]).max()), 0.1)
+
+    def test_voices_are_stolen_when_pool_is_full(self):
+        synth = Synth(sample_rate=RATE, voices=2, block_size=10)
+
+        synth.render_notes(np.array([0, 10, 20]), np.array([RATE] * 3), np.array([60, 64, 67]), np.array([100] * 3))
+
+        self.assertEqual(synth.stats["voices_stolen"], 1)
+        self.assertEqual(synth.stats["peak_voices"], 2)
+
+    def test_notes_are_dropped_when_more_start_in_one_block_than_there_are_voices(self):
+        synth = Synth(sample_rate=RATE, voices=2, block_size=100)
+
+        synth.render_notes(np.array([0, 10, 20]), np.array([RATE] * 3), np.array([60, 64, 67]), np.array([100] * 3))
+
+        self.assertEqual(synth.stats["notes_dropped"], 1)
+
+    def test_rendering_file_to_wav(self):
+        chunks = parse_file(FORMAT_1_EXAMPLE)
+        path = os.path.join(tempfile.mkdtemp(), "rendered.wav")
+        try:
+            stats = render_file(chunks, path, sample_rate=RATE)
+
+            with wave.open(path, "rb") as f:
+                self.assertEqual(f.getframerate(), RATE)
+                self.assertEqual(f.getnframes(), int(round(stats["audio_seconds"] * RATE)))
+        finally:
+            os.remove(path)
+            os.rmdir(os.path.dirname(path))
+
+        # four quarter notes at 120 bpm, then the release
+        self.assertAlmostEqual(stats["audio_seconds"], 2.2)
+        self.assertEqual(stats["notes"], 4)
+        self.assertGreater(stats["real_time_factor"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+"""
+Conversion of tick times to seconds, from a file's header division and
+its Set Tempo events.
+
+Works with track chunks in any of the formats returned by pymidi.chunks:
+(delta, event dict) tuples, pymidi.typed_events objects, or columnar arrays.
+"""
+from bisect import bisect_right
+
+import numpy as np
+
+from pymidi.chunks import numbered_tracks
+from pymidi.columnar import payload
+from pymidi.decoder import META_STATUS
+from pymidi.typed_events import Event
+
+# 120 beats per minute, the tempo until the first Set Tempo event
+DEFAULT_TEMPO = 500000
+SET_TEMPO = 0x51
+TIME_UNITS_PER_QUARTER_NOTE = "time units per quarter note"
+SMTPE_FRAME_RATES = {24: 24.0, 25: 25.0, 29: 30000 / 1001, 30: 30.0}
+
+
+class TempoMap(object):
+    """
+    A piecewise linear map from ticks to seconds.
+
+    Each segment starts at a Set Tempo event, and stores the tick and time
+    it starts at along with the seconds per tick until the next segment,
+    so single lookups are a binary search over the segments, and whole
+    arrays of ticks are converted with one vectorised searchsorted.
+    """
+
+    def __init__(self, division, changes=()):
+        """
+        :param division: the "division" of a header chunk
+        :param changes: (absolute tick, microseconds per quarter note) tuples, in any order. Of several
+                              changes at the same tick, the last one wins.
+        """
+        if division["format"] == TIME_UNITS_PER_QUARTER_NOTE:
+            quarter_note_ticks = division["time_units"]
+            if quarter_note_ticks <= 0:
+                raise Exception("Division of {} ticks per quarter note".format(quarter_note_ticks))
+            tempos = [DEFAULT_TEMPO]
+            ticks = [0]
+            for tick, tempo in sorted(changes, key=lambda change: change[0]):
+                if tick != ticks[-1]:
+                    ticks.append(tick)
+                    tempos.append(tempo)
+                else:
+                    tempos[-1] = tempo
+            seconds_per_tick = [tempo / 1e6 / quarter_note_ticks for tempo in tempos]
+        else:
+            # in SMTPE time, ticks are a fixed fraction of a second whatever the tempo
+            frame_rate = SMTPE_FRAME_RATES.get(division["frames_per_second"], division["frames_per_second"])
+            ticks = [0]
+            seconds_per_tick = [1.0 / (frame_rate * division["time_units_per_frame"])]
+
+        seconds = [0.0]
+        for i in range(1, len(ticks)):
+            seconds.append(seconds[-1] + (ticks[i] - ticks[i - 1]) * seconds_per_tick[i - 1])
+
+        self.ticks = ticks
+        self.seconds = seconds
+        self.seconds_per_tick = seconds_per_tick
+        self._ticks = np.array(ticks, dtype=np.float64)
+        self._seconds = np.array(seconds)
+        self._seconds_per_tick = np.array(seconds_per_tick)
+
+    @classmethod
+    def from_chunks(cls, chunks, track=None):
+        """
+        Builds the tempo map of a parsed file.
+
+        :param chunks: the chunks of a file, as returned by parse_chunks, starting with the header
+        :param track: the track to take Set Tempo events from, numbered from 0 by its place in the file (see
+                      numbered_tracks). By default they are merged from every track, as Format 0 and 1 files share
+                      one tempo map. Format 2 tracks each have their own.
+        """
+        header = chunks[0]
+        tracks = [chunk for number, chunk in numbered_tracks(chunks) if track is None or number == track]
+
+        changes = []
+        for chunk in tracks:
+            changes.extend(tempo_changes(chunk))
+
+        return cls(header["division"], changes)
+
+    def tick_to_seconds(self, tick):
+        i = bisect_right(self.ticks, tick) - 1
+        return self.seconds[i] + (tick - self.ticks[i]) * self.seconds_per_tick[i]
+
+    def seconds_to_tick(self, seconds):
+        """
+        Returns the (fractional) tick at a time, in seconds.
+        """
+        i = max(bisect_right(self.seconds, seconds) - 1, 0)
+        return self.ticks[i] + (seconds - self.seconds[i]) / self.seconds_per_tick[i]
+
+    def to_seconds(self, ticks):
+        """
+        Converts an array of absolute ticks to seconds, in one vectorised call.
+        """
+        ticks = np.asarray(ticks, dtype=np.float64)
+        i = np.searchsorted(self._ticks, ticks, side="right") - 1
+        return self._seconds[i] + (ticks - self._ticks[i]) * self._seconds_per_tick[i]
+
+
+def absolute_ticks(chunk):
+    """
+    Returns the absolute tick of each event of a track chunk, as an array.
+    """
+    events = chunk["events"]
+    if isinstance(events, np.ndarray):
+        return events["tick"]
+    if events and isinstance(events[0], Event):
+        deltas = [event.delta for event in events]
+    else:
+        deltas = [delta for delta, _ in events]
+    return np.cumsum(np.array(deltas, dtype=np.uint64), dtype=np.uint64)
+
+
+def tempo_changes(chunk):
+    """
+    Returns the (absolute tick, microseconds per quarter note) of each Set
+    Tempo event of a track chunk.
+    """
+    events = chunk["events"]
+    if isinstance(events, np.ndarray):
+        rows = events[(events["status"] == META_STATUS) & (events["data1"] == SET_TEMPO)]
+        return [(int(row["tick"]), int.from_bytes(payload(chunk, row), "big")) for row in rows]
+
+    changes = []
+    tick = 0
+    for item in events:
+        if isinstance(item, Event):
+            tick += item.delta
+            if item.sub_type == "Set Tempo":
+                changes.append((tick, item.tempo))
+        else:
+            delta, event = item
+            tick += delta
+            if event["sub_type"] == "Set Tempo":
+                changes.append((tick, event["new_tempo"].uint))
+    return changes
@@ -0,0 +1,76 @@
+import unittest
+
+import numpy as np
+
+from pymidi.chunks import parse_chunks, parse_file, LAZY_EVENTS, TYPED_EVENTS, COLUMNAR_EVENTS
+from pymidi.tempo import TempoMap, absolute_ticks, tempo_changes
+from pymidi.typed_events import EndOfTrack, SetTempo
+
+FORMAT_1_EXAMPLE = "data/format_1_example_1.mid"
+QUARTER_NOTES = {"format": "time units per quarter note", "time_units": 96}
+
+
+class TempoTest(unittest.TestCase):
+
+    def test_default_tempo_is_120_beats_per_minute(self):
+        tempo_map = TempoMap(QUARTER_NOTES)
+
+        self.assertAlmostEqual(tempo_map.tick_to_seconds(96), 0.5)
+        self.assertAlmostEqual(tempo_map.tick_to_seconds(960), 5.0)
+
+    def test_converting_ticks_across_tempo_changes(self):
+        tempo_map = TempoMap(QUARTER_NOTES, [(192, 1000000), (96, 250000)])
+
+        self.assertAlmostEqual(tempo_map.tick_to_seconds(96), 0.5)
+        self.assertAlmostEqual(tempo_map.tick_to_seconds(144), 0.625)
+        self.assertAlmostEqual(tempo_map.tick_to_seconds(192), 0.75)
+        self.assertAlmostEqual(tempo_map.tick_to_seconds(288), 1.75)
+
+        np.testing.assert_allclose(tempo_map.to_seconds([0, 96, 144, 192, 288]), [0, 0.5, 0.625, 0.75, 1.75])
+
+    def test_last_tempo_change_at_a_tick_wins(self):
+        tempo_map = TempoMap(QUARTER_NOTES, [(0, 1000000), (0, 250000)])
+
+        self.assertAlmostEqual(tempo_map.tick_to_seconds(96), 0.25)
+
+    def test_converting_seconds_back_to_ticks(self):
+        tempo_map = TempoMap(QUARTER_NOTES, [(96, 250000), (192, 1000000)])
+
+        for tick in [0, 50, 96, 150, 192, 1000]:
+            self.assertAlmostEqual(tempo_map.seconds_to_tick(tempo_map.tick_to_seconds(tick)), tick)
+
+    def test_smtpe_division_ignores_tempo(self):
+        tempo_map = TempoMap({"format": "SMTPE", "frames_per_second": 25, "time_units_per_frame": 40},
+                             [(0, 1000000)])
+
+        self.assertAlmostEqual(tempo_map.tick_to_seconds(1000), 1.0)
+        self.assertAlmostEqual(TempoMap({"format": "SMTPE", "frames_per_second": 29, "time_units_per_frame": 1})
+                               .tick_to_seconds(30), 30 * 1001 / 30000)
+
+    def test_building_tempo_map_from_chunks_in_every_event_format(self):
+        with open(FORMAT_1_EXAMPLE, "rb") as f:
+            dict_chunks = parse_chunks(f)
+
+        for chunks in [dict_chunks,
+                       parse_file(FORMAT_1_EXAMPLE, event_format=LAZY_EVENTS),
+                       parse_file(FORMAT_1_EXAMPLE, event_format=TYPED_EVENTS),
+                       parse_file(FORMAT_1_EXAMPLE, event_format=COLUMNAR_EVENTS)]:
+            self.assertEqual(tempo_changes(chunks[1]), [(0, 500000)])
+            self.assertEqual(list(absolute_ticks(chunks[4])), [0, 0, 0, 384, 384, 384])
+
+            tempo_map = TempoMap.from_chunks(chunks)
+            np.testing.assert_allclose(tempo_map.to_seconds(absolute_ticks(chunks[2])), [0, 1, 2, 2])
+
+    def test_tracks_left_out_are_counted_in_track_numbers(self):
+        header = {"type": "header", "format": 2, "division": QUARTER_NOTES}
+        slow = {"type": "track", "events": [SetTempo(0, 1000000), EndOfTrack(0)]}
+        fast = {"type": "track", "events": [SetTempo(0, 250000), EndOfTrack(0)]}
+        # as a track that fails to parse is under SKIP
+        chunks = [header, slow, None, fast]
+
+        self.assertAlmostEqual(TempoMap.from_chunks(chunks, 0).tick_to_seconds(96), 1.0)
+        self.assertAlmostEqual(TempoMap.from_chunks(chunks, 2).tick_to_seconds(96), 0.25)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,424 @@
+"""
+Compact event classes, an alternative to the event dicts built by
+pymidi.decoder for files with millions of events.
+
+Each event is a single object with __slots__ holding its delta time and
+decoded fields as plain ints (payloads as bytes, or memoryviews when
+decoding with views=True), instead of a (delta, dict) tuple. Events keep
+the type/sub_type strings of the dict format as class attributes, and
+support event["field"] lookups of their attributes.
+"""
+from pymidi.decoder import check_length, META_STATUS, F0_SYSEX_STATUS, F7_SYSEX_STATUS, END_OF_TRACK, \
+    CHANNEL_MODE_MESSAGES
+from pymidi.events import META, MIDI, SYSEX
+
+
+class Event(object):
+    __slots__ = ("delta",)
+    type = None
+    sub_type = None
+
+    def __init__(self, delta):
+        self.delta = delta
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.values() == other.values()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "{}({})".format(type(self).__name__, ", ".join(
+            "{}={!r}".format(field, value) for field, value in zip(self.fields(), self.values())))
+
+    def fields(self):
+        return tuple(field for cls in reversed(type(self).__mro__) for field in getattr(cls, "__slots__", ()))
+
+    def values(self):
+        return tuple(getattr(self, field) for field in self.fields())
+
+
+class ChannelEvent(Event):
+    __slots__ = ("channel",)
+    type = MIDI
+
+    def __init__(self, delta, channel):
+        super().__init__(delta)
+        self.channel = channel
+
+
+class _NoteEvent(ChannelEvent):
+    # the fields shared by NoteOff and NoteOn, which are siblings so that neither is an instance of the other
+    __slots__ = ("note", "velocity")
+
+    def __init__(self, delta, channel, note, velocity):
+        super().__init__(delta, channel)
+        self.note = note
+        self.velocity = velocity
+
+
+class NoteOff(_NoteEvent):
+    __slots__ = ()
+    sub_type = "Note Off"
+
+
+class NoteOn(_NoteEvent):
+    __slots__ = ()
+    sub_type = "Note On"
+
+
+class PolyphonicKeyPressure(ChannelEvent):
+    __slots__ = ("key", "pressure")
+    sub_type = "Polyphonic Key Pressure"
+
+    def __init__(self, delta, channel, key, pressure):
+        super().__init__(delta, channel)
+        self.key = key
+        self.pressure = pressure
+
+
+class ControlChange(ChannelEvent):
+    __slots__ = ("controller", "value")
+    sub_type = "Controller Change"
+
+    def __init__(self, delta, channel, controller, value):
+        super().__init__(delta, channel)
+        self.controller = controller
+        self.value = value
+
+
+class ChannelMode(ControlChange):
+    # controllers 0x78-0x7F, e.g. All Notes Off
+    __slots__ = ()
+
+    @property
+    def sub_type(self):
+        return CHANNEL_MODE_MESSAGES[self.controller]
+
+
+class ProgramChange(ChannelEvent):
+    __slots__ = ("program",)
+    sub_type = "Program Change"
+
+    def __init__(self, delta, channel, program):
+        super().__init__(delta, channel)
+        self.program = program
+
+
+class ChannelKeyPressure(ChannelEvent):
+    __slots__ = ("pressure",)
+    sub_type = "Channel Key Pressure"
+
+    def __init__(self, delta, channel, pressure):
+        super().__init__(delta, channel)
+        self.pressure = pressure
+
+
+class PitchBend(ChannelEvent):
+    # value is centred on 0, from -8192 to 8191
+    __slots__ = ("value",)
+    sub_type = "Pitch Bend"
+
+    def __init__(self, delta, channel, value):
+        super().__init__(delta, channel)
+        self.value = value
+
+
+class MetaEvent(Event):
+    __slots__ = ()
+    type = META
+    meta_type = None
+
+
+class UnknownMeta(MetaEvent):
+    __slots__ = ("meta_type", "data")
+    sub_type = "Unknown"
+
+    def __init__(self, delta, meta_type, data):
+        super().__init__(delta)
+        self.meta_type = meta_type
+        self.data = data
+
+
+class SequenceNumber(MetaEvent):
+    # number is None if the event is empty, which stands for the track's position in the file
+    __slots__ = ("number",)
+    sub_type = "Sequence Number"
+    meta_type = 0x00
+
+    def __init__(self, delta, number):
+        super().__init__(delta)
+        self.number = number
+
+
+class TextMetaEvent(MetaEvent):
+    __slots__ = ("text",)
+
+    def __init__(self, delta, text):
+        super().__init__(delta)
+        self.text = text
+
+
+class Text(TextMetaEvent):
+    __slots__ = ()
+    sub_type = "Text Event"
+    meta_type = 0x01
+
+
+class CopyrightNotice(TextMetaEvent):
+    __slots__ = ()
+    sub_type = "Copyright Notice"
+    meta_type = 0x02
+
+
+class TrackName(TextMetaEvent):
+    __slots__ = ()
+    sub_type = "Sequence/Track Name"
+    meta_type = 0x03
+
+
+class InstrumentName(TextMetaEvent):
+    __slots__ = ()
+    sub_type = "Instrument Name"
+    meta_type = 0x04
+
+
+class Lyric(TextMetaEvent):
+    __slots__ = ()
+    sub_type = "Lyric"
+    meta_type = 0x05
+
+
+class Marker(TextMetaEvent):
+    __slots__ = ()
+    sub_type = "Marker"
+    meta_type = 0x06
+
+
+class CuePoint(TextMetaEvent):
+    __slots__ = ()
+    sub_type = "Cue Point"
+    meta_type = 0x07
+
+
+class ChannelPrefix(MetaEvent):
+    # channel is numbered 1 - 16, as for channel events
+    __slots__ = ("channel",)
+    sub_type = "MIDI Channel Prefix"
+    meta_type = 0x20
+
+    def __init__(self, delta, channel):
+        super().__init__(delta)
+        self.channel = channel
+
+
+class PrefixPort(MetaEvent):
+    __slots__ = ("port",)
+    sub_type = "MIDI Prefix Port"
+    meta_type = 0x21
+
+    def __init__(self, delta, port):
+        super().__init__(delta)
+        self.port = port
+
+
+class EndOfTrack(MetaEvent):
+    __slots__ = ()
+    sub_type = "End of Track"
+    meta_type = END_OF_TRACK
+
+
+class SetTempo(MetaEvent):
+    # tempo is in microseconds per quarter note
+    __slots__ = ("tempo",)
+    sub_type = "Set Tempo"
+    meta_type = 0x51
+
+    def __init__(self, delta, tempo):
+        super().__init__(delta)
+        self.tempo = tempo
+
+
+class SMTPEOffset(MetaEvent):
+    __slots__ = ("hours", "minutes", "seconds", "frames", "fractional_frames")
+    sub_type = "SMTPE Offset"
+    meta_type = 0x54
+
+    def __init__(self, delta, hours, minutes, seconds, frames, fractional_frames):
+        super().__init__(delta)
+        self.hours = hours
+        self.minutes = minutes
+        self.seconds = seconds
+        self.frames = frames
+        self.fractional_frames = fractional_frames
+
+
+class TimeSignature(MetaEvent):
+    __slots__ = ("numerator", "denominator", "clocks_per_tick", "notated_32nd_notes")
+    sub_type = "Time Signature"
+    meta_type = 0x58
+
+    def __init__(self, delta, numerator, denominator, clocks_per_tick, notated_32nd_notes):
+        super().__init__(delta)
+        self.numerator = numerator
+        self.denominator = denominator
+        self.clocks_per_tick = clocks_per_tick
+        # number of 1/32 notes per 24 MIDI clocks
+        self.notated_32nd_notes = notated_32nd_notes
+
+
+class KeySignature(MetaEvent):
+    __slots__ = ("sharps_flats", "major_minor")
+    sub_type = "Key Signature"
+    meta_type = 0x59
+
+    def __init__(self, delta, sharps_flats, major_minor):
+        super().__init__(delta)
+        self.sharps_flats = sharps_flats
+        self.major_minor = major_minor
+
+
+class SequencerSpecific(MetaEvent):
+    __slots__ = ("data",)
+    sub_type = "Sequencer-Specific Meta-event"
+    meta_type = 0x7F
+
+    def __init__(self, delta, data):
+        super().__init__(delta)
+        self.data = data
+
+
+class SysEx(Event):
+    # prefix is the 0xF0 or 0xF7 byte the event started with
+    __slots__ = ("prefix", "data")
+    type = SYSEX
+
+    def __init__(self, delta, prefix, data):
+        super().__init__(delta)
+        self.prefix = prefix
+        self.data = data
+
+    @property
+    def sub_type(self):
+        return "F0" if self.prefix == F0_SYSEX_STATUS else "F7"
+
+
+def build_event(delta, status, data1, data2, payload, views=False):
+    """
+    Builds the typed event for a set of raw fields returned by
+    pymidi.decoder.read_event. Can be passed as the build argument of
+    decode_track and TrackStream.
+    """
+    if status == META_STATUS:
+        return _META_EVENTS.get(data1, _unknown_meta)(delta, data1, payload if views else bytes(payload))
+    if status == F0_SYSEX_STATUS or status == F7_SYSEX_STATUS:
+        return SysEx(delta, status, payload if views else bytes(payload))
+    # Channels are identified from 0 -> F, but are referred to as 1 - 16
+    return _MIDI_EVENTS[status >> 4](delta, (status & 0x0F) + 1, data1, data2)
+
+
+def _note_on(delta, channel, note, velocity):
+    if velocity == 0:
+        # note-on with velocity=0 == note-off with velocity=48
+        return NoteOff(delta, channel, note, 48)
+    return NoteOn(delta, channel, note, velocity)
+
+
+def _control_change(delta, channel, controller, value):
+    if controller >= 0x78:
+        return ChannelMode(delta, channel, controller, value)
+    return ControlChange(delta, channel, controller, value)
+
+
+def _program_change(delta, channel, program, _):
+    return ProgramChange(delta, channel, program)
+
+
+def _channel_key_pressure(delta, channel, pressure, _):
+    return ChannelKeyPressure(delta, channel, pressure)
+
+
+def _pitch_bend(delta, channel, lsb, msb):
+    return PitchBend(delta, channel, ((msb << 7) | lsb) - 0x2000)
+
+
+_MIDI_EVENTS = (None, None, None, None, None, None, None, None, NoteOff, _note_on, PolyphonicKeyPressure,
+                _control_change, _program_change, _channel_key_pressure, _pitch_bend, None)
+
+
+def _unknown_meta(delta, meta_type, payload):
+    return UnknownMeta(delta, meta_type, payload)
+
+
+def _sequence_number(delta, _, payload):
+    return SequenceNumber(delta, int.from_bytes(payload, "big") if len(payload) else None)
+
+
+def _text(cls):
+    return lambda delta, _, payload: cls(delta, payload)
+
+
+def _channel_prefix(delta, _, payload):
+    check_length("Channel Prefix", payload, 1)
+    return ChannelPrefix(delta, payload[0] + 1)
+
+
+def _prefix_port(delta, _, payload):
+    check_length("MIDI Prefix Port", payload, 1)
+    return PrefixPort(delta, payload[0])
+
+
+def _end_of_track(delta, _, payload):
+    check_length("End of Track", payload, 0)
+    return EndOfTrack(delta)
+
+
+def _set_tempo(delta, _, payload):
+    check_length("Set Tempo", payload, 3)
+    return SetTempo(delta, int.from_bytes(payload, "big"))
+
+
+def _smtpe_offset(delta, _, payload):
+    check_length("SMTPE Offset", payload, 5)
+    return SMTPEOffset(delta, payload[0], payload[1], payload[2], payload[3], payload[4])
+
+
+def _time_signature(delta, _, payload):
+    check_length("Time Signature", payload, 4)
+    return TimeSignature(delta, payload[0], payload[1], payload[2], payload[3])
+
+
+def _key_signature(delta, _, payload):
+    check_length("Key Signature", payload, 2)
+    sharps_flats = payload[0]
+    return KeySignature(delta, sharps_flats - 256 if sharps_flats > 127 else sharps_flats, payload[1])
+
+
+def _sequencer_specific(delta, _, payload):
+    return SequencerSpecific(delta, payload)
+
+
+_META_EVENTS = {
+    0x00: _sequence_number,
+    0x01: _text(Text),
+    0x02: _text(CopyrightNotice),
+    0x03: _text(TrackName),
+    0x04: _text(InstrumentName),
+    0x05: _text(Lyric),
+    0x06: _text(Marker),
+    0x07: _text(CuePoint),
+    0x20: _channel_prefix,
+    0x21: _prefix_port,
+    END_OF_TRACK: _end_of_track,
+    0x51: _set_tempo,
+    0x54: _smtpe_offset,
+    0x58: _time_signature,
+    0x59: _key_signature,
+    0x7F: _sequencer_specific,
+}
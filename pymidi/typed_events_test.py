@@ -0,0 +1,72 @@
+import unittest
+
+from pymidi.chunks import parse_chunks, parse_file, TYPED_EVENTS
+from pymidi.decoder import decode_track
+from pymidi.events import META, MIDI, SYSEX
+from pymidi.typed_events import build_event, NoteOn, NoteOff, ChannelMode, PitchBend, SetTempo, KeySignature, \
+    TrackName, SysEx, EndOfTrack
+
+FORMAT_1_EXAMPLE = "data/format_1_example_1.mid"
+
+
+class TypedEventsTest(unittest.TestCase):
+
+    def test_parsing_with_typed_events_matches_dict_events(self):
+        with open(FORMAT_1_EXAMPLE, "rb") as f:
+            expected = parse_chunks(f)
+        with open(FORMAT_1_EXAMPLE, "rb") as f:
+            chunks = parse_chunks(f, event_format=TYPED_EVENTS)
+
+        self.assertEqual(chunks[0], expected[0])
+        for chunk, expected_chunk in zip(chunks[1:], expected[1:]):
+            self.assertEqual(len(chunk["events"]), len(expected_chunk["events"]))
+            for event, (delta, expected_event) in zip(chunk["events"], expected_chunk["events"]):
+                self.assertEqual(event.delta, delta)
+                self.assertEqual(event.type, expected_event["type"])
+                self.assertEqual(event.sub_type, expected_event["sub_type"])
+
+    def test_parsing_file_with_mmap_and_typed_events(self):
+        chunks = parse_file(FORMAT_1_EXAMPLE, mmap=True, event_format=TYPED_EVENTS)
+
+        self.assertEqual(chunks[1]["events"][1], SetTempo(0, 500000))
+        self.assertEqual(chunks[1]["events"][2], EndOfTrack(384))
+
+    def test_building_midi_events(self):
+        events = decode_track(bytes.fromhex("0092306060300000B07B00 00E00040"), build=build_event)
+
+        self.assertEqual(events[0], NoteOn(0, 3, 0x30, 0x60))
+        self.assertEqual(events[1], NoteOff(0x60, 3, 0x30, 48))
+        self.assertEqual(events[2], ChannelMode(0, 1, 0x7B, 0))
+        self.assertEqual(events[2].sub_type, "All Notes Off")
+        self.assertEqual(events[3], PitchBend(0, 1, 0))
+        self.assertEqual(events[0].type, MIDI)
+
+    def test_building_meta_and_sysex_events(self):
+        events = decode_track(bytes.fromhex("00FF03045069616E 00FF5902FD01 00F0024312 00FF2F00"), build=build_event)
+
+        self.assertEqual(events[0], TrackName(0, b"Pian"))
+        self.assertEqual(events[1], KeySignature(0, -3, 1))
+        self.assertEqual(events[2], SysEx(0, 0xF0, b"\x43\x12"))
+        self.assertEqual(events[2].sub_type, "F0")
+        self.assertEqual(events[2].type, SYSEX)
+        self.assertEqual(events[3].type, META)
+
+    def test_typed_events_support_dict_style_lookups(self):
+        event = NoteOn(10, 1, 60, 100)
+
+        self.assertEqual(event["sub_type"], "Note On")
+        self.assertEqual(event["note"], 60)
+        self.assertRaises(KeyError, event.__getitem__, "pressure")
+
+    def test_note_ons_are_not_note_offs(self):
+        self.assertNotIsInstance(NoteOn(0, 1, 60, 100), NoteOff)
+        self.assertNotIsInstance(NoteOff(0, 1, 60, 0), NoteOn)
+        self.assertNotEqual(NoteOn(0, 1, 60, 100), NoteOff(0, 1, 60, 100))
+
+    def test_typed_events_have_no_instance_dict(self):
+        self.assertFalse(hasattr(NoteOn(0, 1, 60, 100), "__dict__"))
+        self.assertFalse(hasattr(SetTempo(0, 500000), "__dict__"))
+
+
+if __name__ == "__main__":
+    unittest.main()
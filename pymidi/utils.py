@@ -25,6 +25,26 @@ def variable_length_field(data):
     return data[i + 8:], BitArray(bin=value).int
 
 
+def read_variable_length(data, pos):
+    """
+    Reads the MIDI variable length field starting at data[pos] from a
+    bytes-like object, using integer shifts rather than bit strings.
+
+    :param data: a bytes-like object containing a variable length field
+    :param pos: the offset of the first byte of the field
+    :return: the extracted field and the offset of the first byte after it
+    """
+    byte = data[pos]
+    pos += 1
+    value = byte & 0x7F
+    while byte & 0x80:
+        byte = data[pos]
+        pos += 1
+        value = (value << 7) | (byte & 0x7F)
+
+    return value, pos
+
+
 # TODO there must be a better way to do this
 def _padding(length):
     """
@@ -2,7 +2,7 @@ import unittest
 
 from bitstring import BitArray
 
-from pymidi.utils import variable_length_field
+from pymidi.utils import variable_length_field, read_variable_length
 
 
 class UtilsTest(unittest.TestCase):
@@ -71,6 +71,23 @@ class UtilsTest(unittest.TestCase):
         self.assertEqual(extracted, 268435455)
         self.assertEqual(remainder, BitArray("0x12304FABC"))
 
+    def test_reading_variable_length_field_at_offset_returns_value_and_next_offset(self):
+        data = bytes.fromhex("12FFFFFF7F34")
+
+        extracted, pos = read_variable_length(data, 1)
+
+        self.assertEqual(extracted, 268435455)
+        self.assertEqual(pos, 5)
+
+    def test_reading_variable_length_field_matches_bit_string_decoding(self):
+        for hex_value in ["00", "7F", "8100", "8768", "FF7F", "BD8440", "FFFFFF7F"]:
+            _, expected = variable_length_field(BitArray("0x" + hex_value))
+
+            extracted, pos = read_variable_length(bytes.fromhex(hex_value), 0)
+
+            self.assertEqual(extracted, expected)
+            self.assertEqual(pos, len(hex_value) // 2)
+
 
 if __name__ == "__main__":
     unittest.main()
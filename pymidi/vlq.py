@@ -0,0 +1,149 @@
+"""
+Encoding and decoding of MIDI variable length quantities (VLQs).
+
+A VLQ stores 7 bits of its value in each byte, most significant first,
+with the top bit of every byte but the last set.
+"""
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from pymidi.errors import TrackError
+
+# the SMF spec limits VLQs to 4 bytes, i.e. values up to 0x0FFFFFFF
+MAX_VLQ_LENGTH = 4
+
+
+def read_vlq(data, pos):
+    """
+    Reads the VLQ starting at data[pos], using integer shifts.
+
+    :param data: a bytes-like object containing a VLQ
+    :param pos: the offset of the first byte of the VLQ
+    :return: the value of the VLQ and the offset of the first byte after it
+    """
+    start = pos
+    byte = data[pos]
+    pos += 1
+    value = byte & 0x7F
+    while byte & 0x80:
+        byte = data[pos]
+        pos += 1
+        value = (value << 7) | (byte & 0x7F)
+
+    if pos - start > MAX_VLQ_LENGTH:
+        raise TrackError("Variable length quantity longer than {} bytes".format(MAX_VLQ_LENGTH), start)
+    return value, pos
+
+
+def encode_vlq(value):
+    """
+    Encodes a value as a VLQ.
+
+    :param value: an int from 0 to 0x0FFFFFFF
+    :return: the VLQ, as bytes
+    """
+    if value < 0x80:
+        if value < 0:
+            raise Exception("Cannot encode negative value {} as a variable length quantity".format(value))
+        return _SINGLE_BYTE_VLQS[value]
+    if value > 0x0FFFFFFF:
+        raise Exception("Value {} too large for a variable length quantity".format(value))
+
+    encoded = bytearray((value & 0x7F,))
+    value >>= 7
+    while value:
+        encoded.append((value & 0x7F) | 0x80)
+        value >>= 7
+    encoded.reverse()
+    return bytes(encoded)
+
+
+_SINGLE_BYTE_VLQS = [bytes((value,)) for value in range(0x80)]
+
+
+def vlq_length(value):
+    """
+    Returns the number of bytes in the VLQ encoding of value.
+    """
+    if value < 0x80:
+        return 1
+    if value < 0x4000:
+        return 2
+    if value < 0x200000:
+        return 3
+    return 4
+
+
+def vlq_lengths(values):
+    """
+    vlq_length for each value of an array at once. Needs NumPy.
+
+    :param values: an array (or sequence) of ints from 0 to 0x0FFFFFFF
+    :return: a NumPy int64 array of the lengths
+    """
+    values = np.asarray(values)
+    return 1 + (values >= 0x80).astype(np.int64) + (values >= 0x4000) + (values >= 0x200000)
+
+
+def read_vlq_run(data, pos=0, count=None):
+    """
+    Decodes a run of consecutive VLQs in one pass, e.g. a table of lengths.
+
+    With NumPy installed, the end of every VLQ is located and the values
+    are assembled with vectorised shifts, rather than a byte at a time.
+    Any bytes after the last complete VLQ are ignored.
+
+    :param data: a bytes-like object containing the VLQs
+    :param pos: the offset of the first byte of the first VLQ
+    :param count: the number of VLQs to read (defaults to all the complete VLQs in data)
+    :return: a list (or NumPy uint32 array) of the values, and the offset of the first byte after the last VLQ
+    """
+    if np is None:
+        return _read_vlq_run_python(data, pos, count)
+
+    raw = np.frombuffer(data, dtype=np.uint8, offset=pos)
+    ends = np.flatnonzero(raw < 0x80)
+    if count is not None:
+        if len(ends) < count:
+            raise Exception("Expected {} variable length quantities, found {}".format(count, len(ends)))
+        ends = ends[:count]
+    if not len(ends):
+        return np.zeros(0, dtype=np.uint32), pos
+
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    lengths = ends - starts + 1
+    if lengths.max() > MAX_VLQ_LENGTH:
+        raise TrackError("Variable length quantity longer than {} bytes".format(MAX_VLQ_LENGTH))
+
+    used = ends[-1] + 1
+    # each byte is shifted up by 7 bits for every byte after it in the same VLQ
+    shifts = 7 * (np.repeat(ends, lengths) - np.arange(used))
+    values = np.add.reduceat((raw[:used] & 0x7F).astype(np.uint32) << shifts.astype(np.uint32), starts,
+                             dtype=np.uint32)
+
+    return values, pos + int(used)
+
+
+def _read_vlq_run_python(data, pos, count):
+    values = []
+    end = len(data)
+    while (count is None or len(values) < count) and pos < end:
+        start = pos
+        while pos < end and data[pos] & 0x80:
+            pos += 1
+        if pos == end:
+            pos = start
+            break
+        pos += 1
+        if pos - start > MAX_VLQ_LENGTH:
+            raise TrackError("Variable length quantity longer than {} bytes".format(MAX_VLQ_LENGTH))
+        values.append(read_vlq(data, start)[0])
+
+    if count is not None and len(values) < count:
+        raise Exception("Expected {} variable length quantities, found {}".format(count, len(values)))
+
+    return values, pos
@@ -0,0 +1,105 @@
+import unittest
+
+from bitstring import BitArray
+
+from pymidi import vlq
+from pymidi.decoder import decode_track
+from pymidi.errors import TrackError
+from pymidi.utils import variable_length_field
+from pymidi.vlq import read_vlq, read_vlq_run, encode_vlq
+
+VLQS = ["00", "7F", "8100", "8768", "FF7F", "BD8440", "FFFFFF7F"]
+VALUES = [0, 127, 128, 1000, 16383, 1000000, 268435455]
+
+
+class VlqTest(unittest.TestCase):
+
+    def test_reading_vlq_at_offset_returns_value_and_next_offset(self):
+        data = bytes.fromhex("12FFFFFF7F34")
+
+        extracted, pos = read_vlq(data, 1)
+
+        self.assertEqual(extracted, 268435455)
+        self.assertEqual(pos, 5)
+
+    def test_encoding_vlq_round_trips(self):
+        for hex_value, value in zip(VLQS, VALUES):
+            self.assertEqual(encode_vlq(value), bytes.fromhex(hex_value))
+
+    def test_encoding_out_of_range_vlq_raises(self):
+        with self.assertRaises(Exception):
+            encode_vlq(0x10000000)
+        with self.assertRaises(Exception):
+            encode_vlq(-1)
+
+    def test_reading_vlq_matches_bit_string_decoding(self):
+        for hex_value in VLQS:
+            _, expected = variable_length_field(BitArray("0x" + hex_value))
+
+            extracted, pos = read_vlq(bytes.fromhex(hex_value), 0)
+
+            self.assertEqual(extracted, expected)
+            self.assertEqual(pos, len(hex_value) // 2)
+
+    def test_reading_vlq_run_decodes_every_vlq(self):
+        data = bytes.fromhex("AA" + "".join(VLQS) + "81")
+
+        values, pos = read_vlq_run(data, 1)
+
+        self.assertEqual(list(values), VALUES)
+        self.assertEqual(pos, len(data) - 1)
+
+    def test_reading_vlq_run_stops_after_count_vlqs(self):
+        data = bytes.fromhex("".join(VLQS))
+
+        values, pos = read_vlq_run(data, count=3)
+
+        self.assertEqual(list(values), VALUES[:3])
+        self.assertEqual(pos, 4)
+        self.assertRaises(Exception, read_vlq_run, data, 0, 8)
+
+    def test_reading_vlq_run_rejects_vlqs_longer_than_4_bytes(self):
+        self.assertRaises(TrackError, read_vlq_run, bytes.fromhex("8080808000"))
+
+    def test_reading_vlq_rejects_vlqs_longer_than_4_bytes(self):
+        self.assertRaises(TrackError, read_vlq, bytes.fromhex("FFFFFFFF7F"), 0)
+        with self.assertRaises(TrackError):
+            decode_track(bytes.fromhex("00 FF 01 8080808001 41  00 FF 2F 00"))
+
+    def test_vlq_length(self):
+        self.assertEqual([vlq.vlq_length(value) for value in [0, 0x7F, 0x80, 0x3FFF, 0x4000, 0x1FFFFF, 0x200000]],
+                         [1, 1, 2, 2, 3, 3, 4])
+
+    def test_vlq_lengths(self):
+        if vlq.np is None:
+            self.skipTest("needs NumPy")
+        self.assertEqual(vlq.vlq_lengths(VALUES).tolist(), [len(encode_vlq(value)) for value in VALUES])
+
+    def test_reading_vlq_run_returns_uint32(self):
+        if vlq.np is None:
+            self.skipTest("needs NumPy")
+        values, _ = read_vlq_run(bytes.fromhex("".join(VLQS)))
+        self.assertEqual(values.dtype, vlq.np.uint32)
+
+    def test_reading_vlq_run_of_empty_data(self):
+        values, pos = read_vlq_run(b"", 0)
+
+        self.assertEqual(list(values), [])
+        self.assertEqual(pos, 0)
+
+    def test_reading_vlq_run_without_numpy_matches_numpy(self):
+        data = bytes.fromhex("".join(VLQS) + "FF")
+        numpy = vlq.np
+        vlq.np = None
+        try:
+            values, pos = read_vlq_run(data)
+            self.assertRaises(Exception, read_vlq_run, bytes.fromhex("8080808000"))
+        finally:
+            vlq.np = numpy
+
+        self.assertEqual(values, VALUES)
+        self.assertEqual(pos, len(data) - 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,317 @@
+"""
+Serialisation of parsed chunks back into Standard MIDI File bytes.
+
+Track chunks are encoded from their events, in any of the formats returned
+by pymidi.chunks: (delta, event dict) tuples, pymidi.typed_events objects,
+or columnar arrays. Lazy events are written from their raw fields, without
+being decoded. Track chunks parsed with keep_raw=True that still have
+their "raw" data are written by copying it instead, so that writing back an
+unchanged file costs little more than a copy.
+
+Meta event dicts are written from their decoded fields, such as
+"new_tempo" or "text". If they still have their "data" payload, it must
+match those fields, or writing raises an exception rather than dropping
+an edit to one or the other: after editing a field, delete "data". Meta
+events with no decoded fields (End of Track, Sequencer-Specific and
+unknown ones) and Sysex events are written from "data".
+
+Edits to the events of a track chunk that still has its "raw" data are
+not written, as the raw data is copied instead: delete "raw" from a track
+before editing it.
+"""
+import io
+import logging
+import sys
+
+from pymidi import typed_events
+from pymidi.chunks import HEADER, TRACK, HEADER_TYPE, TRACK_TYPE
+from pymidi.decoder import META_STATUS, F0_SYSEX_STATUS, F7_SYSEX_STATUS, MIDI_DATA_LENGTHS, \
+    META_TYPE_NAMES, CHANNEL_MODE_MESSAGES, TEXT_META_TYPES
+from pymidi.events import META, SYSEX
+from pymidi.lazy_events import LazyEvent
+from pymidi.typed_events import Event, MetaEvent, SysEx
+from pymidi.vlq import encode_vlq
+
+log = logging.getLogger(__name__)
+log.setLevel("INFO")
+handler = logging.StreamHandler(stream=sys.stderr)
+handler.setFormatter(logging.Formatter(fmt="%(asctime)s %(levelname)s %(message)s",
+                                       datefmt="%Y-%m-%d %H:%M:%S"))
+log.addHandler(handler)
+
+
+def write_file(path, chunks, running_status=True):
+    """
+    Writes chunks to a new MIDI file at path.
+
+    :param path: path of the file to write
+    :param chunks: a list of chunks, as returned by parse_chunks, starting with the header
+    :param running_status: whether to omit the status byte of channel messages repeating the previous one
+    """
+    with open(path, "wb") as f:
+        write_chunks(f, chunks, running_status)
+
+
+def write_chunks(f, chunks, running_status=True):
+    """
+    Writes chunks to a file object a chunk at a time.
+
+    Chunks that were unknown or failed to parse (None) are left out, and
+    the header's track count is set to the number of track chunks written.
+
+    :param f: a file object opened in binary mode
+    :param chunks: a list of chunks, as returned by parse_chunks, starting with the header
+    :param running_status: whether to omit the status byte of channel messages repeating the previous one. Track
+                           chunks written from their "raw" data are copied as they are.
+    """
+    header = chunks[0] if chunks else None
+    if not header or header["type"] != HEADER:
+        raise Exception("Chunks must start with a header chunk")
+    skipped = chunks.count(None)
+    if skipped:
+        log.warning("Leaving out {} unknown or unparseable chunks".format(skipped))
+    tracks = [chunk for chunk in chunks[1:] if chunk]
+    for track in tracks:
+        if track["type"] != TRACK:
+            raise Exception("Found a {} chunk after the header chunk".format(track["type"]))
+    if header["format"] == 0 and len(tracks) != 1:
+        raise Exception("Format 0 files must have exactly one track, found {}".format(len(tracks)))
+
+    f.write(encode_header_chunk(header, len(tracks)))
+    for track in tracks:
+        f.write(encode_track_chunk(track, running_status))
+
+
+def encode_chunks(chunks, running_status=True):
+    """
+    Encodes chunks into the bytes of a whole MIDI file (see write_chunks).
+    """
+    f = io.BytesIO()
+    write_chunks(f, chunks, running_status)
+    return f.getvalue()
+
+
+def encode_header_chunk(header, track_count=None):
+    """
+    :param header: a header chunk, as returned by process_header_chunk
+    :param track_count: the number of track chunks following it (defaults to the header's "track_count")
+    :return: the header chunk, as bytes
+    """
+    if track_count is None:
+        track_count = header["track_count"]
+    division = header["division"]
+    if division["format"] == "SMTPE":
+        # a negative number of frames per second in the top byte, as a two's complement signed byte
+        division = (((-division["frames_per_second"]) & 0xFF) << 8) | division["time_units_per_frame"]
+    else:
+        division = division["time_units"]
+        if not 0 < division < 0x8000:
+            raise Exception("Division of {} ticks per quarter note cannot be written".format(division))
+
+    return HEADER_TYPE + (6).to_bytes(4, "big") + header["format"].to_bytes(2, "big") + \
+        track_count.to_bytes(2, "big") + division.to_bytes(2, "big")
+
+
+def encode_track_chunk(track, running_status=True):
+    """
+    :param track: a track chunk, as returned by process_track_chunk
+    :param running_status: whether to omit the status byte of channel messages repeating the previous one
+    :return: the track chunk, as bytes
+    """
+    data = track.get("raw")
+    if data is None:
+        data = encode_events(raw_fields(track), running_status)
+
+    return TRACK_TYPE + len(data).to_bytes(4, "big") + data
+
+
+def encode_events(fields, running_status=True):
+    """
+    Encodes the data of a track chunk.
+
+    :param fields: an iterable of the raw fields of each event, as (delta, status, data1, data2, payload) tuples
+                   (see pymidi.decoder.read_event)
+    :param running_status: whether to omit the status byte of channel messages repeating the previous one
+    :return: the track data, as a bytearray
+    """
+    data = bytearray()
+    append = data.append
+    previous_status = None
+    for delta, status, data1, data2, payload in fields:
+        if delta < 0x80:
+            append(delta)
+        else:
+            data += encode_vlq(delta)
+
+        if status < 0xF0:
+            data_length = MIDI_DATA_LENGTHS[status >> 4]
+            if data_length is None:
+                raise Exception("Cannot write MIDI event with status {:02x}".format(status))
+            if status != previous_status:
+                append(status)
+                if running_status:
+                    previous_status = status
+            if data_length == 2:
+                if (data1 | data2) & 0x80:
+                    raise Exception("Data bytes {} and {} out of range for status {:02x}".format(data1, data2,
+                                                                                              status))
+                append(data1)
+                append(data2)
+            else:
+                if data1 & 0x80:
+                    raise Exception("Data byte {} out of range for status {:02x}".format(data1, status))
+                append(data1)
+        else:
+            # Sysex and meta events cancel running status
+            previous_status = None
+            append(status)
+            if status == META_STATUS:
+                append(data1)
+            data += encode_vlq(len(payload))
+            data += payload
+
+    return data
+
+
+def raw_fields(track):
+    """
+    Yields the raw (delta, status, data1, data2, payload) fields of each
+    event of a track chunk in any event format, as read by read_event.
+    """
+    events = track["events"]
+    if "payload_offsets" in track:
+        offsets = track["payload_offsets"].tolist()
+        payloads = track["payloads"]
+        for delta, status, data1, data2, index in zip(events["delta"].tolist(), events["status"].tolist(),
+                                                      events["data1"].tolist(), events["data2"].tolist(),
+                                                      events["payload"].tolist()):
+            yield delta, status, data1, data2, payloads[offsets[index]:offsets[index + 1]] if index >= 0 else None
+        return
+
+    for item in events:
+        if isinstance(item, Event):
+            yield (item.delta,) + _typed_fields(item)
+        else:
+            delta, event = item
+            if isinstance(event, LazyEvent):
+                yield delta, event.status, event.data1, event.data2, event.payload()
+            else:
+                yield (delta,) + _dict_fields(event)
+
+
+def _dict_fields(event):
+    type_ = event["type"]
+    if type_ == META:
+        sub_type = event["sub_type"]
+        meta_type = event["meta_type"] if sub_type == "Unknown" else _META_TYPES[sub_type]
+        return META_STATUS, meta_type, None, _dict_meta_payload(sub_type, event)
+    if type_ == SYSEX:
+        status = F0_SYSEX_STATUS if event["sub_type"] == "F0" else F7_SYSEX_STATUS
+        return status, None, None, _payload_bytes(event["data"])
+
+    message, data1, data2 = _DICT_MIDI_FIELDS[event["sub_type"]](event)
+    return message | (event["channel"] - 1), data1, data2, None
+
+
+def _payload_bytes(data):
+    # BitArray payloads, or bytes/memoryviews when parsed with views=True
+    return data.bytes if hasattr(data, "bytes") else data
+
+
+def _dict_meta_payload(sub_type, event):
+    encode = _DICT_META_PAYLOADS.get(sub_type)
+    data = event.get("data")
+    if encode is None:
+        return _payload_bytes(data)
+
+    payload = encode(event)
+    if data is not None and payload != _payload_bytes(data):
+        raise Exception("{} event's fields do not match its data {!r}: delete \"data\" to write an edited event"
+                        .format(sub_type, bytes(_payload_bytes(data))))
+    return payload
+
+
+def _byte_values(*values):
+    # fields decoded as one byte BitArrays, or edited to ints
+    return bytes(value.uint if hasattr(value, "uint") else value for value in values)
+
+
+def _uint_bytes(value, length):
+    return value.bytes if hasattr(value, "bytes") else value.to_bytes(length, "big")
+
+
+_DICT_MIDI_FIELDS = {
+    "Note Off": lambda event: (0x80, event["note"], event["velocity"]),
+    "Note On": lambda event: (0x90, event["note"], event["velocity"]),
+    "Polyphonic Key Pressure": lambda event: (0xA0, event["key"], event["pressure"]),
+    "Controller Change": lambda event: (0xB0, event["new_controller"], event["value"]),
+    "Program Change": lambda event: (0xC0, event["new_value"], 0),
+    "Channel Key Pressure": lambda event: (0xD0, event["channel_pressure"], 0),
+    "Pitch Bend": lambda event: (0xE0, event["lsb"].uint, event["msb"].uint),
+}
+for _controller, _sub_type in CHANNEL_MODE_MESSAGES.items():
+    _DICT_MIDI_FIELDS[_sub_type] = lambda event, controller=_controller: (0xB0, controller, event["value"])
+
+_META_TYPES = {sub_type: meta_type for meta_type, sub_type in META_TYPE_NAMES.items()}
+
+# payloads of meta event dicts, from their decoded fields
+_DICT_META_PAYLOADS = {
+    "Sequence Number": lambda event: bytes(event["sequence_number"]),
+    "MIDI Channel Prefix": lambda event: bytes((int(event["channel"], 16),)),
+    "MIDI Prefix Port": lambda event: _uint_bytes(event["device"], 1),
+    "Set Tempo": lambda event: _uint_bytes(event["new_tempo"], 3),
+    "SMTPE Offset": lambda event: _byte_values(event["hours"], event["minutes"], event["seconds"], event["frames"],
+                                               event["fractional_frames"]),
+    "Time Signature": lambda event: bytes((event["numerator"], event["denominator"], event["clocks_per_tick"],
+                                           event["32nd_notes_per_24_clocks"])),
+    "Key Signature": lambda event: bytes((event["sharps_flats"] & 0xFF, event["major_minor"])),
+}
+for _sub_type in TEXT_META_TYPES.values():
+    _DICT_META_PAYLOADS[_sub_type] = lambda event: bytes(event["text"])
+
+
+def _typed_fields(event):
+    if isinstance(event, MetaEvent):
+        return META_STATUS, event.meta_type, None, _TYPED_META_PAYLOADS.get(type(event), _data)(event)
+    if isinstance(event, SysEx):
+        return event.prefix, None, None, event.data
+
+    message, data1, data2 = _TYPED_MIDI_FIELDS[type(event)](event)
+    return message | (event.channel - 1), data1, data2, None
+
+
+def _data(event):
+    return event.data
+
+
+_TYPED_MIDI_FIELDS = {
+    typed_events.NoteOff: lambda event: (0x80, event.note, event.velocity),
+    typed_events.NoteOn: lambda event: (0x90, event.note, event.velocity),
+    typed_events.PolyphonicKeyPressure: lambda event: (0xA0, event.key, event.pressure),
+    typed_events.ControlChange: lambda event: (0xB0, event.controller, event.value),
+    typed_events.ChannelMode: lambda event: (0xB0, event.controller, event.value),
+    typed_events.ProgramChange: lambda event: (0xC0, event.program, 0),
+    typed_events.ChannelKeyPressure: lambda event: (0xD0, event.pressure, 0),
+    # value is centred on 0
+    typed_events.PitchBend: lambda event: (0xE0, (event.value + 0x2000) & 0x7F, (event.value + 0x2000) >> 7),
+}
+
+_TYPED_META_PAYLOADS = {
+    typed_events.SequenceNumber: lambda event: b"" if event.number is None else event.number.to_bytes(2, "big"),
+    typed_events.Text: lambda event: event.text,
+    typed_events.CopyrightNotice: lambda event: event.text,
+    typed_events.TrackName: lambda event: event.text,
+    typed_events.InstrumentName: lambda event: event.text,
+    typed_events.Lyric: lambda event: event.text,
+    typed_events.Marker: lambda event: event.text,
+    typed_events.CuePoint: lambda event: event.text,
+    typed_events.ChannelPrefix: lambda event: bytes((event.channel - 1,)),
+    typed_events.PrefixPort: lambda event: bytes((event.port,)),
+    typed_events.EndOfTrack: lambda event: b"",
+    typed_events.SetTempo: lambda event: event.tempo.to_bytes(3, "big"),
+    typed_events.SMTPEOffset: lambda event: bytes((event.hours, event.minutes, event.seconds, event.frames,
+                                                   event.fractional_frames)),
+    typed_events.TimeSignature: lambda event: bytes((event.numerator, event.denominator, event.clocks_per_tick,
+                                                     event.notated_32nd_notes)),
+    typed_events.KeySignature: lambda event: bytes((event.sharps_flats & 0xFF, event.major_minor)),
+}
@@ -0,0 +1,133 @@
+import os
+import tempfile
+import unittest
+
+from pymidi.chunks import parse_buffer, parse_file, DICT_EVENTS, LAZY_EVENTS, TYPED_EVENTS, COLUMNAR_EVENTS
+from pymidi.columnar import transpose
+from pymidi.events import META
+from pymidi.writer import encode_chunks, encode_events, encode_header_chunk, write_file
+
+FORMAT_0_EXAMPLE = "data/format_0_example_1.mid"
+FORMAT_1_EXAMPLE = "data/format_1_example_1.mid"
+
+
+class WriterTest(unittest.TestCase):
+
+    def read(self, path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    def test_unmodified_tracks_are_written_from_their_raw_data(self):
+        for path in [FORMAT_0_EXAMPLE, FORMAT_1_EXAMPLE]:
+            for mmap in [False, True]:
+                chunks = parse_file(path, mmap=mmap, keep_raw=True)
+
+                self.assertEqual(encode_chunks(chunks), self.read(path))
+
+    def test_columnar_tracks_are_encoded_losslessly(self):
+        for path in [FORMAT_0_EXAMPLE, FORMAT_1_EXAMPLE]:
+            chunks = parse_file(path, event_format=COLUMNAR_EVENTS)
+
+            self.assertEqual(encode_chunks(chunks), self.read(path))
+
+    def test_encoded_events_parse_back_to_the_same_events(self):
+        for path in [FORMAT_0_EXAMPLE, FORMAT_1_EXAMPLE]:
+            for event_format in [DICT_EVENTS, LAZY_EVENTS, TYPED_EVENTS]:
+                for running_status in [True, False]:
+                    chunks = parse_file(path, event_format=event_format)
+
+                    encoded = encode_chunks(chunks, running_status)
+
+                    self.assertEqual(parse_buffer(encoded, event_format=event_format), chunks)
+
+    def test_empty_sequence_numbers_are_kept_empty(self):
+        header = b"MThd" + (6).to_bytes(4, "big") + bytes.fromhex("0000 0001 0060")
+        events = bytes.fromhex("00FF0000 00FF00020007 00FF2F00")
+        data = header + b"MTrk" + len(events).to_bytes(4, "big") + events
+        for event_format in [DICT_EVENTS, LAZY_EVENTS, TYPED_EVENTS]:
+            chunks = parse_buffer(data, event_format=event_format)
+
+            self.assertEqual(encode_chunks(chunks), data)
+
+    def test_running_status_omits_repeated_status_bytes(self):
+        fields = [(0, 0x90, 60, 100, None), (10, 0x90, 60, 0, None), (0, 0xFF, 0x2F, None, b"")]
+
+        self.assertEqual(encode_events(fields), bytes.fromhex("00903C64 0A3C00 00FF2F00"))
+        self.assertEqual(encode_events(fields, running_status=False), bytes.fromhex("00903C64 0A903C00 00FF2F00"))
+
+    def test_meta_events_cancel_running_status(self):
+        fields = [(0, 0x90, 60, 100, None), (0, 0xFF, 0x01, None, b"a"), (200, 0x90, 60, 0, None)]
+
+        self.assertEqual(encode_events(fields), bytes.fromhex("00903C64 00FF010161 8148903C00"))
+
+    def test_encoding_out_of_range_data_byte_raises_exception(self):
+        with self.assertRaises(Exception):
+            encode_events([(0, 0x90, 128, 100, None)])
+
+    def test_modified_tracks_are_encoded_from_their_events(self):
+        chunks = parse_file(FORMAT_1_EXAMPLE, event_format=COLUMNAR_EVENTS, keep_raw=True)
+        track = chunks[2]
+        track["events"] = transpose(track["events"], 12)
+        del track["raw"]
+
+        written = parse_buffer(encode_chunks(chunks), event_format=COLUMNAR_EVENTS)
+
+        self.assertEqual(written[2]["events"]["data1"].tolist(), track["events"]["data1"].tolist())
+        self.assertEqual(written[1]["events"].tolist(), chunks[1]["events"].tolist())
+
+    def test_meta_event_dicts_are_encoded_from_their_fields(self):
+        chunks = parse_file(FORMAT_1_EXAMPLE)
+        tempo = next(event for _, event in chunks[1]["events"] if event["sub_type"] == "Set Tempo")
+        tempo["new_tempo"] = 400000
+        del tempo["data"]
+        chunks[1]["events"].insert(0, (0, {"type": META, "sub_type": "Lyric", "text": b"la"}))
+
+        written = parse_buffer(encode_chunks(chunks))
+
+        self.assertEqual(written[1]["events"][0][1]["text"], b"la")
+        self.assertIn(400000, [event["new_tempo"].uint for _, event in written[1]["events"]
+                               if event["sub_type"] == "Set Tempo"])
+
+    def test_meta_event_dicts_with_fields_not_matching_their_data_raise_exception(self):
+        chunks = parse_file(FORMAT_1_EXAMPLE)
+        tempo = next(event for _, event in chunks[1]["events"] if event["sub_type"] == "Set Tempo")
+        tempo["new_tempo"] = 400000
+
+        with self.assertRaisesRegex(Exception, "Set Tempo event's fields do not match its data"):
+            encode_chunks(chunks)
+
+    def test_header_track_count_matches_tracks_written(self):
+        chunks = parse_file(FORMAT_1_EXAMPLE, keep_raw=True)
+        del chunks[3]
+
+        written = parse_buffer(encode_chunks(chunks))
+
+        self.assertEqual(written[0]["track_count"], 3)
+        self.assertEqual(len(written), 4)
+
+    def test_encoding_smtpe_division(self):
+        header = {"type": "header", "format": 0, "track_count": 1,
+                  "division": {"format": "SMTPE", "time_units_per_frame": 40, "frames_per_second": 25}}
+
+        self.assertEqual(encode_header_chunk(header), bytes.fromhex("4D546864 00000006 0000 0001 E728"))
+
+    def test_writing_format_0_file_with_several_tracks_raises_exception(self):
+        chunks = parse_file(FORMAT_0_EXAMPLE)
+
+        with self.assertRaises(Exception):
+            encode_chunks(chunks + chunks[1:])
+
+    def test_writing_file(self):
+        chunks = parse_file(FORMAT_1_EXAMPLE, event_format=TYPED_EVENTS)
+        path = os.path.join(tempfile.mkdtemp(), "written.mid")
+        try:
+            write_file(path, chunks)
+
+            self.assertEqual(parse_file(path, event_format=TYPED_EVENTS), chunks)
+        finally:
+            os.remove(path)
+            os.rmdir(os.path.dirname(path))
+
+
+if __name__ == "__main__":
+    unittest.main()